@@ -1,12 +1,14 @@
 """Articles API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, desc
 from sqlalchemy.orm import selectinload
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from app.api.deps import get_db
-from app.models import Article, ArticleVersion, NewsSource
+from app.database import async_session
+from app.models import Article, NewsSource
 from app.schemas import (
     ArticleListResponse,
     ArticleDetailResponse,
@@ -14,14 +16,18 @@ from app.schemas import (
     ArticleVersionSummary,
     NewsSourceResponse
 )
+from app.schemas.diff import DiffMode
+from app.services.diff_service import DiffService
+from app.services.version_store import resolve_contents, load_chunks
 from app.utils.slug import slugify
 
 router = APIRouter()
 
 
-def _build_article_detail_response(article: Article) -> ArticleDetailResponse:
+def _build_article_detail_response(article: Article, chunks: Dict[str, str]) -> ArticleDetailResponse:
     """Build article detail response from article model (with loaded relationships)."""
     # Build version summaries with full content for detail view
+    contents = resolve_contents(article.versions, chunks)
     version_summaries = [
         ArticleVersionSummary(
             id=v.id,
@@ -29,7 +35,7 @@ def _build_article_detail_response(article: Article) -> ArticleDetailResponse:
             title=v.title,
             captured_at=v.captured_at,
             word_count=v.word_count,
-            content=v.content,
+            content=contents[v.version_number],
             byline=v.byline,
             published_date=v.published_date,
             meta_description=v.meta_description,
@@ -50,8 +56,14 @@ def _build_article_detail_response(article: Article) -> ArticleDetailResponse:
             scrape_interval_active=article.source.scrape_interval_active,
             scrape_interval_archive=article.source.scrape_interval_archive,
             max_articles_per_scrape=article.source.max_articles_per_scrape,
+            rate_limit_per_second=article.source.rate_limit_per_second,
+            rate_limit_burst=article.source.rate_limit_burst,
+            boilerplate_patterns=article.source.boilerplate_patterns,
+            head_probe=article.source.head_probe,
             created_at=article.source.created_at,
-            article_count=0
+            article_count=0,
+            conditional_requests=article.source.conditional_requests,
+            not_modified_responses=article.source.not_modified_responses
         )
 
     return ArticleDetailResponse(
@@ -80,8 +92,8 @@ async def get_articles(
     db: AsyncSession = Depends(get_db)
 ):
     """Get paginated list of articles."""
-    # Build query with eager loading of versions relationship
-    query = select(Article).options(selectinload(Article.versions))
+    # Latest version info comes from the denormalized columns on Article
+    query = select(Article)
 
     # Filter by source if provided
     if source:
@@ -113,17 +125,15 @@ async def get_articles(
     # Build response with latest version info (lightweight)
     items = []
     for article in articles:
-        # Get latest version from already-loaded relationship (no extra query!)
-        latest_version = article.versions[0] if article.versions else None
-
         latest_version_summary = None
-        if latest_version:
+        if article.latest_version_id:
             latest_version_summary = ArticleVersionSummary(
-                id=latest_version.id,
-                version_number=latest_version.version_number,
-                title=latest_version.title,
-                captured_at=latest_version.captured_at,
-                word_count=latest_version.word_count
+                id=article.latest_version_id,
+                version_number=article.version_count,
+                title=article.title,
+                # A new version is what sets last_modified_at
+                captured_at=article.last_modified_at or article.first_seen_at,
+                word_count=article.latest_word_count
             )
 
         items.append(ArticleListResponse(
@@ -146,6 +156,32 @@ async def get_articles(
     )
 
 
+# Declared before /articles/{date}/{slug}; the int convertor leaves slugs named "timeline" to that route
+@router.get("/articles/{article_id:int}/timeline")
+async def get_article_timeline(
+    article_id: int,
+    mode: DiffMode = Query('word', description="'word' or 'hierarchical' (paragraph, sentence, then word changes)"),
+    stats_only: bool = Query(False, description="Omit content_diff and return only titles and stats per step"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream the diffs between all consecutive versions of an article.
+
+    The response is NDJSON: one TimelineStep object per line, oldest step
+    first, written as each step is ready.
+    """
+    result = await db.execute(select(Article.id).where(Article.id == article_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    async def lines():
+        # The body is sent after the request's dependencies may have been torn down
+        async with async_session() as session:
+            async for step in DiffService(session).timeline(article_id, mode, stats_only):
+                yield step.model_dump_json(exclude_none=True) + '\n'
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
 @router.get("/articles/{date}/{slug}", response_model=ArticleDetailResponse)
 async def get_article_by_slug(
     date: str,
@@ -178,7 +214,7 @@ async def get_article_by_slug(
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    return _build_article_detail_response(article)
+    return _build_article_detail_response(article, await load_chunks(db, article.versions))
 
 
 @router.get("/articles/{article_id}", response_model=ArticleDetailResponse)
@@ -198,4 +234,4 @@ async def get_article(
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    return _build_article_detail_response(article)
+    return _build_article_detail_response(article, await load_chunks(db, article.versions))
@@ -1,26 +1,59 @@
 """Diff API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_db
+from app.config import settings
 from app.services.diff_service import DiffService
-from app.schemas import DiffResponse
+from app.schemas import DiffResponse, CompactDiffResponse
+from app.schemas.diff import DiffFormat, DiffMode
 
 router = APIRouter()
 
 
-@router.get("/diff/{article_id}", response_model=DiffResponse)
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against an ETag (weak comparison, as for GET)."""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
+@router.get("/diff/{article_id}", response_model=Union[DiffResponse, CompactDiffResponse])
 async def get_article_diff(
+    request: Request,
     article_id: int,
     from_version: int = Query(..., description="Starting version number"),
     to_version: int = Query(..., description="Ending version number"),
+    mode: DiffMode = Query('word', description="'word' or 'hierarchical' (paragraph, sentence, then word changes)"),
+    fmt: DiffFormat = Query('full', alias='format', description="'full' (word lists) or 'compact' (word offsets into the version texts)"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get diff between two versions of an article."""
+    """Get diff between two versions of an article.
+
+    Responses carry a weak ETag (the same diff is served gzip-compressed or
+    not) derived from the stored diff, so a matching If-None-Match is
+    answered with 304 before the diff is loaded. Clients may reuse a diff
+    for DIFF_CACHE_MAX_AGE seconds before revalidating.
+    """
     try:
         diff_service = DiffService(db)
-        diff = await diff_service.generate_diff(article_id, from_version, to_version)
-        return diff
+        etag = await diff_service.diff_etag(article_id, from_version, to_version, mode, fmt)
+        headers = {'Cache-Control': f"public, max-age={settings.DIFF_CACHE_MAX_AGE}, must-revalidate"}
+        if etag is not None:
+            headers['ETag'] = etag
+            if _etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+
+        diff, etag = await diff_service.generate_diff_with_etag(article_id, from_version, to_version, mode, fmt)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating diff: {str(e)}")
+
+    if etag is not None:
+        headers['ETag'] = etag
+    if fmt == 'compact':
+        diff = DiffService.to_compact(diff)
+    return Response(content=diff.model_dump_json(), media_type='application/json', headers=headers)
@@ -3,11 +3,13 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.database import get_db
-from app.models import Article, ArticleVersion, NewsSource
+from app.models import Article, ArticleVersion, NewsSource, FeedCache
 from app.core.scheduler import scheduler
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict
+from app.scrapers.rate_limiter import rate_limiter
+from app.scrapers.http_pool import http_pool
 
 router = APIRouter()
 
@@ -58,6 +60,62 @@ async def get_stats(db: AsyncSession = Depends(get_db)):
     )
 
 
+class FeedCacheMetrics(BaseModel):
+    """Conditional-GET cache counters for RSS feeds."""
+    feeds: int
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class RateLimiterMetrics(BaseModel):
+    """Per-host request budgets and time spent waiting for them."""
+    hosts: Dict[str, float]
+    waited_seconds: float
+
+
+class HostConnectionMetrics(BaseModel):
+    """Connection reuse counters for one pooled host client."""
+    requests: int
+    connections_opened: int
+    reuse_rate: float
+
+
+class ScraperMetrics(BaseModel):
+    """Scraper efficiency metrics."""
+    feed_cache: FeedCacheMetrics
+    rate_limiter: RateLimiterMetrics
+    http_pool: Dict[str, HostConnectionMetrics]
+
+
+@router.get("/scraper-metrics", response_model=ScraperMetrics)
+async def get_scraper_metrics(db: AsyncSession = Depends(get_db)):
+    """Get scraper efficiency metrics."""
+    result = await db.execute(
+        select(
+            func.count(FeedCache.id),
+            func.coalesce(func.sum(FeedCache.hit_count), 0),
+            func.coalesce(func.sum(FeedCache.miss_count), 0)
+        )
+    )
+    feeds, hits, misses = result.one()
+    lookups = hits + misses
+
+    return ScraperMetrics(
+        feed_cache=FeedCacheMetrics(
+            feeds=feeds,
+            hits=hits,
+            misses=misses,
+            hit_rate=hits / lookups if lookups else 0.0
+        ),
+        rate_limiter=RateLimiterMetrics(
+            hosts={host: bucket.rate for host, bucket in rate_limiter.buckets.items()},
+            waited_seconds=round(rate_limiter.waited_seconds, 3)
+        ),
+        http_pool=http_pool.metrics()
+    )
+
+
 class NextScrapeResponse(BaseModel):
     """Next scheduled scrape information."""
     next_scrape_at: Optional[datetime]
@@ -0,0 +1,143 @@
+"""Maintenance commands.
+
+Usage:
+    python -m app.cli backfill-latest [--batch-size N]
+    python -m app.cli convert-versions {full,delta,chunks} [--batch-size N]
+    python -m app.cli gc-chunks
+    python -m app.cli recompress-versions [--batch-size N]
+    python -m app.cli train-compression-dict OUTPUT [--samples N] [--size BYTES]
+    python -m app.cli reextract [--source {auto,html,text}] [--batch-size N] [--workers N]
+                                [--checkpoint PATH] [--limit N] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.database import async_session, init_db
+from app.services.latest_version import backfill_latest_versions
+from app.services.reextract import Reextractor
+from app.services.version_store import (
+    collect_chunks,
+    convert_storage,
+    recompress_versions,
+    train_compression_dictionary
+)
+
+
+async def _backfill_latest(args):
+    async with async_session() as session:
+        updated = await backfill_latest_versions(session, batch_size=args.batch_size)
+    print(f"Backfilled latest version for {updated} articles")
+
+
+async def _convert_versions(args):
+    async with async_session() as session:
+        converted = await convert_storage(session, args.mode, batch_size=args.batch_size)
+    print(f"Converted {converted} versions to {args.mode} storage")
+
+
+async def _gc_chunks(args):
+    async with async_session() as session:
+        deleted = await collect_chunks(session)
+    print(f"Deleted {deleted} unreferenced chunks")
+
+
+async def _recompress_versions(args):
+    async with async_session() as session:
+        rewritten = await recompress_versions(session, batch_size=args.batch_size)
+    print(f"Recompressed {rewritten} versions")
+
+
+async def _train_compression_dict(args):
+    async with async_session() as session:
+        size = await train_compression_dictionary(
+            session, args.output, samples=args.samples, dict_size=args.size
+        )
+    print(f"Wrote {size} byte dictionary to {args.output}")
+
+
+async def _reextract(args):
+    reextractor = Reextractor(
+        async_session,
+        source=args.source,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        limit=args.limit,
+        dry_run=args.dry_run
+    )
+    if reextractor.progress.last_id:
+        print(f"Resuming after version id {reextractor.progress.last_id}")
+    progress = await reextractor.run()
+    verb = "Would update" if args.dry_run else "Updated"
+    print(
+        f"{verb} {progress.updated} of {progress.processed} versions "
+        f"({progress.skipped} skipped), last id {progress.last_id}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Newsdiff maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser(
+        "backfill-latest",
+        help="Fill the denormalized latest-version columns on articles"
+    )
+    backfill.add_argument("--batch-size", type=int, default=500)
+    backfill.set_defaults(handler=_backfill_latest)
+
+    convert = subparsers.add_parser(
+        "convert-versions",
+        help="Rewrite stored versions as full text, keyframes plus deltas, or paragraph chunks"
+    )
+    convert.add_argument("mode", choices=["full", "delta", "chunks"])
+    convert.add_argument("--batch-size", type=int, default=100, help="articles per transaction")
+    convert.set_defaults(handler=_convert_versions)
+
+    gc = subparsers.add_parser("gc-chunks", help="Delete paragraph chunks no longer referenced by any version")
+    gc.set_defaults(handler=_gc_chunks)
+
+    recompress = subparsers.add_parser(
+        "recompress-versions",
+        help="Rewrite stored version text with the configured VERSION_COMPRESSION"
+    )
+    recompress.add_argument("--batch-size", type=int, default=500)
+    recompress.set_defaults(handler=_recompress_versions)
+
+    train = subparsers.add_parser(
+        "train-compression-dict",
+        help="Train a zstd dictionary for VERSION_COMPRESSION_DICT from stored versions"
+    )
+    train.add_argument("output")
+    train.add_argument("--samples", type=int, default=2000)
+    train.add_argument("--size", type=int, default=112640, help="dictionary size in bytes")
+    train.set_defaults(handler=_train_compression_dict)
+
+    reextract = subparsers.add_parser(
+        "reextract",
+        help="Recompute content, hashes and word counts of stored versions offline"
+    )
+    reextract.add_argument(
+        "--source", choices=["auto", "html", "text"], default="auto",
+        help="archived HTML, stored text, or HTML where archived (default)"
+    )
+    reextract.add_argument("--batch-size", type=int, default=500)
+    reextract.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per CPU)")
+    reextract.add_argument("--checkpoint", help="progress file; an existing one resumes the run")
+    reextract.add_argument("--limit", type=int, help="stop after about this many versions")
+    reextract.add_argument("--dry-run", action="store_true", help="count changes without writing them")
+    reextract.set_defaults(handler=_reextract)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    async def run():
+        await init_db()
+        await args.handler(args)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,9 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./newsdiff.db"
+    # SQLite: seconds a write waits for another connection's write transaction
+    # (overlapping scrape runs, diffs stored on GET) before "database is locked"
+    SQLITE_BUSY_TIMEOUT: float = 30.0
 
     def get_database_url(self) -> str:
         """Get database URL with correct async driver."""
@@ -34,6 +37,62 @@ class Settings(BaseSettings):
 
     # Scraping
     USER_AGENT: str = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    # Default per-host request budget (NewsSource can override per source)
+    SCRAPE_RATE_LIMIT: float = 2.0  # requests per second
+    SCRAPE_RATE_BURST: int = 4
+    SITEMAP_MAX_AGE_HOURS: int = 48  # skip older sitemap entries (0 = no limit)
+    PRIORITY_AGE_HALF_LIFE_HOURS: float = 12.0  # article age at which change likelihood halves
+
+    # Adaptive recrawl: interval doubles per unchanged check, capped; old articles retire
+    RECRAWL_MAX_INTERVAL_HOURS: float = 24.0
+    RECRAWL_MAX_AGE_DAYS: int = 14
+
+    # Shared HTTP client pool (HTTP/2 requires the optional 'h2' package)
+    HTTP2_ENABLED: bool = False
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 10
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0  # seconds
+
+    # HTML extraction executor ("process" or "thread"; 0 workers = one per CPU)
+    EXTRACTION_EXECUTOR: str = "process"
+    EXTRACTION_WORKERS: int = 0
+    EXTRACTION_TIMEOUT: float = 20.0  # seconds per document
+
+    # Write-behind stage: fetch workers queue results, one writer commits them in batches
+    WRITE_BATCH_SIZE: int = 50
+    WRITE_FLUSH_INTERVAL: float = 1.0  # seconds to wait for a batch to fill
+    WRITE_QUEUE_SIZE: int = 200
+
+    # Version storage: "full" text per version, "delta" against the previous
+    # version with a full keyframe every VERSION_KEYFRAME_INTERVAL versions, or
+    # "chunks" (paragraphs stored once in content_chunks and shared across versions)
+    VERSION_STORAGE_MODE: str = "full"
+    VERSION_KEYFRAME_INTERVAL: int = 10
+
+    # Compression of stored version text: "none", "zlib" or "zstd" (needs the
+    # optional 'zstandard' package; VERSION_COMPRESSION_DICT is a trained dictionary file)
+    VERSION_COMPRESSION: str = "none"
+    VERSION_COMPRESSION_LEVEL: int = 6
+    VERSION_COMPRESSION_DICT: str = ""
+
+    # Raw HTML archive of versioned pages (content-addressed, compressed; empty = disabled)
+    HTML_ARCHIVE_DIR: str = ""
+    HTML_ARCHIVE_MAX_BYTES: int = 5 * 1024 ** 3  # oldest files are pruned beyond this
+
+    # Version gating: a fetch whose normalized fingerprint (boilerplate removed) matches
+    # the latest version is not stored; SimHash distance <= threshold also counts as a
+    # match (0 = exact normalized text only, since small real edits matter here)
+    FINGERPRINT_SIMHASH_THRESHOLD: int = 0
+
+    # Responses smaller than this many bytes are not gzip-compressed
+    GZIP_MINIMUM_SIZE: int = 1000
+
+    # Word diffs: maximum edit distance the Myers diff searches per region before
+    # falling back to difflib's heuristic matcher for it
+    DIFF_MAX_COST: int = 2000
+    # Seconds clients and proxies may reuse a diff before revalidating its ETag
+    # (stored diffs change when versions are re-extracted or DIFF_ALGORITHM changes)
+    DIFF_CACHE_MAX_AGE: int = 300
 
     # Logging
     LOG_LEVEL: str = "INFO"
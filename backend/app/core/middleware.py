@@ -0,0 +1,33 @@
+"""ASGI middleware."""
+import re
+from typing import Iterable
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware:
+    """Starlette's GZipMiddleware, bypassed for some paths.
+
+    The gzip responder only emits what zlib flushes on its own, so a
+    streamed response (e.g. NDJSON written line by line) would reach the
+    client in large delayed blocks instead of as each line is ready.
+    Requests whose path fully matches one of `excluded_paths` (regular
+    expressions) are passed through uncompressed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        excluded_paths: Iterable[str] = ()
+    ) -> None:
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.excluded_paths = [re.compile(pattern) for pattern in excluded_paths]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and any(pattern.fullmatch(scope["path"]) for pattern in self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
@@ -46,7 +46,8 @@ async def setup_scheduler():
         sources = result.scalars().all()
 
         for source in sources:
-            # Schedule active interval (first 24h)
+            # Run every active interval; each run only re-checks articles that are
+            # due (per-article next_check_at backs off towards the archive interval)
             scheduler.add_job(
                 scrape_source_job,
                 trigger=IntervalTrigger(minutes=source.scrape_interval_active),
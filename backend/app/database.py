@@ -1,13 +1,15 @@
 """Database configuration and session management."""
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy import inspect, text, LargeBinary
 from app.config import settings
 
 # Create async engine with correct driver
 engine = create_async_engine(
     settings.get_database_url(),
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    connect_args={'timeout': settings.SQLITE_BUSY_TIMEOUT} if settings.get_database_url().startswith('sqlite') else {}
 )
 
 # Create async session factory
@@ -30,7 +32,42 @@ async def get_db():
             await session.close()
 
 
+def _add_missing_columns(conn):
+    """Add columns and indexes introduced after a table was created.
+
+    create_all() only creates missing tables, so existing databases would
+    otherwise never pick up new nullable columns on existing models.
+    Text columns that became binary (compressed) are converted on Postgres;
+    SQLite stores either in the same column.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                model_type = getattr(column.type, 'impl', column.type)
+                if (
+                    conn.dialect.name == 'postgresql'
+                    and isinstance(model_type, LargeBinary)
+                    and not isinstance(existing[column.name], LargeBinary)
+                ):
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                        f"TYPE BYTEA USING convert_to({column.name}, 'UTF8')"
+                    ))
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if isinstance(default, (int, float)) and not isinstance(default, bool):
+                ddl += f' DEFAULT {default}'
+            conn.execute(text(ddl))
+
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
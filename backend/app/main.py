@@ -6,8 +6,11 @@ import logging
 
 from app.config import settings
 from app.database import init_db
+from app.core.middleware import SelectiveGZipMiddleware
 from app.core.scheduler import setup_scheduler, shutdown_scheduler
 from app.api.v1.router import router as api_v1_router
+from app.scrapers.http_pool import http_pool
+from app.scrapers.extraction import extraction_executor
 
 # Setup logging
 logging.basicConfig(
@@ -26,6 +29,14 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
 
+    # Fill latest-version columns on rows created before they existed
+    from app.database import async_session
+    from app.services.latest_version import backfill_latest_versions
+    async with async_session() as session:
+        backfilled = await backfill_latest_versions(session)
+    if backfilled:
+        logger.info(f"Backfilled latest version for {backfilled} articles")
+
     # Auto-seed sources if database is empty
     from app.seed_sources import seed_sources_if_empty
     await seed_sources_if_empty()
@@ -38,6 +49,8 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down application...")
     await shutdown_scheduler()
+    await http_pool.aclose()
+    extraction_executor.shutdown()
     logger.info("Application shutdown complete")
 
 
@@ -55,6 +68,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON responses (diffs, article texts) for clients that accept gzip;
+# streamed NDJSON (article timelines) is sent as is so each line arrives when ready
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    excluded_paths=[r"/api/v1/articles/\d+/timeline"]
+)
+
 # Include API router
 app.include_router(api_v1_router, prefix="/api/v1")
 
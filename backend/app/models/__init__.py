@@ -2,5 +2,8 @@
 from app.models.source import NewsSource
 from app.models.article import Article
 from app.models.version import ArticleVersion
+from app.models.feed import FeedCache
+from app.models.chunk import ContentChunk
+from app.models.diff import ArticleDiff
 
-__all__ = ["NewsSource", "Article", "ArticleVersion"]
+__all__ = ["NewsSource", "Article", "ArticleVersion", "FeedCache", "ContentChunk", "ArticleDiff"]
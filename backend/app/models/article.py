@@ -22,6 +22,27 @@ class Article(Base):
     check_count = Column(Integer, default=0)
     version_count = Column(Integer, default=0)
 
+    # Adaptive recrawl scheduling
+    next_check_at = Column(DateTime(timezone=True))
+    unchanged_checks = Column(Integer, default=0)  # consecutive checks without a change
+
+    # Hash of the normalized raw HTML from the last fetch; an identical page is not re-extracted
+    last_html_hash = Column(String(64))
+    # Validators from the last response, sent back as a conditional GET
+    http_etag = Column(String(255))
+    http_last_modified = Column(String(64))
+
+    # Denormalized from the latest ArticleVersion (maintained by ScraperService).
+    # No foreign key, to avoid a circular dependency with article_versions.
+    latest_version_id = Column(Integer)
+    latest_content_hash = Column(String(64))
+    latest_word_count = Column(Integer)
+    latest_fingerprint = Column(String(64))
+    latest_simhash = Column(String(16))
+    # Extractor that produced the latest_* hashes (NULL: LEGACY_EXTRACTOR_ID). Differs
+    # from the latest version's after a re-baseline to a new extractor.
+    extractor_id = Column(String(32))
+
     # Relationships
     source = relationship("NewsSource", back_populates="articles")
     versions = relationship(
@@ -33,4 +54,5 @@ class Article(Base):
     __table_args__ = (
         Index('idx_article_source_active', 'source_id', 'is_active'),
         Index('idx_article_last_checked', 'last_checked_at'),
+        Index('idx_article_due', 'source_id', 'is_active', 'next_check_at'),
     )
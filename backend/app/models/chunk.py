@@ -0,0 +1,20 @@
+"""Content chunk model."""
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models.types import CompressedText
+
+
+class ContentChunk(Base):
+    """Paragraph of version text, stored once and shared across versions."""
+
+    __tablename__ = "content_chunks"
+
+    hash = Column(String(64), primary_key=True)  # SHA256 of the paragraph text
+    text = Column(CompressedText, nullable=False)
+    refcount = Column(Integer, default=0, nullable=False)  # versions referencing this chunk
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_chunk_refcount', 'refcount'),
+    )
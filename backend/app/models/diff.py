@@ -0,0 +1,29 @@
+"""Article diff model."""
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ArticleDiff(Base):
+    """Word diff between two versions of an article, computed once and served from here.
+
+    Consecutive versions are word-diffed when the newer one is written;
+    other pairs and modes are added the first time they are requested.
+    """
+
+    __tablename__ = "article_diffs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
+    from_version = Column(Integer, nullable=False)
+    to_version = Column(Integer, nullable=False)
+    mode = Column(String(20), nullable=False, default='word')  # 'word' or 'hierarchical'
+    algorithm = Column(String(20), nullable=False)  # diff_service.DIFF_ALGORITHM that produced it
+    changes = Column(JSON, nullable=False)  # DiffChange dicts
+    words_added = Column(Integer, default=0)
+    words_removed = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_diff_versions_mode', 'article_id', 'from_version', 'to_version', 'mode', unique=True),
+    )
@@ -0,0 +1,21 @@
+"""Feed cache model."""
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.database import Base
+
+
+class FeedCache(Base):
+    """Per-feed HTTP validators and last parsed entry URLs."""
+
+    __tablename__ = "feed_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(500), unique=True, nullable=False, index=True)
+    etag = Column(String(255))
+    last_modified = Column(String(100))
+    body_hash = Column(String(64))  # SHA256 of last response body
+    entries = Column(JSON, default=list)  # [url, published ISO date or null] in feed order
+    fetched_at = Column(DateTime(timezone=True))
+
+    # Cache counters (hit = 304 or identical body, miss = body re-parsed)
+    hit_count = Column(Integer, default=0)
+    miss_count = Column(Integer, default=0)
@@ -1,5 +1,5 @@
 """News source model."""
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -18,7 +18,14 @@ class NewsSource(Base):
     scrape_interval_active = Column(Integer, default=15)  # minutes
     scrape_interval_archive = Column(Integer, default=60)  # minutes
     max_articles_per_scrape = Column(Integer, default=50)
+    rate_limit_per_second = Column(Float, default=2.0)  # token bucket refill rate
+    rate_limit_burst = Column(Integer, default=4)  # token bucket size
     country = Column(String(50), nullable=True)  # Country code or name
+    boilerplate_patterns = Column(JSON)  # regexes ignored by the content fingerprint (added to the scraper's)
+    head_probe = Column(Boolean, default=False)  # HEAD before GET, for servers that ignore conditional requests
+    # Article conditional GETs sent and answered with 304 (how well the server honors validators)
+    conditional_requests = Column(Integer, default=0)
+    not_modified_responses = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -0,0 +1,104 @@
+"""Custom column types."""
+from functools import lru_cache
+from typing import Optional, Union
+import logging
+import zlib
+from sqlalchemy.types import TypeDecorator, LargeBinary
+from app.config import settings
+from app.utils.compression import load_zstandard
+
+logger = logging.getLogger(__name__)
+
+# Compressed values start with NUL and a format tag. Anything else is plain
+# UTF-8: uncompressed writes, and legacy rows (which SQLite may still return
+# as str from the old TEXT storage).
+ZLIB_TAG = b'\x00z'
+ZSTD_TAG = b'\x00s'
+ZSTD_DICT_TAG = b'\x00d'
+
+
+@lru_cache(maxsize=4)
+def _load_dictionary(path: str):
+    zstandard = load_zstandard()
+    with open(path, 'rb') as f:
+        return zstandard.ZstdCompressionDict(f.read())
+
+
+@lru_cache(maxsize=1)
+def _warn_zstd_missing():
+    logger.warning("VERSION_COMPRESSION=zstd but the 'zstandard' package is not installed, using zlib")
+
+
+def compress_text(text: str, method: Optional[str] = None) -> bytes:
+    """Encode text for storage using the given (default: configured) compression."""
+    data = text.encode('utf-8')
+    method = method or settings.VERSION_COMPRESSION
+    if method == 'zstd' and load_zstandard() is None:
+        _warn_zstd_missing()
+        method = 'zlib'
+
+    if method == 'zstd':
+        if settings.VERSION_COMPRESSION_DICT:
+            dictionary = _load_dictionary(settings.VERSION_COMPRESSION_DICT)
+            compressor = load_zstandard().ZstdCompressor(level=settings.VERSION_COMPRESSION_LEVEL, dict_data=dictionary)
+            return ZSTD_DICT_TAG + compressor.compress(data)
+        compressor = load_zstandard().ZstdCompressor(level=settings.VERSION_COMPRESSION_LEVEL)
+        return ZSTD_TAG + compressor.compress(data)
+    if method == 'zlib':
+        return ZLIB_TAG + zlib.compress(data, settings.VERSION_COMPRESSION_LEVEL)
+    return data
+
+
+def decompress_text(value: Union[bytes, str]) -> str:
+    """Decode a stored value written by compress_text (or legacy plain text)."""
+    if isinstance(value, str):
+        return value
+    value = bytes(value)
+    tag, payload = value[:2], value[2:]
+    if tag == ZLIB_TAG:
+        return zlib.decompress(payload).decode('utf-8')
+    if tag in (ZSTD_TAG, ZSTD_DICT_TAG):
+        zstandard = load_zstandard()
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd-compressed but the 'zstandard' package is not installed")
+        if tag == ZSTD_DICT_TAG:
+            if not settings.VERSION_COMPRESSION_DICT:
+                raise RuntimeError("Stored value needs the zstd dictionary but VERSION_COMPRESSION_DICT is not set")
+            decompressor = zstandard.ZstdDecompressor(dict_data=_load_dictionary(settings.VERSION_COMPRESSION_DICT))
+        else:
+            decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(payload).decode('utf-8')
+    return value.decode('utf-8')
+
+
+def compression_of(value: Union[bytes, str, None]) -> Optional[str]:
+    """Return the compression of a raw stored value ('zlib', 'zstd' or None)."""
+    if not isinstance(value, (bytes, memoryview)):
+        return None
+    tag = bytes(value[:2])
+    if tag == ZLIB_TAG:
+        return 'zlib'
+    if tag in (ZSTD_TAG, ZSTD_DICT_TAG):
+        return 'zstd'
+    return None
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as (optionally) compressed bytes.
+
+    Compresses on write with VERSION_COMPRESSION and decompresses when
+    rows are loaded, so ORM code sees plain strings either way.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -1,8 +1,9 @@
 """Article version model."""
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UniqueConstraint, Index, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.models.types import CompressedText
 
 
 class ArticleVersion(Base):
@@ -15,13 +16,19 @@ class ArticleVersion(Base):
     version_number = Column(Integer, nullable=False)
     title = Column(Text)
     byline = Column(String(255))  # Author
-    content = Column(Text, nullable=False)
+    content = Column(CompressedText, nullable=False)  # empty for delta- or chunk-stored versions
+    delta = Column(JSON(none_as_null=True))  # [[start, end, text], ...] token edits against the previous version
+    chunk_hashes = Column(JSON(none_as_null=True))  # ordered paragraph hashes into content_chunks
     content_hash = Column(String(64), nullable=False)  # SHA256
+    fingerprint = Column(String(64))  # SHA256 of boilerplate-stripped, normalized text
+    simhash = Column(String(16))  # 64-bit SimHash (hex) of the same text
     captured_at = Column(DateTime(timezone=True), server_default=func.now())
     word_count = Column(Integer)
+    raw_html_hash = Column(String(64))  # key of the fetched page in the HTML archive, if enabled
+    extractor_id = Column(String(32))  # BaseScraper.extractor_id that produced the text (NULL: LEGACY_EXTRACTOR_ID)
 
     # Metadata
-    meta_description = Column(Text)
+    meta_description = Column(CompressedText)
     meta_keywords = Column(String(500))
     published_date = Column(DateTime(timezone=True))
     modified_date = Column(DateTime(timezone=True))
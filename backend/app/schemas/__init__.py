@@ -6,7 +6,7 @@ from app.schemas.article import (
     PaginatedArticlesResponse
 )
 from app.schemas.version import ArticleVersionResponse, ArticleVersionSummary
-from app.schemas.diff import DiffResponse, DiffChange, DiffStats
+from app.schemas.diff import DiffResponse, CompactDiffResponse, DiffChange, DiffStats, TimelineStep
 
 __all__ = [
     "NewsSourceResponse",
@@ -16,6 +16,8 @@ __all__ = [
     "ArticleVersionResponse",
     "ArticleVersionSummary",
     "DiffResponse",
+    "CompactDiffResponse",
     "DiffChange",
     "DiffStats",
+    "TimelineStep",
 ]
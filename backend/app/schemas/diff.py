@@ -1,7 +1,10 @@
 """Diff schemas."""
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Literal, Dict, Any
+from typing import List, Literal, Dict, Any, Optional, Union
+
+DiffMode = Literal['word', 'hierarchical']
+DiffFormat = Literal['full', 'compact']
 
 
 class DiffChange(BaseModel):
@@ -9,6 +12,8 @@ class DiffChange(BaseModel):
     type: Literal['delete', 'insert', 'equal']
     content: List[str]
     position: int
+    # Unit that changed (hierarchical mode only): whole paragraphs, whole sentences or words
+    level: Optional[Literal['paragraph', 'sentence', 'word']] = None
 
 
 class DiffStats(BaseModel):
@@ -36,3 +41,32 @@ class DiffResponse(BaseModel):
     title_diff: Dict[str, Any]
     content_diff: List[DiffChange]
     stats: DiffStats
+    mode: DiffMode = 'word'
+
+
+class CompactDiffResponse(BaseModel):
+    """Diff response with changes as word offsets instead of word lists.
+
+    Each change is [op, start, end] (plus the level in hierarchical mode):
+    'd' deletes words start:end of the from_version text, 'i' inserts
+    words start:end of the to_version text. Offsets index text.split()
+    of the version content, which clients already have.
+    """
+    article_id: int
+    from_version: VersionInfo
+    to_version: VersionInfo
+    title_diff: Dict[str, Any]
+    changes: List[List[Union[str, int]]]
+    stats: DiffStats
+    mode: DiffMode = 'word'
+
+
+class TimelineStep(BaseModel):
+    """Diff between two consecutive versions; one line of the timeline stream."""
+    from_version: VersionInfo
+    to_version: VersionInfo
+    title_diff: Dict[str, Any]
+    stats: DiffStats
+    # Omitted when only stats were requested
+    content_diff: Optional[List[DiffChange]] = None
+    mode: DiffMode = 'word'
@@ -1,7 +1,7 @@
 """News source schemas."""
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class NewsSourceBase(BaseModel):
@@ -13,7 +13,11 @@ class NewsSourceBase(BaseModel):
     scrape_interval_active: int
     scrape_interval_archive: int
     max_articles_per_scrape: int
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
     country: Optional[str] = None
+    boilerplate_patterns: Optional[List[str]] = None
+    head_probe: Optional[bool] = None
 
 
 class NewsSourceResponse(NewsSourceBase):
@@ -21,6 +25,8 @@ class NewsSourceResponse(NewsSourceBase):
     id: int
     created_at: datetime
     article_count: Optional[int] = 0
+    conditional_requests: Optional[int] = 0
+    not_modified_responses: Optional[int] = 0
 
     class Config:
         from_attributes = True
@@ -1,10 +1,11 @@
 """Scrapers for different news sources."""
-from app.scrapers.base import BaseScraper
+from app.scrapers.base import BaseScraper, DiscoveredArticle
 from app.scrapers.svt import SVTNyheterScraper
 from app.scrapers.generic import GenericRSSScraper
 
 __all__ = [
     "BaseScraper",
+    "DiscoveredArticle",
     "SVTNyheterScraper",
     "GenericRSSScraper"
 ]
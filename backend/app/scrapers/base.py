@@ -1,41 +1,113 @@
 """Base scraper abstract class."""
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Optional, Dict, Tuple
+from datetime import datetime, timedelta, timezone
 import asyncio
+import hashlib
 import re
 import httpx
-import trafilatura
 import feedparser
-from bs4 import BeautifulSoup
-from datetime import datetime
 from app.config import settings
+from app.scrapers.feed_cache import FeedValidatorCache
+from app.scrapers.rate_limiter import rate_limiter
+from app.scrapers.http_pool import http_pool
+from app.scrapers.extraction import extraction_executor, extract_article
 import xml.etree.ElementTree as ET
 
 
-def _clean_text(text: str) -> str:
-    """Clean and normalize text."""
-    if not text:
-        return ""
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
-    # Remove leading/trailing whitespace
-    return text.strip()
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag name."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_w3c_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a sitemap lastmod / publication_date value as an aware datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _feed_entry_date(entry) -> Optional[datetime]:
+    """Get the published (or updated) date of a feed entry as an aware datetime."""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    if not parsed:
+        return None
+    return datetime(*parsed[:6], tzinfo=timezone.utc)
+
+
+@dataclass
+class DiscoveredArticle:
+    """Article URL found during discovery, with hints for prioritization."""
+    url: str
+    feed_position: Optional[int] = None  # best (lowest) index across feeds
+    published: Optional[datetime] = None  # pubDate or sitemap lastmod
+
+
+# Extractor of articles stored before extractor ids were recorded
+LEGACY_EXTRACTOR_ID = 'generic-1'
 
 
 class BaseScraper(ABC):
     """Abstract base class for all news scrapers."""
 
+    # Extraction noise ignored when fingerprinting content (see services/fingerprint.py)
+    boilerplate_patterns: List[str] = [
+        r'^(läs|se) (mer|också|även)\b.*$',
+        r'^(publicerad|uppdaterad|publicerat|uppdaterat)\b.*$',
+        r'^(dela|dela artikeln|kopiera länk)$',
+        r'^(relaterat|fler artiklar|mer om)\b.*$',
+    ]
+
+    # Page extraction function, html bytes -> article fields. Must be a
+    # module-level function so it can run in an extraction worker process.
+    extractor: Callable[[bytes], Dict] = staticmethod(extract_article)
+    # Identifies the extractor's output; change it whenever the extracted text
+    # changes, so tracked articles are re-baselined rather than given a new
+    # version that only reflects the extractor (see ScraperService)
+    extractor_id: str = 'generic-1'
+
+    # Per-request noise removed from the raw HTML before hashing it, so a
+    # page that only differs in these is recognized as identical
+    volatile_html_patterns: List[bytes] = [
+        rb'<!--.*?-->',
+        rb'\snonce="[^"]*"',
+        rb'<meta\s+name="csrf[^"]*"[^>]*>',
+        rb'<input\s+type="hidden"\s+name="[^"]*token[^"]*"[^>]*>',
+    ]
+
     def __init__(self, source_name: str):
         self.source_name = source_name
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={
-                'User-Agent': settings.USER_AGENT,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'sv-SE,sv;q=0.9,en;q=0.8',
-            },
-            follow_redirects=True
-        )
+        self._volatile_html = [
+            re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in self.volatile_html_patterns
+        ]
+        # Borrow pooled per-host clients instead of opening new connections;
+        # the pool outlives scrapers and is closed at app shutdown
+        self.client = http_pool
+        self.feed_cache = FeedValidatorCache()
+        self.request_count = 0
+        # Article validator statistics for the run
+        self.conditional_requests = 0
+        self.not_modified = 0
+        self.head_probes = 0
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """GET a URL once the per-host rate limiter grants a slot."""
+        await rate_limiter.acquire(url)
+        self.request_count += 1
+        return await self.client.get(url, **kwargs)
+
+    async def _head(self, url: str, **kwargs) -> httpx.Response:
+        """HEAD a URL once the per-host rate limiter grants a slot."""
+        await rate_limiter.acquire(url)
+        self.request_count += 1
+        return await self.client.head(url, **kwargs)
 
     @abstractmethod
     def get_rss_urls(self) -> List[str]:
@@ -78,15 +150,32 @@ class BaseScraper(ABC):
 
         return False
 
-    async def discover_articles(self, limit: int = 50, concurrent_feeds: int = 8) -> List[str]:
-        """Discover article URLs from RSS/sitemap with concurrent feed fetching."""
-        urls = []
+    async def discover_candidates(self, concurrent_feeds: int = 8) -> List[DiscoveredArticle]:
+        """Discover article URLs from RSS/sitemap with feed position and dates.
+
+        URLs found in several feeds (or also in the sitemap) are merged,
+        keeping the best feed position and the newest date.
+        """
+        candidates: Dict[str, DiscoveredArticle] = {}
+
+        def add(url: str, position: Optional[int], published: Optional[datetime]):
+            if not self.is_article_url(url) or self.is_live_article(url):
+                return
+            candidate = candidates.get(url)
+            if candidate is None:
+                candidates[url] = DiscoveredArticle(url, position, published)
+                return
+            if position is not None and (candidate.feed_position is None or position < candidate.feed_position):
+                candidate.feed_position = position
+            if published and (candidate.published is None or published > candidate.published):
+                candidate.published = published
+
         feed_urls = self.get_rss_urls()
 
         # Create semaphore to limit concurrent requests
         semaphore = asyncio.Semaphore(concurrent_feeds)
 
-        async def fetch_feed_with_limit(feed_url: str) -> List[str]:
+        async def fetch_feed_with_limit(feed_url: str) -> List[Tuple[str, Optional[datetime]]]:
             async with semaphore:
                 try:
                     return await self._parse_rss(feed_url)
@@ -97,237 +186,243 @@ class BaseScraper(ABC):
         # Fetch all RSS feeds concurrently (limited by semaphore)
         results = await asyncio.gather(*[fetch_feed_with_limit(url) for url in feed_urls])
 
-        # Flatten results
-        for feed_urls_list in results:
-            urls.extend(feed_urls_list)
+        for feed_entries in results:
+            for position, (url, published) in enumerate(feed_entries):
+                add(url, position, published)
 
-        # Also try sitemap if available
+        # Also try sitemap if available, skipping entries older than the horizon
         sitemap_url = self.get_sitemap_url()
         if sitemap_url:
+            since = None
+            if settings.SITEMAP_MAX_AGE_HOURS:
+                since = datetime.now(timezone.utc) - timedelta(hours=settings.SITEMAP_MAX_AGE_HOURS)
+            sitemap_count = 0
             try:
-                sitemap_urls = await self._parse_sitemap(sitemap_url)
-                urls.extend(sitemap_urls)
-                print(f"Discovered {len(sitemap_urls)} URLs from sitemap")
+                async for url, lastmod in self._iter_sitemap(sitemap_url, since=since):
+                    add(url, None, lastmod)
+                    sitemap_count += 1
             except Exception as e:
                 print(f"Error parsing sitemap {sitemap_url}: {e}")
+            print(f"Discovered {sitemap_count} URLs from sitemap")
 
-        # Filter to valid article URLs and deduplicate
-        urls = list(set([u for u in urls if self.is_article_url(u) and not self.is_live_article(u)]))
+        return list(candidates.values())
 
-        return urls[:limit]
+    async def discover_articles(self, limit: int = 50, concurrent_feeds: int = 8) -> List[str]:
+        """Discover article URLs, best feed position and newest first."""
+        candidates = await self.discover_candidates(concurrent_feeds)
+        candidates.sort(key=lambda c: (
+            c.feed_position if c.feed_position is not None else float('inf'),
+            -(c.published.timestamp() if c.published else 0)
+        ))
+        return [c.url for c in candidates[:limit]]
+
+    def html_hash(self, body: bytes) -> str:
+        """Generate SHA256 hash of a page body with volatile markup removed."""
+        for pattern in self._volatile_html:
+            body = pattern.sub(b'', body)
+        return hashlib.sha256(body).hexdigest()
 
-    async def fetch_article(self, url: str) -> Dict:
-        """Fetch and extract article content."""
-        await asyncio.sleep(1.0)  # Rate limit: 1 second between requests
+    @staticmethod
+    def _validators_match(response: httpx.Response, etag: Optional[str], last_modified: Optional[str]) -> bool:
+        """Check if a response carries the same validators as stored."""
+        response_etag = response.headers.get('etag')
+        if etag and response_etag:
+            # Weak comparison, as for If-None-Match
+            return response_etag.removeprefix('W/') == etag.removeprefix('W/')
+        response_last_modified = response.headers.get('last-modified')
+        return bool(last_modified and response_last_modified == last_modified)
+
+    async def fetch_article(
+        self,
+        url: str,
+        previous_html_hash: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        head_probe: bool = False
+    ) -> Dict:
+        """Fetch and extract article content.
+
+        - With stored validators (`etag`, `last_modified`) the GET is
+          conditional, and a 304 returns {'not_modified': True, ...}.
+        - With `head_probe`, a HEAD request is made first and the GET is
+          skipped if it returns the stored validators, for servers that
+          send validators but ignore conditional requests.
+        - When the page hashes to `previous_html_hash`, extraction is
+          skipped and {'html_unchanged': True, ...} is returned.
+
+        Every result carries the 'html_hash' (if downloaded) and the
+        'etag' and 'last_modified' validators to store for the next check.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
 
         try:
-            response = await self.client.get(url)
+            if head_probe and headers:
+                self.head_probes += 1
+                response = await self._head(url)
+                if response.status_code == 200 and self._validators_match(response, etag, last_modified):
+                    return {'not_modified': True, 'etag': etag, 'last_modified': last_modified}
+
+            response = await self._get(url, headers=headers)
+            if headers:
+                self.conditional_requests += 1
+            if response.status_code == 304:
+                self.not_modified += 1
+                # A 304 may omit validators that did not change
+                return {
+                    'not_modified': True,
+                    'etag': response.headers.get('etag') or etag,
+                    'last_modified': response.headers.get('last-modified') or last_modified,
+                }
             response.raise_for_status()
-            html = response.text
-
-            # Extract content using trafilatura
-            content = trafilatura.extract(
-                html,
-                include_comments=False,
-                include_tables=False,
-                no_fallback=False,
-                favor_recall=True  # Get more content rather than being too strict
-            )
-
-            if not content or len(content) < 100:
-                # Fallback: try custom extraction
-                content = self._custom_extract(html)
+            validators = {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+            }
 
-            # Extract metadata
-            soup = BeautifulSoup(html, 'html.parser')
+            html_hash = self.html_hash(response.content)
+            if previous_html_hash and html_hash == previous_html_hash:
+                return {'html_hash': html_hash, 'html_unchanged': True, **validators}
 
-            title = _clean_text(self._extract_title(soup))
+            # Parse off the event loop so API requests are not stalled
+            article_data = await extraction_executor.run(self.extractor, response.content)
 
             # Check if this is a live article based on title
-            if self.is_live_article(url, title):
-                raise ValueError(f"Skipping live/updating article: {title}")
-
-            return {
-                'title': title,
-                'content': _clean_text(content) if content else "",
-                'byline': _clean_text(self._extract_byline(soup)),
-                'published_date': self._extract_published_date(soup),
-                'modified_date': self._extract_modified_date(soup),
-                'meta_description': _clean_text(self._extract_meta_description(soup)),
-                'meta_keywords': self._extract_meta_keywords(soup)
-            }
+            if self.is_live_article(url, article_data['title']):
+                raise ValueError(f"Skipping live/updating article: {article_data['title']}")
+
+            # Keep the response body so versions can be archived (see html_archive)
+            article_data['raw_html'] = response.content
+            article_data['html_hash'] = html_hash
+            article_data['extractor_id'] = self.extractor_id
+            article_data.update(validators)
+            return article_data
         except Exception as e:
             print(f"Error fetching {url}: {e}")
             raise
 
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        """Extract article title."""
-        # Try OpenGraph first
-        og_title = soup.find('meta', property='og:title')
-        if og_title and og_title.get('content'):
-            return og_title.get('content', '')
-
-        # Try Twitter card
-        twitter_title = soup.find('meta', {'name': 'twitter:title'})
-        if twitter_title and twitter_title.get('content'):
-            return twitter_title.get('content', '')
-
-        # Fallback to <title>
-        title = soup.find('title')
-        return title.text.strip() if title else ''
-
-    def _extract_byline(self, soup: BeautifulSoup) -> str:
-        """Extract article author/byline."""
-        # Try schema.org author markup (itemProp="author") - most accurate for SVT
-        authors = []
-        author_elements = soup.find_all(attrs={'itemprop': 'author'})
-        for elem in author_elements:
-            author_text = elem.get_text(strip=True)
-            if author_text and author_text not in authors:
-                authors.append(author_text)
-
-        if authors:
-            # Join multiple authors with "och" for Swedish articles
-            if len(authors) == 2:
-                return f"{authors[0]} och {authors[1]}"
-            elif len(authors) > 2:
-                return ", ".join(authors[:-1]) + f" och {authors[-1]}"
-            return authors[0]
-
-        # Fallback: Try common author meta tags
-        author_meta = soup.find('meta', {'name': 'author'})
-        if author_meta and author_meta.get('content'):
-            content = author_meta.get('content', '')
-            # Skip generic source names like "SVT Nyheter" as they're not actual authors
-            if content and content not in ['SVT Nyheter', 'SVT', 'Sveriges Television']:
-                return content
-
-        # Try article:author
-        article_author = soup.find('meta', property='article:author')
-        if article_author and article_author.get('content'):
-            return article_author.get('content', '')
-
-        return ''
-
-    def _extract_published_date(self, soup: BeautifulSoup) -> Optional[datetime]:
-        """Extract published date."""
-        # Try article:published_time
-        published = soup.find('meta', property='article:published_time')
-        if published and published.get('content'):
-            try:
-                return datetime.fromisoformat(published['content'].replace('Z', '+00:00'))
-            except:
-                pass
-
-        return None
-
-    def _extract_modified_date(self, soup: BeautifulSoup) -> Optional[datetime]:
-        """Extract modified date."""
-        # Try article:modified_time
-        modified = soup.find('meta', property='article:modified_time')
-        if modified and modified.get('content'):
-            try:
-                return datetime.fromisoformat(modified['content'].replace('Z', '+00:00'))
-            except:
-                pass
-
-        return None
-
-    def _extract_meta_description(self, soup: BeautifulSoup) -> str:
-        """Extract meta description."""
-        desc = soup.find('meta', {'name': 'description'})
-        if desc and desc.get('content'):
-            return desc.get('content', '')
-
-        og_desc = soup.find('meta', property='og:description')
-        if og_desc and og_desc.get('content'):
-            return og_desc.get('content', '')
-
-        return ''
-
-    def _extract_meta_keywords(self, soup: BeautifulSoup) -> str:
-        """Extract meta keywords."""
-        keywords = soup.find('meta', {'name': 'keywords'})
-        if keywords and keywords.get('content'):
-            return keywords.get('content', '')
-
-        return ''
-
-    def _custom_extract(self, html: str) -> str:
-        """Custom content extraction fallback."""
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-
-        # Try to find article content
-        article = soup.find('article')
-        if article:
-            return article.get_text(separator=' ', strip=True)
-
-        # Fallback to body
-        body = soup.find('body')
-        if body:
-            return body.get_text(separator=' ', strip=True)
-
-        return ''
+    async def _parse_rss(self, feed_url: str) -> List[Tuple[str, Optional[datetime]]]:
+        """Parse RSS feed and extract (article URL, published date) in feed order."""
+        try:
+            response = await self._get(
+                feed_url,
+                headers=self.feed_cache.request_headers(feed_url)
+            )
+            etag = response.headers.get('etag')
+            last_modified = response.headers.get('last-modified')
 
-    async def _parse_rss(self, feed_url: str) -> List[str]:
-        """Parse RSS feed and extract article URLs."""
-        await asyncio.sleep(0.5)  # Rate limit: 0.5 seconds between requests
+            # Not modified since last run: reuse previously parsed URLs
+            if response.status_code == 304 and self.feed_cache.has(feed_url):
+                return self.feed_cache.hit(feed_url, etag, last_modified)
 
-        try:
-            response = await self.client.get(feed_url)
             response.raise_for_status()
 
-            feed = feedparser.parse(response.text)
-            return [entry.link for entry in feed.entries if hasattr(entry, 'link')]
+            # Server ignored validators but the body is unchanged: skip parsing
+            body_hash = self.feed_cache.body_hash(response.content)
+            if self.feed_cache.has(feed_url, body_hash):
+                return self.feed_cache.hit(feed_url, etag, last_modified)
+
+            feed = feedparser.parse(response.content)
+            entries = [
+                (entry.link, _feed_entry_date(entry))
+                for entry in feed.entries if hasattr(entry, 'link')
+            ]
+            self.feed_cache.miss(feed_url, body_hash, entries, etag, last_modified)
+            return entries
         except Exception as e:
             print(f"Error parsing RSS {feed_url}: {e}")
             return []
 
-    async def _parse_sitemap(self, sitemap_url: str) -> List[str]:
-        """Parse sitemap and extract article URLs."""
-        await asyncio.sleep(0.5)  # Rate limit: 0.5 seconds between requests
+    async def _iter_sitemap(
+        self,
+        sitemap_url: str,
+        since: Optional[datetime] = None,
+        max_sub_sitemaps: int = 10
+    ) -> AsyncIterator[Tuple[str, Optional[datetime]]]:
+        """Stream (url, lastmod) pairs from a sitemap or sitemap index.
+
+        Entries (and sub-sitemaps) with a lastmod older than `since` are
+        skipped. Sub-sitemaps of an index are fetched concurrently, each
+        request going through the per-host rate limiter, and their
+        entries are yielded as they arrive.
+        """
+        sub_sitemaps = []
+        async for kind, loc, lastmod in self._stream_sitemap_entries(sitemap_url):
+            if since and lastmod and lastmod < since:
+                continue
+            if kind == 'sitemap':
+                if len(sub_sitemaps) < max_sub_sitemaps:
+                    sub_sitemaps.append(loc)
+            else:
+                yield loc, lastmod
 
-        try:
-            response = await self.client.get(sitemap_url)
-            response.raise_for_status()
+        if not sub_sitemaps:
+            return
 
-            urls = []
-            root = ET.fromstring(response.text)
-
-            # Handle sitemap index (points to other sitemaps)
-            namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-
-            # Check if this is a sitemap index
-            sitemaps = root.findall('.//ns:sitemap/ns:loc', namespace)
-            if sitemaps:
-                # This is a sitemap index, fetch each sitemap
-                for sitemap_elem in sitemaps[:10]:  # Limit to first 10 sitemaps
-                    sub_sitemap_url = sitemap_elem.text
-                    if sub_sitemap_url:
-                        try:
-                            sub_response = await self.client.get(sub_sitemap_url)
-                            sub_response.raise_for_status()
-                            sub_root = ET.fromstring(sub_response.text)
-                            sub_urls = sub_root.findall('.//ns:url/ns:loc', namespace)
-                            urls.extend([url.text for url in sub_urls if url.text])
-                            await asyncio.sleep(0.5)
-                        except Exception as e:
-                            print(f"Error parsing sub-sitemap {sub_sitemap_url}: {e}")
-                            continue
-            else:
-                # This is a regular sitemap
-                url_elements = root.findall('.//ns:url/ns:loc', namespace)
-                urls = [url.text for url in url_elements if url.text]
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
 
-            return urls
-        except Exception as e:
-            print(f"Error parsing sitemap {sitemap_url}: {e}")
-            return []
+        async def read_sub_sitemap(sub_sitemap_url: str):
+            try:
+                async for kind, loc, lastmod in self._stream_sitemap_entries(sub_sitemap_url):
+                    if kind == 'url' and not (since and lastmod and lastmod < since):
+                        await queue.put((loc, lastmod))
+            except Exception as e:
+                print(f"Error parsing sub-sitemap {sub_sitemap_url}: {e}")
+            finally:
+                await queue.put(None)
 
-    async def close(self):
-        """Close HTTP client."""
-        await self.client.aclose()
+        tasks = [asyncio.create_task(read_sub_sitemap(url)) for url in sub_sitemaps]
+        try:
+            finished = 0
+            while finished < len(tasks):
+                item = await queue.get()
+                if item is None:
+                    finished += 1
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _stream_sitemap_entries(
+        self,
+        sitemap_url: str
+    ) -> AsyncIterator[Tuple[str, str, Optional[datetime]]]:
+        """Incrementally parse a sitemap into ('url' | 'sitemap', loc, lastmod) tuples."""
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root = None
+
+        await rate_limiter.acquire(sitemap_url)
+        self.request_count += 1
+        async with self.client.stream('GET', sitemap_url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        if root is None:
+                            root = elem
+                        continue
+
+                    kind = _local_name(elem.tag)
+                    if kind not in ('url', 'sitemap'):
+                        continue
+
+                    # Only direct children in the entry's own namespace, so an
+                    # <image:loc> or <video:...> inside it can't stand in for them
+                    namespace = elem.tag[:-len(kind)]
+                    loc = (elem.findtext(namespace + 'loc') or '').strip()
+                    lastmod = _parse_w3c_datetime(elem.findtext(namespace + 'lastmod'))
+                    if lastmod is None:
+                        # News sitemaps date entries in <news:news><news:publication_date>
+                        for child in elem:
+                            if _local_name(child.tag) == 'news':
+                                lastmod = _parse_w3c_datetime(child.findtext(child.tag[:-4] + 'publication_date'))
+
+                    # Processed entries are dropped so memory stays flat
+                    root.clear()
+                    if loc:
+                        yield kind, loc, lastmod
@@ -0,0 +1,380 @@
+"""HTML extraction, run off the event loop by ExtractionExecutor."""
+from typing import Callable, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import logging
+import multiprocessing
+import json
+import os
+import re
+import signal
+import trafilatura
+from copy import deepcopy
+from datetime import datetime
+from lxml import etree
+from lxml.html import HtmlElement
+from trafilatura.utils import load_html
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EMPTY_ARTICLE = {
+    'title': '',
+    'content': '',
+    'byline': '',
+    'published_date': None,
+    'modified_date': None,
+    'meta_description': '',
+    'meta_keywords': ''
+}
+
+# One C-level traversal for every element the metadata pass cares about
+METADATA_XPATH = etree.XPath(
+    '//meta | //title | //*[@itemprop="author"] | //script[@type="application/ld+json"]'
+)
+
+# Skip generic source names like "SVT Nyheter" as they're not actual authors
+GENERIC_AUTHORS = ['SVT Nyheter', 'SVT', 'Sveriges Television']
+
+JSON_LD_ARTICLE_TYPES = {'NewsArticle', 'Article', 'ReportageNewsArticle', 'AnalysisNewsArticle'}
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text."""
+    if not text:
+        return ""
+    # Remove excessive whitespace
+    text = re.sub(r'\s+', ' ', text)
+    # Remove leading/trailing whitespace
+    return text.strip()
+
+
+def _clean_content(text: str) -> str:
+    """Normalize whitespace within paragraphs, keeping one blank line between them."""
+    paragraphs = (clean_text(line) for line in text.split('\n'))
+    return '\n\n'.join(p for p in paragraphs if p)
+
+
+def extract_article(html: bytes) -> Dict:
+    """Extract article content and metadata from raw HTML.
+
+    The page is parsed once with lxml; the same tree feeds the metadata
+    pass, trafilatura and the fallback extractor. Module-level (and
+    therefore picklable) so it can run in a worker process.
+    """
+    tree = load_html(html)
+    if tree is None:
+        return dict(EMPTY_ARTICLE)
+
+    # Metadata first: trafilatura prunes the tree it is given
+    metadata = collect_metadata(tree)
+    return build_article(metadata, extract_content(tree))
+
+
+def extract_content(tree: HtmlElement) -> str:
+    """Extract the article body with trafilatura, falling back to a simple text dump."""
+    # Extract content using trafilatura (on a copy, keeping the original for the fallback)
+    content = trafilatura.extract(
+        deepcopy(tree),
+        include_comments=False,
+        include_tables=False,
+        no_fallback=False,
+        favor_recall=True  # Get more content rather than being too strict
+    )
+
+    if not content or len(content) < 100:
+        # Fallback: try custom extraction
+        content = _custom_extract(tree)
+
+    return content or ''
+
+
+def build_article(metadata: Dict, content: str) -> Dict:
+    """Assemble the article fields from collected metadata and extracted content."""
+    return {
+        'title': clean_text(_extract_title(metadata)),
+        'content': _clean_content(content) if content else "",
+        'byline': clean_text(_extract_byline(metadata)),
+        'published_date': _extract_date(metadata, 'article:published_time', 'datePublished'),
+        'modified_date': _extract_date(metadata, 'article:modified_time', 'dateModified'),
+        'meta_description': clean_text(_extract_meta_description(metadata)),
+        'meta_keywords': metadata['meta'].get(('name', 'keywords')) or ''
+    }
+
+
+def collect_metadata(tree: HtmlElement) -> Dict:
+    """Collect og:*, twitter:*, article:*, itemprop=author and JSON-LD in one pass.
+
+    Returns {'meta': {(attr, key): content}, 'title', 'authors', 'json_ld'}
+    where only the first occurrence of each meta key is kept.
+    """
+    metadata = {'meta': {}, 'title': None, 'authors': [], 'json_ld': {}}
+
+    for elem in METADATA_XPATH(tree):
+        tag = elem.tag
+        if tag == 'meta':
+            for attr in ('property', 'name'):
+                key = elem.get(attr)
+                if key and (attr, key) not in metadata['meta']:
+                    metadata['meta'][(attr, key)] = elem.get('content')
+        elif tag == 'title':
+            if metadata['title'] is None:
+                metadata['title'] = elem.text_content()
+        elif tag == 'script':
+            if not metadata['json_ld']:
+                metadata['json_ld'] = _find_json_ld_article(elem.text)
+
+        if elem.get('itemprop') == 'author':
+            author_text = ''.join(text.strip() for text in elem.itertext())
+            if author_text and author_text not in metadata['authors']:
+                metadata['authors'].append(author_text)
+
+    return metadata
+
+
+def _find_json_ld_article(text: Optional[str]) -> Dict:
+    """Return the first article object in a JSON-LD script, if any."""
+    try:
+        data = json.loads(text or '')
+    except ValueError:
+        return {}
+
+    stack = [data]
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            types = item.get('@type')
+            types = types if isinstance(types, list) else [types]
+            if JSON_LD_ARTICLE_TYPES.intersection(t for t in types if isinstance(t, str)):
+                return item
+            if '@graph' in item:
+                stack.append(item['@graph'])
+    return {}
+
+
+def json_ld_names(value) -> list:
+    """Get person names from a JSON-LD author value."""
+    values = value if isinstance(value, list) else [value]
+    names = []
+    for item in values:
+        name = item.get('name') if isinstance(item, dict) else item
+        if isinstance(name, str) and name.strip():
+            names.append(name.strip())
+    return names
+
+
+def join_authors(authors: list) -> str:
+    """Join multiple authors with "och" for Swedish articles."""
+    if len(authors) == 2:
+        return f"{authors[0]} och {authors[1]}"
+    elif len(authors) > 2:
+        return ", ".join(authors[:-1]) + f" och {authors[-1]}"
+    return authors[0]
+
+
+def _extract_title(metadata: Dict) -> str:
+    """Extract article title."""
+    meta = metadata['meta']
+    # Try OpenGraph first, then Twitter card
+    title = meta.get(('property', 'og:title')) or meta.get(('name', 'twitter:title'))
+    if title:
+        return title
+
+    # Fallback to <title>
+    return (metadata['title'] or '').strip()
+
+
+def _extract_byline(metadata: Dict) -> str:
+    """Extract article author/byline."""
+    # Try schema.org author markup (itemProp="author") - most accurate for SVT
+    if metadata['authors']:
+        return join_authors(metadata['authors'])
+
+    meta = metadata['meta']
+
+    # Fallback: Try common author meta tags
+    content = meta.get(('name', 'author'))
+    if content and content not in GENERIC_AUTHORS:
+        return content
+
+    # Try article:author
+    if meta.get(('property', 'article:author')):
+        return meta[('property', 'article:author')]
+
+    # Try JSON-LD author
+    names = [n for n in json_ld_names(metadata['json_ld'].get('author')) if n not in GENERIC_AUTHORS]
+    if names:
+        return join_authors(names)
+
+    return ''
+
+
+def _extract_date(metadata: Dict, meta_property: str, json_ld_key: str) -> Optional[datetime]:
+    """Extract a date from article:* meta tags, falling back to JSON-LD."""
+    for value in (metadata['meta'].get(('property', meta_property)), metadata['json_ld'].get(json_ld_key)):
+        if value and isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                pass
+
+    return None
+
+
+def _extract_meta_description(metadata: Dict) -> str:
+    """Extract meta description."""
+    meta = metadata['meta']
+    return meta.get(('name', 'description')) or meta.get(('property', 'og:description')) or ''
+
+
+def _custom_extract(tree: HtmlElement) -> str:
+    """Custom content extraction fallback."""
+    # Remove script and style elements
+    for elem in tree.xpath('//script | //style | //nav | //footer | //header'):
+        elem.drop_tree()
+
+    # Try to find article content, fallback to body
+    for xpath in ('//article', '//body'):
+        found = tree.xpath(xpath)
+        if found:
+            return ' '.join(text.strip() for text in found[0].itertext() if text.strip())
+
+    return ''
+
+
+def _report_worker(pids) -> None:
+    """Process pool initializer: tell the parent this worker is up, and its pid."""
+    pids.put(os.getpid())
+
+
+class ExtractionExecutor:
+    """Runs extraction functions in a process pool (or thread pool).
+
+    At most one document per worker is handed to the pool at a time, and a
+    new process pool is only used once all its workers have started, so a
+    document's timeout runs from when a worker picks it up rather than
+    while it waits its turn. In process mode a timed-out worker is
+    terminated and the pool recreated, so a pathological page cannot wedge
+    a worker; the other documents that were running in the broken pool are
+    resubmitted to the new one. Threads cannot be killed, so in thread mode
+    the caller only stops waiting.
+    """
+
+    def __init__(self, mode: str, workers: int, timeout: float):
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.pool = None
+        self._worker_pids = None  # queue the current process pool's workers report to
+        self._pids = []
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._starting: Optional[asyncio.Lock] = None
+
+    def _create_pool(self):
+        """Create the worker pool, falling back to threads if processes are unavailable."""
+        if self.mode == 'process':
+            try:
+                # spawn avoids forking a process that holds event loop and DB threads
+                context = multiprocessing.get_context('spawn')
+                self._worker_pids = context.SimpleQueue()
+                self._pids = []
+                return ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_report_worker,
+                    initargs=(self._worker_pids,)
+                )
+            except (OSError, NotImplementedError, ValueError) as e:
+                logger.warning(f"Process pool unavailable ({e}), falling back to threads")
+                self.mode = 'thread'
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='extract')
+
+    def _collect_pids(self):
+        while self._worker_pids is not None and not self._worker_pids.empty():
+            self._pids.append(self._worker_pids.get())
+
+    async def _start_pool(self):
+        """Create the pool and, for processes, wait until every worker has started."""
+        pool = self._create_pool()
+        if isinstance(pool, ProcessPoolExecutor):
+            # Workers are spawned on demand, one per submitted call
+            started = [asyncio.wrap_future(pool.submit(os.getpid)) for _ in range(self.workers)]
+            self._collect_pids()
+            while len(self._pids) < self.workers:
+                failed = next((f for f in started if f.done() and f.exception()), None)
+                if failed is not None:
+                    pool.shutdown(wait=False)
+                    raise failed.exception()
+                await asyncio.sleep(0.05)
+                self._collect_pids()
+            await asyncio.gather(*started)
+        self.pool = pool
+
+    def _recycle(self, pool):
+        """Terminate the workers of a wedged or broken pool; the next run starts a fresh one.
+
+        Futures still running in a terminated process pool fail with
+        BrokenProcessPool, which run() answers by resubmitting them.
+        """
+        if pool is not self.pool:
+            return  # already replaced after another document's failure
+        self.pool = None
+        if isinstance(pool, ProcessPoolExecutor):
+            self._collect_pids()
+            for pid in self._pids:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            self._worker_pids, self._pids = None, []
+        pool.shutdown(wait=False)
+
+    def _bind_loop(self):
+        # asyncio primitives belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.workers)
+            self._starting = asyncio.Lock()
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in the pool with a per-document timeout."""
+        self._bind_loop()
+        async with self._slots:
+            for attempt in range(2):
+                async with self._starting:
+                    if self.pool is None:
+                        await self._start_pool()
+                pool = self.pool
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.wrap_future(pool.submit(fn, *args)),
+                        timeout=self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Extraction timed out after {self.timeout}s, recycling {self.mode} pool")
+                    self._recycle(pool)
+                    raise
+                except BrokenProcessPool:
+                    # Usually another document's timeout; retry once in the fresh pool
+                    self._recycle(pool)
+                    if attempt:
+                        raise
+
+    def shutdown(self):
+        """Shut down the worker pool."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+# Process-wide executor shared by all scrapers
+extraction_executor = ExtractionExecutor(
+    mode=settings.EXTRACTION_EXECUTOR,
+    workers=settings.EXTRACTION_WORKERS,
+    timeout=settings.EXTRACTION_TIMEOUT
+)
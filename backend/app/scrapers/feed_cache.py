@@ -0,0 +1,89 @@
+"""Conditional-GET validator cache for RSS feeds."""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import hashlib
+
+
+class FeedValidatorCache:
+    """In-memory store of per-feed validators (ETag, Last-Modified, body hash).
+
+    The cache is loaded from and persisted to the feed_cache table by
+    ScraperService; scrapers only read and update it while discovering.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict]] = None):
+        self.entries: Dict[str, Dict] = entries or {}
+        self.hits = 0
+        self.misses = 0
+        self.updated: set = set()
+
+    @staticmethod
+    def body_hash(body: bytes) -> str:
+        """Generate SHA256 hash of a response body."""
+        return hashlib.sha256(body).hexdigest()
+
+    def request_headers(self, feed_url: str) -> Dict[str, str]:
+        """Return conditional request headers for a feed."""
+        entry = self.entries.get(feed_url)
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(
+        self,
+        feed_url: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> List[Tuple[str, Optional[datetime]]]:
+        """Record a cache hit and return the previously parsed (url, published) entries."""
+        entry = self.entries[feed_url]
+        # Servers may rotate validators even when the body is identical
+        if etag:
+            entry['etag'] = etag
+        if last_modified:
+            entry['last_modified'] = last_modified
+        entry['hit_count'] = entry.get('hit_count', 0) + 1
+        self.hits += 1
+        self.updated.add(feed_url)
+        return [
+            (url, datetime.fromisoformat(published) if published else None)
+            for url, published in entry.get('entries') or []
+        ]
+
+    def miss(
+        self,
+        feed_url: str,
+        body_hash: str,
+        entries: List[Tuple[str, Optional[datetime]]],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        """Record a cache miss and store the freshly parsed feed."""
+        entry = self.entries.setdefault(feed_url, {})
+        entry.update({
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_hash': body_hash,
+            'entries': [
+                [url, published.isoformat() if published else None]
+                for url, published in entries
+            ],
+        })
+        entry['miss_count'] = entry.get('miss_count', 0) + 1
+        self.misses += 1
+        self.updated.add(feed_url)
+
+    def has(self, feed_url: str, body_hash: Optional[str] = None) -> bool:
+        """Check if a feed is cached (optionally with a matching body hash)."""
+        entry = self.entries.get(feed_url)
+        if not entry:
+            return False
+        if body_hash is not None:
+            return entry.get('body_hash') == body_hash
+        return True
@@ -0,0 +1,141 @@
+"""Content-addressed archive of raw article HTML."""
+from pathlib import Path
+from typing import Optional
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from app.config import settings
+from app.utils.compression import load_zstandard
+
+logger = logging.getLogger(__name__)
+
+
+class HTMLArchive:
+    """Stores response bodies on disk, keyed by SHA256 of the raw bytes.
+
+    Files live at <root>/<hash[:2]>/<hash[2:4]>/<hash>.zst (or .gz when the
+    optional 'zstandard' package is missing), so identical bodies are
+    stored once. When the archive grows beyond `max_bytes`, the least
+    recently written files are deleted until it is back under 90%.
+    Methods do blocking file I/O; use the *_async variants from async code.
+    They may run in several threads at once.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root) if root else None
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # computed on first write
+        self._size_lock = threading.RLock()  # guards _size and pruning
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    @staticmethod
+    def body_hash(body: bytes) -> str:
+        """Generate SHA256 hash of a response body."""
+        return hashlib.sha256(body).hexdigest()
+
+    def _path(self, body_hash: str, suffix: str) -> Path:
+        return self.root / body_hash[:2] / body_hash[2:4] / f'{body_hash}{suffix}'
+
+    def _find(self, body_hash: str) -> Optional[Path]:
+        for suffix in ('.zst', '.gz'):
+            path = self._path(body_hash, suffix)
+            if path.exists():
+                return path
+        return None
+
+    def put(self, body: bytes) -> str:
+        """Store a body (if not already stored) and return its hash."""
+        body_hash = self.body_hash(body)
+        existing = self._find(body_hash)
+        if existing:
+            # Refresh so retention keeps recently referenced files
+            existing.touch()
+            return body_hash
+
+        zstandard = load_zstandard()
+        if zstandard is not None:
+            path, data = self._path(body_hash, '.zst'), zstandard.ZstdCompressor(level=10).compress(body)
+        else:
+            path, data = self._path(body_hash, '.gz'), gzip.compress(body, 9)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._size_lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self.prune()
+        return body_hash
+
+    def get(self, body_hash: str) -> Optional[bytes]:
+        """Return a stored body, or None if it is not (or no longer) archived."""
+        path = self._find(body_hash)
+        if path is None:
+            return None
+        data = path.read_bytes()
+        if path.suffix == '.zst':
+            zstandard = load_zstandard()
+            if zstandard is None:
+                raise RuntimeError("Archived body is zstd-compressed but the 'zstandard' package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _files(self):
+        return [p for p in self.root.glob('*/*/*') if p.suffix in ('.zst', '.gz')]
+
+    def size(self) -> int:
+        """Total size of archived files in bytes."""
+        if not self.root.exists():
+            return 0
+        return sum(p.stat().st_size for p in self._files())
+
+    def prune(self) -> int:
+        """Delete least recently written files until under 90% of max_bytes.
+
+        Returns the number of files deleted.
+        """
+        with self._size_lock:
+            return self._prune()
+
+    def _prune(self) -> int:
+        files = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in self._files()),
+            key=lambda item: item[0]
+        )
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        deleted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            deleted += 1
+        self._size = total
+        if deleted:
+            logger.info(f"Pruned {deleted} files from the HTML archive ({total} bytes left)")
+        return deleted
+
+    async def put_async(self, body: bytes) -> str:
+        return await asyncio.to_thread(self.put, body)
+
+    async def get_async(self, body_hash: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, body_hash)
+
+
+# Process-wide archive (disabled unless HTML_ARCHIVE_DIR is set)
+html_archive = HTMLArchive(settings.HTML_ARCHIVE_DIR, settings.HTML_ARCHIVE_MAX_BYTES)
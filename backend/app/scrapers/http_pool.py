@@ -0,0 +1,104 @@
+"""Process-wide pooled HTTP clients shared by all scrapers."""
+from typing import Dict
+from urllib.parse import urlparse
+import logging
+import httpx
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """Check if the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientPool:
+    """Long-lived httpx clients keyed by host.
+
+    Scrapers borrow clients from the pool instead of owning them, so
+    keep-alive connections (and their DNS/TCP/TLS setup) survive across
+    scrape runs. The pool is closed in the FastAPI lifespan shutdown.
+    """
+
+    def __init__(self):
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.requests: Dict[str, int] = {}
+        self.connections_opened: Dict[str, int] = {}
+        self.http2 = settings.HTTP2_ENABLED and _http2_available()
+        if settings.HTTP2_ENABLED and not self.http2:
+            logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed, using HTTP/1.1")
+
+    def _create_client(self, host: str) -> httpx.AsyncClient:
+        """Create a client for a host with connection counting hooks."""
+
+        async def trace(event_name: str, info: Dict):
+            if event_name == 'connection.connect_tcp.complete':
+                self.connections_opened[host] = self.connections_opened.get(host, 0) + 1
+
+        async def on_request(request: httpx.Request):
+            self.requests[host] = self.requests.get(host, 0) + 1
+            request.extensions['trace'] = trace
+
+        return httpx.AsyncClient(
+            timeout=30.0,
+            headers={
+                'User-Agent': settings.USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'sv-SE,sv;q=0.9,en;q=0.8',
+            },
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+            ),
+            http2=self.http2,
+            follow_redirects=True,
+            event_hooks={'request': [on_request]}
+        )
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Return the shared client for the host of a URL."""
+        host = urlparse(url).netloc
+        client = self.clients.get(host)
+        if client is None or client.is_closed:
+            client = self.clients[host] = self._create_client(host)
+        return client
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET a URL using the pooled client for its host."""
+        return await self.client_for(url).get(url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        """HEAD a URL using the pooled client for its host."""
+        return await self.client_for(url).head(url, **kwargs)
+
+    def stream(self, method: str, url: str, **kwargs):
+        """Stream a response using the pooled client for its host."""
+        return self.client_for(url).stream(method, url, **kwargs)
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Return per-host request and connection reuse counters."""
+        metrics = {}
+        for host, requests in self.requests.items():
+            opened = self.connections_opened.get(host, 0)
+            metrics[host] = {
+                'requests': requests,
+                'connections_opened': opened,
+                'reuse_rate': 1 - opened / requests if requests else 0.0,
+            }
+        return metrics
+
+    async def aclose(self):
+        """Close all pooled clients."""
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients.clear()
+
+
+# Process-wide pool shared by all scrapers and scrape runs
+http_pool = HTTPClientPool()
@@ -0,0 +1,72 @@
+"""Per-host token-bucket rate limiting for scraper requests."""
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import asyncio
+import time
+from app.config import settings
+
+
+class TokenBucket:
+    """Token bucket that hands out request slots at a fixed rate.
+
+    Tokens may go negative: each caller reserves the next free slot and
+    sleeps until it arrives, so concurrent callers are spaced exactly
+    1/rate apart without holding a lock while waiting.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait for it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class HostRateLimiter:
+    """Shared registry of token buckets keyed by host."""
+
+    def __init__(self, default_rate: float, default_burst: int):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.waited_seconds = 0.0
+
+    def configure(self, host: str, rate: Optional[float] = None, burst: Optional[int] = None):
+        """Set the request budget for a host (keeps accumulated state)."""
+        rate = rate or self.default_rate
+        burst = burst or self.default_burst
+        bucket = self.buckets.get(host)
+        if bucket:
+            bucket.rate = rate
+            bucket.burst = burst
+            bucket.tokens = min(bucket.tokens, burst)
+        else:
+            self.buckets[host] = TokenBucket(rate, burst)
+
+    async def acquire(self, url: str):
+        """Wait for a request slot for the host of the given URL."""
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if not bucket:
+            bucket = self.buckets[host] = TokenBucket(self.default_rate, self.default_burst)
+
+        delay = bucket.reserve()
+        if delay > 0:
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+
+# Process-wide limiter shared by all scrapers
+rate_limiter = HostRateLimiter(
+    default_rate=settings.SCRAPE_RATE_LIMIT,
+    default_burst=settings.SCRAPE_RATE_BURST
+)
@@ -14,6 +14,8 @@ WORKING_SOURCES = [
         'scrape_interval_active': 15,
         'scrape_interval_archive': 60,
         'max_articles_per_scrape': 50,
+        'rate_limit_per_second': 2.0,
+        'rate_limit_burst': 4,
         'country': 'SE'
     },
 ]
@@ -0,0 +1,111 @@
+"""Bulk lookup of existing articles and their latest version hash."""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Article
+
+
+@dataclass
+class ArticleContext:
+    """Snapshot of an existing article needed to process a fetch.
+
+    Plain data rather than an ORM instance, so it can be shared across
+    the per-article sessions without being tied to the session that
+    loaded it.
+    """
+    article_id: int
+    url: str
+    first_seen_at: Optional[datetime]
+    last_checked_at: Optional[datetime]
+    next_check_at: Optional[datetime]
+    is_active: bool
+    check_count: int
+    version_count: int
+    unchanged_checks: int
+    content_hash: Optional[str]  # of the latest version
+    fingerprint: Optional[str] = None  # of the latest version
+    simhash: Optional[str] = None  # of the latest version
+    html_hash: Optional[str] = None  # of the last fetched page
+    etag: Optional[str] = None  # validators of the last response
+    last_modified: Optional[str] = None
+    extractor_id: Optional[str] = None  # that produced content_hash and fingerprint
+
+
+def _context_query():
+    """Select the article columns needed to process a fetch."""
+    return select(
+        Article.id,
+        Article.url,
+        Article.first_seen_at,
+        Article.last_checked_at,
+        Article.next_check_at,
+        Article.is_active,
+        Article.check_count,
+        Article.version_count,
+        Article.unchanged_checks,
+        Article.latest_content_hash,
+        Article.latest_fingerprint,
+        Article.latest_simhash,
+        Article.last_html_hash,
+        Article.http_etag,
+        Article.http_last_modified,
+        Article.extractor_id,
+    )
+
+
+def _to_context(row) -> ArticleContext:
+    return ArticleContext(
+        article_id=row.id,
+        url=row.url,
+        first_seen_at=row.first_seen_at,
+        last_checked_at=row.last_checked_at,
+        next_check_at=row.next_check_at,
+        is_active=bool(row.is_active),
+        check_count=row.check_count or 0,
+        version_count=row.version_count or 0,
+        unchanged_checks=row.unchanged_checks or 0,
+        content_hash=row.latest_content_hash,
+        fingerprint=row.latest_fingerprint,
+        simhash=row.latest_simhash,
+        html_hash=row.last_html_hash,
+        etag=row.http_etag,
+        last_modified=row.http_last_modified,
+        extractor_id=row.extractor_id,
+    )
+
+
+async def load_article_contexts(session: AsyncSession, normalized_urls: List[str]) -> Dict[str, ArticleContext]:
+    """Resolve normalized URLs to ArticleContext in one query per 500 URLs."""
+    contexts = {}
+    # Chunk to stay below database bind parameter limits
+    for i in range(0, len(normalized_urls), 500):
+        result = await session.execute(
+            _context_query().where(Article.url.in_(normalized_urls[i:i + 500]))
+        )
+        for row in result.all():
+            contexts[row.url] = _to_context(row)
+    return contexts
+
+
+async def load_due_article_contexts(
+    session: AsyncSession,
+    source_id: int,
+    now: datetime,
+    limit: int
+) -> List[ArticleContext]:
+    """Load active articles whose next check is due, most overdue first."""
+    result = await session.execute(
+        _context_query()
+        .where(
+            Article.source_id == source_id,
+            Article.is_active == True,
+            # Rows from before adaptive scheduling have no next_check_at yet
+            or_(Article.next_check_at.is_(None), Article.next_check_at <= now)
+        )
+        # Explicit, as backends disagree on where NULLs sort
+        .order_by(Article.next_check_at.nulls_first())
+        .limit(limit)
+    )
+    return [_to_context(row) for row in result.all()]
@@ -0,0 +1,172 @@
+"""Myers diff over interned token ids.
+
+Produces difflib-style opcodes (tag, i1, i2, j1, j2) for two sequences of
+hashable tokens. Tokens are mapped to integer ids in compact arrays, the
+common prefix and suffix are trimmed, and the rest is split recursively at
+the middle snake of the linear-space Myers algorithm (O((N+M)D) time, O(N+M)
+space per level), unlike difflib.SequenceMatcher, which is quadratic on
+long texts and whose autojunk heuristic degrades on repeated words.
+"""
+from array import array
+from difflib import SequenceMatcher
+from typing import Hashable, List, Optional, Sequence, Tuple
+from app.config import settings
+
+Opcode = Tuple[str, int, int, int, int]
+Block = Tuple[int, int, int]
+
+
+def intern_tokens(a: Sequence[Hashable], b: Sequence[Hashable]) -> Tuple[array, array]:
+    """Map the tokens of both sequences to shared integer ids."""
+    ids = {}
+    a_ids = array('l', [ids.setdefault(token, len(ids)) for token in a])
+    b_ids = array('l', [ids.setdefault(token, len(ids)) for token in b])
+    return a_ids, b_ids
+
+
+def diff_opcodes(
+    a: Sequence[Hashable],
+    b: Sequence[Hashable],
+    max_cost: Optional[int] = None
+) -> List[Opcode]:
+    """Return opcodes turning `a` into `b`, as SequenceMatcher.get_opcodes() would.
+
+    `max_cost` (default DIFF_MAX_COST) caps the edit distance searched per
+    split; a region needing more falls back to difflib for that region.
+    """
+    a_ids, b_ids = intern_tokens(a, b)
+    blocks: List[Block] = []
+    _match(a_ids, 0, len(a_ids), b_ids, 0, len(b_ids), max_cost or settings.DIFF_MAX_COST, blocks)
+    return _opcodes(_merge_blocks(blocks), len(a_ids), len(b_ids))
+
+
+def _match(a: array, a_lo: int, a_hi: int, b: array, b_lo: int, b_hi: int, max_cost: int, blocks: List[Block]):
+    """Append the matching blocks of a[a_lo:a_hi] and b[b_lo:b_hi] in order."""
+    prefix = 0
+    while a_lo + prefix < a_hi and b_lo + prefix < b_hi and a[a_lo + prefix] == b[b_lo + prefix]:
+        prefix += 1
+    if prefix:
+        blocks.append((a_lo, b_lo, prefix))
+        a_lo += prefix
+        b_lo += prefix
+
+    suffix = 0
+    while a_hi - suffix > a_lo and b_hi - suffix > b_lo and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]:
+        suffix += 1
+    a_hi -= suffix
+    b_hi -= suffix
+
+    if a_lo < a_hi and b_lo < b_hi:
+        split, capped = _bisect(a, a_lo, a_hi, b, b_lo, b_hi, max_cost)
+        if split is not None:
+            x, y = split
+            _match(a, a_lo, a_lo + x, b, b_lo, b_lo + y, max_cost, blocks)
+            _match(a, a_lo + x, a_hi, b, b_lo + y, b_hi, max_cost, blocks)
+        elif capped:
+            matcher = SequenceMatcher(None, a[a_lo:a_hi], b[b_lo:b_hi], autojunk=True)
+            blocks.extend(
+                (a_lo + i, b_lo + j, size) for i, j, size in matcher.get_matching_blocks() if size
+            )
+        # Otherwise the region has nothing in common
+
+    if suffix:
+        blocks.append((a_hi, b_hi, suffix))
+
+
+def _bisect(
+    a: array, a_lo: int, a_hi: int, b: array, b_lo: int, b_hi: int, max_cost: int
+) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """Find the middle snake of two non-empty ranges.
+
+    Returns ((x, y), False) with the split point relative to the range
+    starts, (None, False) when the ranges share no token, or (None, True)
+    when the cost cap was reached first.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    # With an odd delta the paths meet on a forward step, otherwise on a reverse step
+    front = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+
+    for d in range(min(max_d, max_cost)):
+        # Forward path
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1 and x1 >= n - v2[k2_offset]:
+                    return (x1, y1), False
+
+        # Reverse path
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    if x1 >= n - x2:
+                        return (x1, x1 - (k1_offset - v_offset)), False
+
+    return None, max_cost < max_d
+
+
+def _merge_blocks(blocks: List[Block]) -> List[Block]:
+    """Join adjacent matching blocks, as SequenceMatcher.get_matching_blocks() does."""
+    merged: List[Block] = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+def _opcodes(blocks: List[Block], n: int, m: int) -> List[Opcode]:
+    """Turn matching blocks into opcodes (same rules as SequenceMatcher.get_opcodes())."""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for a_start, b_start, size in blocks + [(n, m, 0)]:
+        if i < a_start and j < b_start:
+            opcodes.append(('replace', i, a_start, j, b_start))
+        elif i < a_start:
+            opcodes.append(('delete', i, a_start, j, b_start))
+        elif j < b_start:
+            opcodes.append(('insert', i, a_start, j, b_start))
+        i, j = a_start + size, b_start + size
+        if size:
+            opcodes.append(('equal', a_start, i, b_start, j))
+    return opcodes
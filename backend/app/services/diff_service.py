@@ -1,10 +1,85 @@
 """Diff generation service."""
-import difflib
-from typing import List, Dict, Any
+import hashlib
+import logging
+import re
+from collections import Counter
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
-from app.models import Article, ArticleVersion
-from app.schemas.diff import DiffResponse, DiffChange, DiffStats, VersionInfo
+from sqlalchemy.orm import defer, load_only
+from app.models import ArticleVersion, ArticleDiff
+from app.schemas.diff import CompactDiffResponse, DiffResponse, DiffChange, DiffFormat, DiffMode, DiffStats, TimelineStep, VersionInfo
+from app.services.diff_engine import diff_opcodes
+from app.services.version_store import load_contents, split_paragraphs
+
+logger = logging.getLogger(__name__)
+
+# Identifies the word diff below; stored diffs from another algorithm are recomputed
+DIFF_ALGORITHM = 'myers-1'
+
+# Sentence boundary: whitespace after terminal punctuation (or punctuation and a
+# closing quote), but not after an ellipsis
+SENTENCE_BREAK = re.compile(r'(?<=[.!?…])(?<![.!?…][.!?…])\s+|(?<=[.!?…]["”’»])\s+')
+
+# Replaced units sharing at least this fraction of their words are diffed one
+# level down; less similar ones are reported as a whole
+SIMILARITY = 0.5
+
+# Larger replaced runs are not paired unit by unit (quadratic), just split further
+MAX_PAIRING_CELLS = 2500
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    """Split a paragraph into sentences, keeping their words intact."""
+    return [sentence for sentence in SENTENCE_BREAK.split(paragraph) if sentence]
+
+
+def _split_words(sentence: str) -> List[str]:
+    return sentence.split()
+
+
+def _similar(old_words: Counter, new_words: Counter) -> bool:
+    """Check if two units share at least SIMILARITY of their words."""
+    total = sum(old_words.values()) + sum(new_words.values())
+    return total > 0 and 2 * sum((old_words & new_words).values()) >= SIMILARITY * total
+
+
+def _similar_pairs(old_units: List[str], new_units: List[str]) -> List[Tuple[int, int]]:
+    """Longest in-order pairing of similar units (an LCS with similarity as equality)."""
+    old_words = [Counter(unit.split()) for unit in old_units]
+    new_words = [Counter(unit.split()) for unit in new_units]
+    n, m = len(old_units), len(new_units)
+    similar = [[_similar(old_words[i], new_words[j]) for j in range(m)] for i in range(n)]
+
+    lengths = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        for j in range(m - 1, -1, -1):
+            if similar[i][j]:
+                lengths[i][j] = lengths[i + 1][j + 1] + 1
+            else:
+                lengths[i][j] = max(lengths[i + 1][j], lengths[i][j + 1])
+
+    pairs = []
+    i = j = 0
+    while i < n and j < m:
+        if similar[i][j] and lengths[i][j] == lengths[i + 1][j + 1] + 1:
+            pairs.append((i, j))
+            i += 1
+            j += 1
+        elif lengths[i + 1][j] >= lengths[i][j + 1]:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+
+# Units of the hierarchical diff, coarsest first, with the splitter producing them
+HIERARCHY = (
+    ('paragraph', split_paragraphs),
+    ('sentence', split_sentences),
+    ('word', _split_words),
+)
 
 
 class DiffService:
@@ -17,12 +92,51 @@ class DiffService:
         self,
         article_id: int,
         from_version: int,
-        to_version: int
+        to_version: int,
+        mode: DiffMode = 'word'
     ) -> DiffResponse:
-        """Generate diff between two versions of an article."""
-        # Get both versions
+        """Generate diff between two versions of an article.
+
+        The diff is read from article_diffs when stored; otherwise it is
+        computed and stored for the next request. `mode` selects the flat
+        word diff or the hierarchical paragraph/sentence/word diff.
+        """
+        response, _ = await self._diff_response(article_id, from_version, to_version, mode)
+        return response
+
+    async def generate_diff_with_etag(
+        self,
+        article_id: int,
+        from_version: int,
+        to_version: int,
+        mode: DiffMode,
+        diff_format: DiffFormat
+    ) -> Tuple[DiffResponse, Optional[str]]:
+        """generate_diff plus the diff's ETag (see diff_etag), without querying for it again."""
+        response, diff = await self._diff_response(article_id, from_version, to_version, mode)
+        if diff.id is None:
+            # A concurrent request stored the pair first; ours was not saved
+            return response, None
+        return response, self._etag(article_id, response.from_version, response.to_version, diff.id, mode, diff_format)
+
+    async def _diff_response(
+        self,
+        article_id: int,
+        from_version: int,
+        to_version: int,
+        mode: DiffMode
+    ) -> Tuple[DiffResponse, ArticleDiff]:
+        # Get both versions; their text is only loaded if the diff has to be computed
         result = await self.db.execute(
             select(ArticleVersion)
+            .options(load_only(
+                ArticleVersion.id,
+                ArticleVersion.article_id,
+                ArticleVersion.version_number,
+                ArticleVersion.title,
+                ArticleVersion.captured_at,
+                ArticleVersion.word_count
+            ))
             .where(
                 ArticleVersion.article_id == article_id,
                 ArticleVersion.version_number.in_([from_version, to_version])
@@ -37,51 +151,394 @@ class DiffService:
         v1 = next(v for v in versions if v.version_number == from_version)
         v2 = next(v for v in versions if v.version_number == to_version)
 
-        # Generate content diff
-        content_diff = self._generate_word_diff(v1.content, v2.content)
-
-        # Calculate stats
-        stats = self._calculate_stats(content_diff, v1.title, v2.title)
+        # Read everything needed from the versions before storing a diff may commit
+        from_info = self._version_info(v1)
+        to_info = self._version_info(v2)
+        title_changed = v1.title != v2.title
 
         # Generate title diff if changed
         title_diff = {}
-        if v1.title != v2.title:
+        if title_changed:
             title_diff = {
                 'old': v1.title,
                 'new': v2.title
             }
 
+        diff = await self._get_or_compute_diff(article_id, from_version, to_version, mode)
+
+        # Calculate stats
+        stats = DiffStats(
+            words_added=diff.words_added,
+            words_removed=diff.words_removed,
+            net_change=diff.words_added - diff.words_removed,
+            title_changed=title_changed
+        )
+
         return DiffResponse(
             article_id=article_id,
-            from_version=VersionInfo(
-                id=v1.id,
-                version_number=v1.version_number,
-                title=v1.title or "",
-                captured_at=v1.captured_at,
-                word_count=v1.word_count or 0
-            ),
-            to_version=VersionInfo(
-                id=v2.id,
-                version_number=v2.version_number,
-                title=v2.title or "",
-                captured_at=v2.captured_at,
-                word_count=v2.word_count or 0
-            ),
+            from_version=from_info,
+            to_version=to_info,
             title_diff=title_diff,
-            content_diff=content_diff,
-            stats=stats
+            content_diff=[DiffChange(**change) for change in diff.changes],
+            stats=stats,
+            mode=mode
+        ), diff
+
+    async def timeline(
+        self,
+        article_id: int,
+        mode: DiffMode = 'word',
+        stats_only: bool = False
+    ) -> AsyncIterator[TimelineStep]:
+        """Yield the diff between each pair of consecutive versions, oldest first.
+
+        The version chain and its stored diffs are read in one query each,
+        and the texts (in one pass from the nearest keyframe) only if some
+        diff is missing or outdated. Each text is split into paragraphs once
+        and shared by the two steps it is part of. Diffs computed here are
+        stored after the last step.
+        """
+        result = await self.db.execute(
+            select(ArticleVersion)
+            .options(load_only(
+                ArticleVersion.id,
+                ArticleVersion.version_number,
+                ArticleVersion.title,
+                ArticleVersion.captured_at,
+                ArticleVersion.word_count
+            ))
+            .where(ArticleVersion.article_id == article_id)
+            .order_by(ArticleVersion.version_number)
+        )
+        versions = [(self._version_info(v), v.title) for v in result.scalars().all()]
+        steps = list(zip(versions, versions[1:]))
+
+        query = select(ArticleDiff).where(ArticleDiff.article_id == article_id, ArticleDiff.mode == mode)
+        if stats_only:
+            query = query.options(defer(ArticleDiff.changes))
+        result = await self.db.execute(query)
+        stored = {(diff.from_version, diff.to_version): diff for diff in result.scalars().all()}
+
+        missing = [
+            (old.version_number, new.version_number)
+            for (old, _), (new, _) in steps
+            if getattr(stored.get((old.version_number, new.version_number)), 'algorithm', None) != DIFF_ALGORITHM
+        ]
+        contents = {}
+        if missing:
+            contents = await load_contents(self.db, article_id, sorted({number for pair in missing for number in pair}))
+        paragraphs: Dict[int, List[str]] = {}
+
+        computed = False
+        for (from_info, old_title), (to_info, new_title) in steps:
+            key = (from_info.version_number, to_info.version_number)
+            diff = stored.get(key)
+            if diff is None or diff.algorithm != DIFF_ALGORITHM:
+                for number in key:
+                    if number not in paragraphs:
+                        paragraphs[number] = split_paragraphs(contents[number])
+                diff = self._store_diff(
+                    diff, self._diff_row(article_id, *key, paragraphs[key[0]], paragraphs[key[1]], mode)
+                )
+                computed = True
+            # Texts are only shared with the next step
+            paragraphs.pop(key[0], None)
+
+            title_changed = old_title != new_title
+            yield TimelineStep(
+                from_version=from_info,
+                to_version=to_info,
+                title_diff={'old': old_title, 'new': new_title} if title_changed else {},
+                stats=DiffStats(
+                    words_added=diff.words_added,
+                    words_removed=diff.words_removed,
+                    net_change=diff.words_added - diff.words_removed,
+                    title_changed=title_changed
+                ),
+                content_diff=None if stats_only else [DiffChange(**change) for change in diff.changes],
+                mode=mode
+            )
+
+        if computed:
+            await self._commit_diffs(f"Timeline diffs of {article_id}")
+
+    async def diff_etag(
+        self,
+        article_id: int,
+        from_version: int,
+        to_version: int,
+        mode: DiffMode,
+        diff_format: DiffFormat
+    ) -> Optional[str]:
+        """Weak ETag of a stored diff, without loading its changes.
+
+        Built from the versions' ids and displayed fields, the stored
+        diff's id (re-extraction deletes diffs it invalidates), the mode,
+        format and DIFF_ALGORITHM. None when the diff is not stored yet or
+        is outdated.
+        """
+        result = await self.db.execute(
+            select(
+                ArticleVersion.id,
+                ArticleVersion.version_number,
+                ArticleVersion.title,
+                ArticleVersion.captured_at,
+                ArticleVersion.word_count
+            )
+            .where(
+                ArticleVersion.article_id == article_id,
+                ArticleVersion.version_number.in_([from_version, to_version])
+            )
+        )
+        versions = {row.version_number: self._version_info(row) for row in result.all()}
+        result = await self.db.execute(
+            select(ArticleDiff.id, ArticleDiff.algorithm).where(
+                ArticleDiff.article_id == article_id,
+                ArticleDiff.from_version == from_version,
+                ArticleDiff.to_version == to_version,
+                ArticleDiff.mode == mode
+            )
         )
+        stored = result.one_or_none()
+        if len(versions) != 2 or stored is None or stored.algorithm != DIFF_ALGORITHM:
+            return None
+
+        return self._etag(article_id, versions[from_version], versions[to_version], stored.id, mode, diff_format)
+
+    @staticmethod
+    def _etag(
+        article_id: int,
+        from_info: VersionInfo,
+        to_info: VersionInfo,
+        diff_id: int,
+        mode: DiffMode,
+        diff_format: DiffFormat
+    ) -> str:
+        versions = [(v.id, v.version_number, v.title, v.word_count) for v in (from_info, to_info)]
+        key = repr((article_id, versions, diff_id, mode, diff_format, DIFF_ALGORITHM))
+        return f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
 
-    def _generate_word_diff(self, old_text: str, new_text: str) -> List[DiffChange]:
-        """Generate word-level diff."""
-        old_words = old_text.split()
-        new_words = new_text.split()
+    @staticmethod
+    def to_compact(diff: DiffResponse) -> CompactDiffResponse:
+        """Convert a diff to word offsets into the version texts.
+
+        Changes are ordered by position in the new text and everything
+        between them is unchanged, so the old-text offset of a deletion is
+        its position shifted by the words deleted minus inserted before it.
+        """
+        changes = []
+        shift = 0  # old offset - new offset at the current position
+        for change in diff.content_diff:
+            length = len(change.content)
+            if change.type == 'delete':
+                start = change.position + shift
+                entry = ['d', start, start + length]
+                shift += length
+            else:
+                entry = ['i', change.position, change.position + length]
+                shift -= length
+            if change.level:
+                entry.append(change.level)
+            changes.append(entry)
+
+        return CompactDiffResponse(
+            article_id=diff.article_id,
+            from_version=diff.from_version,
+            to_version=diff.to_version,
+            title_diff=diff.title_diff,
+            changes=changes,
+            stats=diff.stats,
+            mode=diff.mode
+        )
+
+    @staticmethod
+    def _version_info(version: ArticleVersion) -> VersionInfo:
+        return VersionInfo(
+            id=version.id,
+            version_number=version.version_number,
+            title=version.title or "",
+            captured_at=version.captured_at,
+            word_count=version.word_count or 0
+        )
+
+    async def _get_or_compute_diff(
+        self,
+        article_id: int,
+        from_version: int,
+        to_version: int,
+        mode: DiffMode
+    ) -> ArticleDiff:
+        """Look up a stored diff, computing (and storing) it when missing or outdated."""
+        result = await self.db.execute(
+            select(ArticleDiff).where(
+                ArticleDiff.article_id == article_id,
+                ArticleDiff.from_version == from_version,
+                ArticleDiff.to_version == to_version,
+                ArticleDiff.mode == mode
+            )
+        )
+        stored = result.scalar_one_or_none()
+        if stored is not None and stored.algorithm == DIFF_ALGORITHM:
+            return stored
+
+        # Delta-encoded and chunk-stored versions are rebuilt first
+        contents = await load_contents(self.db, article_id, [from_version, to_version])
+        diff = self._store_diff(stored, self.compute_diff(
+            article_id, from_version, to_version, contents[from_version], contents[to_version], mode
+        ))
+        await self._commit_diffs(f"Diff {article_id} v{from_version}-v{to_version}")
+        return diff
+
+    def _store_diff(self, stored, diff: ArticleDiff) -> ArticleDiff:
+        """Add a computed diff, or refresh the outdated stored row with it."""
+        if stored is None:
+            self.db.add(diff)
+            return diff
+        for column in ('algorithm', 'changes', 'words_added', 'words_removed'):
+            setattr(stored, column, getattr(diff, column))
+        return stored
+
+    async def _commit_diffs(self, label: str):
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # A concurrent request stored the same pair first
+            await self.db.rollback()
+            logger.debug(f"{label} already stored")
+
+    @classmethod
+    def compute_diff(
+        cls,
+        article_id: int,
+        from_version: int,
+        to_version: int,
+        old_text: str,
+        new_text: str,
+        mode: DiffMode = 'word'
+    ) -> ArticleDiff:
+        """Diff two version texts into an (unsaved) ArticleDiff row."""
+        return cls._diff_row(
+            article_id, from_version, to_version, split_paragraphs(old_text), split_paragraphs(new_text), mode
+        )
+
+    @classmethod
+    def _diff_row(
+        cls,
+        article_id: int,
+        from_version: int,
+        to_version: int,
+        old_paragraphs: List[str],
+        new_paragraphs: List[str],
+        mode: DiffMode
+    ) -> ArticleDiff:
+        """Diff two already split version texts into an (unsaved) ArticleDiff row."""
+        changes = cls.diff_changes(old_paragraphs, new_paragraphs, mode)
+        return ArticleDiff(
+            article_id=article_id,
+            from_version=from_version,
+            to_version=to_version,
+            mode=mode,
+            algorithm=DIFF_ALGORITHM,
+            changes=[change.model_dump(exclude_none=True) for change in changes],
+            words_added=sum(len(c.content) for c in changes if c.type == 'insert'),
+            words_removed=sum(len(c.content) for c in changes if c.type == 'delete'),
+        )
 
-        diff = difflib.SequenceMatcher(None, old_words, new_words)
+    @classmethod
+    def _diff_paragraphs(cls, old_paragraphs: List[str], new_paragraphs: List[str]) -> List[DiffChange]:
+        """Word diff (see diff_changes)."""
         changes = []
         position = 0
 
-        for tag, i1, i2, j1, j2 in diff.get_opcodes():
+        for tag, i1, i2, j1, j2 in diff_opcodes(old_paragraphs, new_paragraphs):
+            if tag == 'equal':
+                position += sum(len(p.split()) for p in new_paragraphs[j1:j2])
+                continue
+            old_words = ' '.join(old_paragraphs[i1:i2]).split()
+            new_words = ' '.join(new_paragraphs[j1:j2]).split()
+            changes.extend(cls._diff_words(old_words, new_words, position))
+            position += len(new_words)
+
+        return changes
+
+    @classmethod
+    def diff_changes(cls, old_paragraphs: List[str], new_paragraphs: List[str], mode: DiffMode = 'word') -> List[DiffChange]:
+        """Diff two version texts split into paragraphs (see split_paragraphs).
+
+        Paragraphs are aligned first with the Myers engine in diff_engine,
+        so identical ones are skipped without tokenizing them. The word
+        diff then diffs only the differing runs word by word. The
+        hierarchical diff reports inserted or deleted paragraphs whole and
+        splits only replaced runs into sentences, aligning them again, and
+        so on down to words. Work grows with the size of the change rather
+        than the length of the article.
+        """
+        if mode == 'hierarchical':
+            return cls._diff_level(old_paragraphs, new_paragraphs, 0, 0)
+        return cls._diff_paragraphs(old_paragraphs, new_paragraphs)
+
+    @classmethod
+    def _diff_level(cls, old_units: List[str], new_units: List[str], offset: int, depth: int) -> List[DiffChange]:
+        """Diff units of HIERARCHY[depth]; positions are word indexes into the new text."""
+        level = HIERARCHY[depth][0]
+        changes = []
+        position = offset
+
+        for tag, i1, i2, j1, j2 in diff_opcodes(old_units, new_units):
+            new_count = sum(len(unit.split()) for unit in new_units[j1:j2])
+            if tag == 'replace' and depth + 1 < len(HIERARCHY):
+                changes.extend(cls._diff_replaced(old_units[i1:i2], new_units[j1:j2], position, depth))
+            elif tag != 'equal':
+                changes.extend(cls._whole_units(old_units[i1:i2], new_units[j1:j2], position, level))
+            position += new_count
+
+        return changes
+
+    @classmethod
+    def _diff_replaced(cls, old_units: List[str], new_units: List[str], offset: int, depth: int) -> List[DiffChange]:
+        """Refine a replaced run: similar units are diffed one level down, the rest reported whole."""
+        split = HIERARCHY[depth + 1][1]
+        if len(old_units) * len(new_units) > MAX_PAIRING_CELLS:
+            return cls._diff_level(
+                [part for unit in old_units for part in split(unit)],
+                [part for unit in new_units for part in split(unit)],
+                offset,
+                depth + 1
+            )
+
+        level = HIERARCHY[depth][0]
+        changes = []
+        position = offset
+        i = j = 0
+        for pair_i, pair_j in _similar_pairs(old_units, new_units) + [(len(old_units), len(new_units))]:
+            changes.extend(cls._whole_units(old_units[i:pair_i], new_units[j:pair_j], position, level))
+            position += sum(len(unit.split()) for unit in new_units[j:pair_j])
+            if pair_i < len(old_units):
+                changes.extend(cls._diff_level(split(old_units[pair_i]), split(new_units[pair_j]), position, depth + 1))
+                position += len(new_units[pair_j].split())
+            i, j = pair_i + 1, pair_j + 1
+
+        return changes
+
+    @staticmethod
+    def _whole_units(old_units: List[str], new_units: List[str], position: int, level: str) -> List[DiffChange]:
+        """Report units as deleted and inserted as a whole."""
+        changes = []
+        old_words = [word for unit in old_units for word in unit.split()]
+        new_words = [word for unit in new_units for word in unit.split()]
+        if old_words:
+            changes.append(DiffChange(type='delete', content=old_words, position=position, level=level))
+        if new_words:
+            changes.append(DiffChange(type='insert', content=new_words, position=position, level=level))
+        return changes
+
+    @staticmethod
+    def _diff_words(old_words: List[str], new_words: List[str], offset: int) -> List[DiffChange]:
+        """Diff two word lists; positions are indexes into the new text, starting at offset."""
+        changes = []
+        position = offset
+
+        for tag, i1, i2, j1, j2 in diff_opcodes(old_words, new_words):
             if tag == 'equal':
                 position += (i2 - i1)
             elif tag == 'delete':
@@ -111,29 +568,3 @@ class DiffService:
                 position += (j2 - j1)
 
         return changes
-
-    def _calculate_stats(
-        self,
-        changes: List[DiffChange],
-        old_title: str,
-        new_title: str
-    ) -> DiffStats:
-        """Calculate diff statistics."""
-        words_added = sum(
-            len(change.content)
-            for change in changes
-            if change.type == 'insert'
-        )
-
-        words_removed = sum(
-            len(change.content)
-            for change in changes
-            if change.type == 'delete'
-        )
-
-        return DiffStats(
-            words_added=words_added,
-            words_removed=words_removed,
-            net_change=words_added - words_removed,
-            title_changed=old_title != new_title
-        )
@@ -0,0 +1,81 @@
+"""Boilerplate-insensitive content fingerprints."""
+import hashlib
+import re
+from typing import Iterable, Optional, Tuple
+
+# Shingle size for SimHash features
+_SHINGLE = 3
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(words: list) -> int:
+    """64-bit SimHash over word shingles (near-identical texts differ in few bits)."""
+    if len(words) < _SHINGLE:
+        features = [' '.join(words)]
+    else:
+        features = [' '.join(words[i:i + _SHINGLE]) for i in range(len(words) - _SHINGLE + 1)]
+
+    weights = [0] * 64
+    for feature in features:
+        h = _feature_hash(feature)
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: str, b: str) -> int:
+    """Number of differing bits between two hex SimHash values."""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+class Fingerprinter:
+    """Normalizes extracted text and fingerprints it.
+
+    `patterns` are regular expressions (case-insensitive) applied to each
+    paragraph; matches are removed and paragraphs left empty are dropped.
+    Anchor a pattern with ^...$ to drop whole teaser or timestamp lines.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    def normalize(self, text: str) -> str:
+        """Return lowercased, whitespace-collapsed text without boilerplate."""
+        paragraphs = []
+        for paragraph in text.split('\n\n'):
+            for pattern in self.patterns:
+                paragraph = pattern.sub('', paragraph)
+            paragraph = ' '.join(paragraph.split())
+            if paragraph:
+                paragraphs.append(paragraph.lower())
+        return ' '.join(paragraphs)
+
+    def fingerprint(self, text: str) -> Tuple[str, str]:
+        """Return (SHA256 of the normalized text, hex SimHash of it)."""
+        normalized = self.normalize(text)
+        return (
+            hashlib.sha256(normalized.encode('utf-8')).hexdigest(),
+            f'{simhash(normalized.split()):016x}'
+        )
+
+    @staticmethod
+    def is_same(
+        fingerprint: str,
+        simhash_hex: str,
+        previous_fingerprint: Optional[str],
+        previous_simhash: Optional[str],
+        threshold: int
+    ) -> bool:
+        """Check if a fingerprint matches the previous version's (None = unknown)."""
+        if previous_fingerprint is None:
+            return False
+        if fingerprint == previous_fingerprint:
+            return True
+        return (
+            threshold > 0
+            and previous_simhash is not None
+            and hamming_distance(simhash_hex, previous_simhash) <= threshold
+        )
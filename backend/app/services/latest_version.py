@@ -0,0 +1,78 @@
+"""Backfill of the denormalized latest-version columns on Article."""
+from sqlalchemy import select, update, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Article, ArticleVersion
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_latest_versions(session: AsyncSession, batch_size: int = 500) -> int:
+    """Fill latest_version_id/latest_content_hash/latest_word_count where missing.
+
+    Walks articles without a latest-version pointer in id order, one batch
+    (and one commit) at a time, so it can be interrupted and re-run.
+    Returns the number of articles updated.
+    """
+    updated = 0
+    last_id = 0
+
+    while True:
+        result = await session.execute(
+            select(Article.id)
+            .where(Article.latest_version_id.is_(None), Article.id > last_id)
+            .order_by(Article.id)
+            .limit(batch_size)
+        )
+        article_ids = result.scalars().all()
+        if not article_ids:
+            break
+        last_id = article_ids[-1]
+
+        latest = (
+            select(
+                ArticleVersion.article_id,
+                func.max(ArticleVersion.version_number).label('version_number')
+            )
+            .where(ArticleVersion.article_id.in_(article_ids))
+            .group_by(ArticleVersion.article_id)
+            .subquery()
+        )
+        result = await session.execute(
+            select(
+                ArticleVersion.id,
+                ArticleVersion.article_id,
+                ArticleVersion.version_number,
+                ArticleVersion.content_hash,
+                ArticleVersion.word_count,
+                ArticleVersion.fingerprint,
+                ArticleVersion.simhash
+            ).join(
+                latest,
+                and_(
+                    ArticleVersion.article_id == latest.c.article_id,
+                    ArticleVersion.version_number == latest.c.version_number
+                )
+            )
+        )
+        rows = [
+            {
+                'id': row.article_id,
+                'latest_version_id': row.id,
+                'latest_content_hash': row.content_hash,
+                'latest_word_count': row.word_count,
+                'latest_fingerprint': row.fingerprint,
+                'latest_simhash': row.simhash,
+                'version_count': row.version_number,
+            }
+            for row in result.all()
+        ]
+
+        # Articles without any versions keep NULL and are skipped by the keyset
+        if rows:
+            await session.execute(update(Article), rows)
+            await session.commit()
+            updated += len(rows)
+            logger.info(f"Backfilled latest version for {updated} articles")
+
+    return updated
@@ -0,0 +1,70 @@
+"""Change-likelihood prioritization of discovered article URLs."""
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.config import settings
+from app.scrapers import DiscoveredArticle
+from app.services.article_context import ArticleContext
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes (as stored by SQLite) as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def score_candidate(
+    candidate: DiscoveredArticle,
+    article: Optional[ArticleContext],
+    now: datetime
+) -> float:
+    """Estimate how likely a check of this URL is to find a change.
+
+    - New URLs always yield a version, so they start at 1.0.
+    - Known articles use their smoothed edit rate,
+      (version_count - 1 + 1) / (check_count + 2).
+    - A feed/sitemap date newer than the last check means the page was
+      touched since we last looked, which is a strong signal.
+    - Everything decays with article age (half-life configurable), and
+      items near the top of a feed get a boost.
+    """
+    published = _aware(candidate.published)
+    first_seen = _aware(article.first_seen_at) if article else None
+    last_checked = _aware(article.last_checked_at) if article else None
+
+    if article is None:
+        change_rate = 1.0
+    else:
+        edits = max((article.version_count or 1) - 1, 0)
+        change_rate = (edits + 1) / ((article.check_count or 0) + 2)
+        if published and last_checked and published > last_checked:
+            change_rate += 1.0
+
+    # Age from the earliest date we know about
+    born = min(d for d in (published, first_seen, now) if d is not None)
+    age_hours = max((now - born).total_seconds() / 3600, 0.0)
+    recency = 0.5 ** (age_hours / settings.PRIORITY_AGE_HALF_LIFE_HOURS)
+
+    position = candidate.feed_position
+    position_boost = 1.0 / (1.0 + position / 10.0) if position is not None else 0.5
+
+    return change_rate * (0.25 + 0.75 * recency) * (0.5 + 0.5 * position_boost)
+
+
+def prioritize(
+    candidates: List[DiscoveredArticle],
+    articles: Dict[str, ArticleContext],
+    limit: int,
+    now: Optional[datetime] = None
+) -> List[DiscoveredArticle]:
+    """Return the `limit` candidates most likely to have changed.
+
+    `articles` maps candidate URLs to their existing article state.
+    """
+    now = now or datetime.now(timezone.utc)
+    ranked = sorted(
+        candidates,
+        key=lambda c: score_candidate(c, articles.get(c.url), now),
+        reverse=True
+    )
+    return ranked[:limit]
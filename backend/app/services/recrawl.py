@@ -0,0 +1,43 @@
+"""Adaptive per-article recrawl scheduling."""
+from datetime import datetime, timedelta
+from typing import Optional, Union
+from app.config import settings
+from app.models import Article, NewsSource
+from app.services.article_context import ArticleContext
+
+
+def schedule_next_check(
+    article: Union[Article, ArticleContext],
+    source: NewsSource,
+    changed: bool,
+    now: Optional[datetime] = None
+):
+    """Update an article's recrawl state after a check.
+
+    Articles younger than 24h start from scrape_interval_active, older
+    ones from scrape_interval_archive. Every consecutive unchanged check
+    doubles the interval (up to RECRAWL_MAX_INTERVAL_HOURS); a detected
+    change resets it. Articles older than RECRAWL_MAX_AGE_DAYS are retired.
+    """
+    now = now or datetime.utcnow()
+
+    if changed:
+        article.unchanged_checks = 0
+    else:
+        article.unchanged_checks = (article.unchanged_checks or 0) + 1
+
+    first_seen = article.first_seen_at.replace(tzinfo=None) if article.first_seen_at else now
+    age = now - first_seen
+
+    if age > timedelta(days=settings.RECRAWL_MAX_AGE_DAYS):
+        article.is_active = False
+
+    base_minutes = source.scrape_interval_active or 15
+    if age > timedelta(hours=24):
+        base_minutes = max(base_minutes, source.scrape_interval_archive or 60)
+
+    interval_minutes = min(
+        base_minutes * 2 ** min(article.unchanged_checks, 16),
+        settings.RECRAWL_MAX_INTERVAL_HOURS * 60
+    )
+    article.next_check_at = now + timedelta(minutes=interval_minutes)
@@ -0,0 +1,383 @@
+"""Offline re-extraction of stored versions."""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from sqlalchemy import select, update, delete, func, and_, or_, bindparam
+from app.models import Article, ArticleDiff, ArticleVersion, NewsSource
+from app.scrapers import BaseScraper
+from app.scrapers.base import LEGACY_EXTRACTOR_ID
+from app.scrapers.html_archive import html_archive
+from app.services.fingerprint import Fingerprinter
+from app.services.scraper_service import ScraperService
+from app.services.version_store import load_chunks, resolve_contents
+from app.utils.text import content_hash, count_words
+
+logger = logging.getLogger(__name__)
+
+# Columns rewritten from archived HTML; text mode only recomputes the derived ones
+HTML_FIELDS = (
+    'title', 'byline', 'content', 'meta_description', 'meta_keywords',
+    'published_date', 'modified_date',
+)
+DERIVED_FIELDS = ('content_hash', 'word_count', 'fingerprint', 'simhash')
+
+_fingerprinters: Dict[Tuple[str, ...], Fingerprinter] = {}
+
+
+def _differs(stored, new) -> bool:
+    """Compare a stored column value with a recomputed one.
+
+    SQLite returns naive datetimes, so datetimes are compared in UTC.
+    """
+    if isinstance(stored, datetime) and isinstance(new, datetime):
+        return _as_utc(stored) != _as_utc(new)
+    return stored != new
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def reextract_items(
+    items: List[Tuple[int, Tuple[str, ...], Callable, str, Optional[bytes], Optional[str]]]
+) -> List[Tuple[int, Dict]]:
+    """Re-run extraction and hashing for (version_id, patterns, extractor, extractor_id, html, text) items.
+
+    Items with HTML are extracted from it with the source's extractor; the
+    others only get their derived columns recomputed from the stored text.
+    Module-level so it can run in a worker process.
+    """
+    results = []
+    for version_id, patterns, extractor, extractor_id, html, text in items:
+        fingerprinter = _fingerprinters.get(patterns)
+        if fingerprinter is None:
+            fingerprinter = _fingerprinters[patterns] = Fingerprinter(patterns)
+
+        values = {}
+        if html is not None:
+            data = extractor(html)
+            if not data['content']:
+                continue
+            values = {field: data[field] for field in HTML_FIELDS}
+            values['extractor_id'] = extractor_id
+            text = data['content']
+
+        fingerprint, simhash = fingerprinter.fingerprint(text)
+        values.update({
+            'content_hash': content_hash(text),
+            'word_count': count_words(text),
+            'fingerprint': fingerprint,
+            'simhash': simhash,
+        })
+        results.append((version_id, values))
+    return results
+
+
+@dataclass
+class ReextractProgress:
+    """Resumable position and counters, persisted as the checkpoint file."""
+    last_id: int = 0
+    processed: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'ReextractProgress':
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return cls(**json.load(f))
+        return cls()
+
+    def save(self, path: Optional[str]):
+        if not path:
+            return
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp_path, path)
+
+
+class Reextractor:
+    """Streams versions in id order through a process pool and writes back changes.
+
+    - source 'html' re-extracts versions from the HTML archive (versions
+      without archived HTML are skipped), 'text' recomputes hashes, word
+      counts and fingerprints from the stored text, and 'auto' uses HTML
+      where available and text otherwise.
+    - Versions stored as deltas or chunks, and full versions that a later
+      delta is encoded against, are not rewritten from HTML (they get the
+      text treatment instead), since rewriting them would corrupt the
+      versions built on their text; convert them to full storage first
+      (python -m app.cli convert-versions full).
+    - Each batch is one transaction; the checkpoint is saved after it
+      commits, so an interrupted run resumes where it stopped. Dry runs
+      do not save it.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        source: str = 'auto',
+        batch_size: int = 500,
+        workers: int = 0,
+        checkpoint_path: Optional[str] = None,
+        limit: Optional[int] = None,
+        dry_run: bool = False
+    ):
+        if source not in ('auto', 'html', 'text'):
+            raise ValueError(f"Unknown re-extraction source: {source}")
+        self.session_factory = session_factory
+        self.source = source
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_path = checkpoint_path
+        self.limit = limit
+        self.dry_run = dry_run
+        self.progress = ReextractProgress.load(checkpoint_path)
+
+    async def run(self) -> ReextractProgress:
+        """Process all versions after the checkpoint (at least `limit` of them, if set).
+
+        Returns the final progress.
+        """
+        async with self.session_factory() as session:
+            scraping = await self._load_scraping(session)
+            result = await session.execute(
+                select(func.count(ArticleVersion.id)).where(ArticleVersion.id > self.progress.last_id)
+            )
+            total = min(result.scalar() or 0, self.limit or float('inf'))
+
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        started = time.monotonic()
+        done = 0
+        try:
+            # Read the next batch while the pool works on the current one
+            next_batch = asyncio.create_task(self._read_batch(self.progress.last_id, scraping))
+            while True:
+                items, last_id, skipped = await next_batch
+                if not items and last_id is None:
+                    break
+                next_batch = asyncio.create_task(self._read_batch(last_id, scraping))
+
+                results = await self._extract(pool, items)
+                updated = await self._write(results)
+
+                done += len(items) + skipped
+                self.progress.last_id = last_id
+                self.progress.processed += len(items)
+                self.progress.skipped += skipped
+                self.progress.updated += updated
+                if not self.dry_run:
+                    self.progress.save(self.checkpoint_path)
+
+                elapsed = time.monotonic() - started
+                rate = done / elapsed if elapsed else 0.0
+                eta = (total - done) / rate if rate else 0.0
+                logger.info(
+                    f"Re-extracted {done}/{total} versions "
+                    f"({rate:.0f}/s, eta {eta / 60:.1f} min), "
+                    f"updated={self.progress.updated}, skipped={self.progress.skipped}"
+                )
+                if self.limit and done >= self.limit:
+                    next_batch.cancel()
+                    break
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        return self.progress
+
+    async def _load_scraping(self, session) -> Dict[int, Tuple[Tuple[str, ...], Callable, str]]:
+        """Boilerplate patterns, extractor and extractor id per source id, as used when scraping."""
+        registry = ScraperService(session).scraper_registry
+        result = await session.execute(select(NewsSource))
+        scraping = {}
+        for source in result.scalars().all():
+            scraper_class = registry.get(source.scraper_class, BaseScraper)
+            patterns = tuple(scraper_class.boilerplate_patterns + (source.boilerplate_patterns or []))
+            scraping[source.id] = (patterns, scraper_class.extractor, scraper_class.extractor_id)
+        return scraping
+
+    async def _read_batch(self, after_id: int, scraping: Dict[int, Tuple[Tuple[str, ...], Callable, str]]):
+        """Load the next batch of work items. Returns (items, last_id, skipped)."""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(ArticleVersion, Article.source_id)
+                .join(Article, Article.id == ArticleVersion.article_id)
+                .where(ArticleVersion.id > after_id)
+                .order_by(ArticleVersion.id)
+                .limit(self.batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return [], None, 0
+
+            # Versions that a later delta is encoded against keep their text too
+            article_ids = list({version.article_id for version, _ in rows})
+            result = await session.execute(
+                select(ArticleVersion.article_id, ArticleVersion.version_number)
+                .where(ArticleVersion.article_id.in_(article_ids), ArticleVersion.delta.is_not(None))
+            )
+            delta_versions = set(result.all())
+
+            items = []
+            skipped = 0
+            text_needed: Dict[int, List[int]] = {}
+            for version, source_id in rows:
+                encoded = version.delta is not None or version.chunk_hashes is not None
+                pinned = encoded or (version.article_id, version.version_number + 1) in delta_versions
+                html = None
+                if self.source != 'text' and version.raw_html_hash and not pinned and html_archive.enabled:
+                    html = await html_archive.get_async(version.raw_html_hash)
+
+                if html is None and self.source == 'html':
+                    skipped += 1
+                    continue
+
+                text = None
+                if html is None:
+                    if encoded:
+                        text_needed.setdefault(version.article_id, []).append(version.version_number)
+                    else:
+                        text = version.content
+                patterns, extractor, extractor_id = scraping.get(
+                    source_id, ((), BaseScraper.extractor, BaseScraper.extractor_id)
+                )
+                items.append([version.id, patterns, extractor, extractor_id, html, text])
+
+            if text_needed:
+                contents = await self._load_texts(session, text_needed)
+                numbers = {version.id: (version.article_id, version.version_number) for version, _ in rows}
+                for item in items:
+                    if item[4] is None and item[5] is None:
+                        item[5] = contents[numbers[item[0]]]
+
+            return [tuple(item) for item in items], rows[-1][0].id, skipped
+
+    @staticmethod
+    async def _load_texts(session, wanted: Dict[int, List[int]]) -> Dict[Tuple[int, int], str]:
+        """Rebuild the text of encoded versions, reading each article's chain once.
+
+        Returns {(article_id, version_number): text}.
+        """
+        contents = {}
+        article_ids = list(wanted)
+        # Chunk to stay below database bind parameter limits
+        for i in range(0, len(article_ids), 100):
+            result = await session.execute(
+                select(ArticleVersion).where(or_(*[
+                    and_(ArticleVersion.article_id == article_id, ArticleVersion.version_number <= max(wanted[article_id]))
+                    for article_id in article_ids[i:i + 100]
+                ]))
+            )
+            versions = result.scalars().all()
+            chunks = await load_chunks(session, versions)
+            chains: Dict[int, List[ArticleVersion]] = {}
+            for version in versions:
+                chains.setdefault(version.article_id, []).append(version)
+            for article_id, chain in chains.items():
+                texts = resolve_contents(chain, chunks)
+                contents.update({(article_id, number): texts[number] for number in wanted[article_id]})
+        return contents
+
+    async def _extract(self, pool: ProcessPoolExecutor, items: List) -> List[Tuple[int, Dict]]:
+        """Spread items over the pool in one chunk per worker."""
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        size = -(-len(items) // self.workers)
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(pool, reextract_items, chunk) for chunk in chunks
+        ])
+        return [item for chunk in results for item in chunk]
+
+    async def _write(self, results: List[Tuple[int, Dict]]) -> int:
+        """Write back changed values in one transaction. Returns the number of changed versions."""
+        if not results:
+            return 0
+
+        async with self.session_factory() as session:
+            ids = [version_id for version_id, _ in results]
+            result = await session.execute(select(ArticleVersion).where(ArticleVersion.id.in_(ids)))
+            current = {version.id: version for version in result.scalars().all()}
+
+            updates = []
+            for version_id, values in results:
+                version = current[version_id]
+                changed = {key: value for key, value in values.items() if _differs(getattr(version, key), value)}
+                if changed:
+                    updates.append({'id': version_id, **changed})
+
+            # Keep Article's denormalized latest-version columns in step,
+            # including ones that went stale while the version itself did not.
+            # Articles re-baselined to a newer extractor than their latest
+            # version's keep their hashes, unless the version was re-extracted.
+            result = await session.execute(
+                select(
+                    Article.id,
+                    Article.latest_version_id,
+                    Article.latest_content_hash,
+                    Article.latest_word_count,
+                    Article.latest_fingerprint,
+                    Article.latest_simhash,
+                    Article.extractor_id,
+                )
+                .where(Article.latest_version_id.in_(ids))
+            )
+            recomputed = dict(results)
+            article_updates = []
+            for row in result.all():
+                version = current[row.latest_version_id]
+                values = recomputed[version.id]
+                if 'extractor_id' not in values and (
+                    (version.extractor_id or LEGACY_EXTRACTOR_ID) != (row.extractor_id or LEGACY_EXTRACTOR_ID)
+                ):
+                    continue
+                merged = {key: values.get(key, getattr(version, key)) for key in DERIVED_FIELDS + ('extractor_id',)}
+                latest = {
+                    'latest_content_hash': merged['content_hash'],
+                    'latest_word_count': merged['word_count'],
+                    'latest_fingerprint': merged['fingerprint'],
+                    'latest_simhash': merged['simhash'],
+                    'extractor_id': merged['extractor_id'],
+                }
+                if any(getattr(row, key) != value for key, value in latest.items()):
+                    article_updates.append({'id': row.id, **latest})
+
+            if self.dry_run or not (updates or article_updates):
+                return len(updates)
+
+            # Plain UPDATEs by primary key; the loaded rows are stale afterwards
+            session.expunge_all()
+            if updates:
+                await session.execute(update(ArticleVersion), updates)
+            if article_updates:
+                await session.execute(update(Article), article_updates)
+
+            # Stored diffs involving a rewritten text are stale
+            rewritten = [
+                {'diff_article_id': current[u['id']].article_id, 'number': current[u['id']].version_number}
+                for u in updates if 'content' in u
+            ]
+            if rewritten:
+                await session.execute(
+                    delete(ArticleDiff.__table__).where(
+                        ArticleDiff.article_id == bindparam('diff_article_id'),
+                        or_(
+                            ArticleDiff.from_version == bindparam('number'),
+                            ArticleDiff.to_version == bindparam('number')
+                        )
+                    ),
+                    rewritten
+                )
+            await session.commit()
+            return len(updates)
@@ -1,17 +1,31 @@
 """Scraper service orchestration."""
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
-import hashlib
 from urllib.parse import urlparse, urlunparse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.models import NewsSource, Article, ArticleVersion
+from app.config import settings
+from app.models import NewsSource, Article, FeedCache
 from app.scrapers import (
     SVTNyheterScraper,
     GenericRSSScraper,
-    BaseScraper
+    BaseScraper,
+    DiscoveredArticle
 )
-from app.database import async_session
+from app.scrapers.base import LEGACY_EXTRACTOR_ID
+from app.scrapers.feed_cache import FeedValidatorCache
+from app.scrapers.rate_limiter import rate_limiter
+from app.scrapers.html_archive import html_archive
+from app.services.prioritizer import prioritize
+from app.services.recrawl import schedule_next_check
+from app.services.fingerprint import Fingerprinter
+from app.services.version_writer import PendingWrite, VersionWriter
+from app.services.article_context import (
+    ArticleContext,
+    load_article_contexts,
+    load_due_article_contexts
+)
+from app.utils.text import content_hash, count_words
 import logging
 import asyncio
 
@@ -19,11 +33,6 @@ logger = logging.getLogger(__name__)
 
 
 # Inline utility functions
-def _content_hash(text: str) -> str:
-    """Generate SHA256 hash of text content."""
-    return hashlib.sha256(text.encode('utf-8')).hexdigest()
-
-
 def _normalize_url(url: str) -> str:
     """Normalize URL by removing fragments."""
     parsed = urlparse(url)
@@ -38,11 +47,6 @@ def _normalize_url(url: str) -> str:
     return normalized.rstrip('/')
 
 
-def _count_words(text: str) -> int:
-    """Count words in text."""
-    return len(text.split()) if text else 0
-
-
 class ScraperService:
     """Service for orchestrating article scraping."""
 
@@ -86,45 +90,115 @@ class ScraperService:
             logger.error(f"Scraper class {source.scraper_class} not found for {source.name}")
             return {'status': 'failed', 'reason': 'scraper not found'}
 
+        # All requests to this source's host share one token bucket
+        rate_limiter.configure(
+            urlparse(source.base_url).netloc,
+            source.rate_limit_per_second,
+            source.rate_limit_burst
+        )
+
         articles_discovered = 0
         articles_updated = 0
         errors = []
 
         try:
+            # Load feed validators so unchanged feeds are not re-downloaded
+            scraper.feed_cache = await self._load_feed_cache(scraper.get_rss_urls())
+
             # Discover article URLs (with 8 concurrent feed fetches)
-            urls = await scraper.discover_articles(
-                limit=source.max_articles_per_scrape,
-                concurrent_feeds=8
+            candidates = await scraper.discover_candidates(concurrent_feeds=8)
+            articles_discovered = len(candidates)
+
+            await self._save_feed_cache(scraper.feed_cache)
+            logger.info(
+                f"Feed cache for {source.name}: "
+                f"hits={scraper.feed_cache.hits}, misses={scraper.feed_cache.misses}"
             )
-            articles_discovered = len(urls)
 
-            logger.info(f"Discovered {articles_discovered} articles for {source.name}")
+            # Resolve all discovered URLs to existing articles and latest hashes up front
+            contexts = await load_article_contexts(
+                self.db, list({_normalize_url(c.url) for c in candidates})
+            )
+            known_articles = {
+                c.url: contexts[_normalize_url(c.url)]
+                for c in candidates if _normalize_url(c.url) in contexts
+            }
+
+            # Known articles are only re-checked when due (or touched since the last check)
+            candidates = [c for c in candidates if self._is_due(known_articles.get(c.url), c)]
 
-            # Process articles concurrently (limited to 8 at a time)
+            # Add due articles that have dropped out of the feeds
+            listed = {_normalize_url(c.url) for c in candidates}
+            due_articles = await load_due_article_contexts(
+                self.db, source.id, datetime.utcnow(), source.max_articles_per_scrape
+            )
+            for context in due_articles:
+                contexts[context.url] = context
+                if context.url not in listed:
+                    candidates.append(DiscoveredArticle(context.url))
+                    known_articles[context.url] = context
+
+            # Spend the per-run budget on the articles most likely to have changed
+            selected = prioritize(
+                candidates,
+                known_articles,
+                limit=source.max_articles_per_scrape
+            )
+            # One check per article, however many URL variants were discovered
+            urls = list({_normalize_url(c.url): c.url for c in reversed(selected)}.values())[::-1]
+
+            logger.info(
+                f"Discovered {articles_discovered} articles for {source.name}, "
+                f"checking {len(urls)}"
+            )
+
+            # Fetch and extract concurrently (limited to 8 at a time); a single
+            # writer commits the results in batches behind the workers
             semaphore = asyncio.Semaphore(8)
+            writer = VersionWriter()
+            writer.start()
+            fingerprinter = Fingerprinter(scraper.boilerplate_patterns + (source.boilerplate_patterns or []))
 
             async def process_with_limit(url: str) -> tuple:
                 async with semaphore:
-                    # Create a new database session for each article
-                    async with async_session() as session:
-                        try:
-                            await self._process_article(session, source, scraper, url)
-                            return (True, None)
-                        except Exception as e:
-                            error_msg = f"Error processing {url}: {str(e)}"
-                            logger.error(error_msg)
-                            await session.rollback()
-                            return (False, error_msg)
+                    try:
+                        write = await self._check_article(
+                            source, scraper, fingerprinter, url, contexts.get(_normalize_url(url))
+                        )
+                        if write is None:
+                            return ('empty', None)
+                        await writer.put(write)
+                        return (None, None)
+                    except Exception as e:
+                        error_msg = f"Error processing {url}: {str(e)}"
+                        logger.error(error_msg)
+                        return (None, error_msg)
 
             # Process all URLs concurrently
-            results = await asyncio.gather(*[process_with_limit(url) for url in urls])
+            try:
+                results = await asyncio.gather(*[process_with_limit(url) for url in urls])
+            finally:
+                await writer.close()
+
+            # Running totals of how often the source honors article validators
+            if scraper.conditional_requests:
+                source.conditional_requests = (source.conditional_requests or 0) + scraper.conditional_requests
+                source.not_modified_responses = (source.not_modified_responses or 0) + scraper.not_modified
+                await self.db.commit()
 
             # Count successes and collect errors
-            for success, error in results:
-                if success:
-                    articles_updated += 1
-                else:
+            outcomes = dict(writer.outcomes)
+            errors.extend(writer.errors)
+            for outcome, error in results:
+                if error is not None:
                     errors.append(error)
+                elif outcome is not None:
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            articles_updated = sum(outcomes.values())
+
+            # Efficiency of the run: new or changed versions per HTTP request made
+            changes_detected = outcomes.get('new', 0) + outcomes.get('changed', 0)
+            changes_per_request = changes_detected / scraper.request_count if scraper.request_count else 0.0
 
             # Calculate scrape duration
             completed_at = datetime.utcnow()
@@ -137,14 +211,32 @@ class ScraperService:
                 f"duration={duration:.1f}s, "
                 f"discovered={articles_discovered}, "
                 f"updated={articles_updated}, "
-                f"errors={len(errors)}"
+                f"errors={len(errors)}, "
+                f"changes={changes_detected}, "
+                f"identical={outcomes.get('identical', 0)}, "
+                f"not_modified={scraper.not_modified}/{scraper.conditional_requests}, "
+                f"requests={scraper.request_count}, "
+                f"changes_per_request={changes_per_request:.3f}"
             )
 
             return {
                 'status': status,
                 'articles_discovered': articles_discovered,
                 'articles_updated': articles_updated,
-                'errors': len(errors)
+                'errors': len(errors),
+                'new_articles': outcomes.get('new', 0),
+                'changed_articles': outcomes.get('changed', 0),
+                'suppressed_versions': outcomes.get('suppressed', 0),
+                'identical_pages': outcomes.get('identical', 0),
+                'rebaselined_articles': outcomes.get('rebaselined', 0),
+                'not_modified_pages': outcomes.get('not_modified', 0),
+                'conditional_requests': scraper.conditional_requests,
+                'not_modified_responses': scraper.not_modified,
+                'head_probes': scraper.head_probes,
+                'http_requests': scraper.request_count,
+                'changes_per_request': round(changes_per_request, 4),
+                'feed_cache_hits': scraper.feed_cache.hits,
+                'feed_cache_misses': scraper.feed_cache.misses
             }
 
         except Exception as e:
@@ -156,105 +248,280 @@ class ScraperService:
             )
             return {'status': 'failed', 'reason': str(e)}
 
-        finally:
-            await scraper.close()
+    @staticmethod
+    def _is_due(article: Optional[ArticleContext], candidate: DiscoveredArticle) -> bool:
+        """Check if a discovered URL should be fetched this run."""
+        if article is None:
+            return True
+        if not article.is_active:
+            return False
+        if article.next_check_at is None:
+            return True
+
+        now = datetime.utcnow()
+        if article.next_check_at.replace(tzinfo=None) <= now:
+            return True
+
+        # Feed or sitemap says the page changed after our last check
+        published = candidate.published.astimezone(timezone.utc).replace(tzinfo=None) if candidate.published else None
+        last_checked = article.last_checked_at.replace(tzinfo=None) if article.last_checked_at else None
+        return bool(published and last_checked and published > last_checked)
+
+    async def _load_feed_cache(self, feed_urls: List[str]) -> FeedValidatorCache:
+        """Load persisted feed validators for the given feed URLs."""
+        result = await self.db.execute(
+            select(FeedCache).where(FeedCache.url.in_(feed_urls))
+        )
+        entries = {
+            row.url: {
+                'etag': row.etag,
+                'last_modified': row.last_modified,
+                'body_hash': row.body_hash,
+                'entries': row.entries or [],
+                'hit_count': row.hit_count or 0,
+                'miss_count': row.miss_count or 0,
+            }
+            for row in result.scalars().all()
+        }
+        return FeedValidatorCache(entries)
 
-    async def _process_article(self, session: AsyncSession, source: NewsSource, scraper: BaseScraper, url: str):
-        """Process a single article URL with its own database session."""
-        normalized_url = _normalize_url(url)
+    async def _save_feed_cache(self, cache: FeedValidatorCache):
+        """Persist validators for feeds fetched during this run."""
+        if not cache.updated:
+            return
 
-        # Check if article exists
-        result = await session.execute(
-            select(Article).where(Article.url == normalized_url)
+        result = await self.db.execute(
+            select(FeedCache).where(FeedCache.url.in_(list(cache.updated)))
         )
-        article = result.scalar_one_or_none()
+        rows = {row.url: row for row in result.scalars().all()}
+
+        for feed_url in cache.updated:
+            entry = cache.entries[feed_url]
+            row = rows.get(feed_url)
+            if not row:
+                row = FeedCache(url=feed_url)
+                self.db.add(row)
+            row.etag = entry.get('etag')
+            row.last_modified = entry.get('last_modified')
+            row.body_hash = entry.get('body_hash')
+            row.entries = entry.get('entries') or []
+            row.hit_count = entry.get('hit_count', 0)
+            row.miss_count = entry.get('miss_count', 0)
+            row.fetched_at = datetime.utcnow()
+
+        await self.db.commit()
+
+    async def _check_article(
+        self,
+        source: NewsSource,
+        scraper: BaseScraper,
+        fingerprinter: Fingerprinter,
+        url: str,
+        context: Optional[ArticleContext] = None
+    ) -> Optional[PendingWrite]:
+        """Fetch a single article URL and work out what needs to be written.
+
+        `context` is the prefetched state of the existing article (None for
+        new URLs), so no database access is needed here. A changed content
+        hash only creates a version if the boilerplate-insensitive
+        fingerprint changed too. Pages the server reports as not modified
+        (HTTP 304), or whose raw HTML hashes the same as on the last check,
+        are not extracted at all. When the scraper's extractor differs from
+        the one behind the stored hashes, the article is re-baselined to the
+        new extraction without a version. Returns None when no content
+        could be extracted.
+        """
+        normalized_url = _normalize_url(url)
 
-        # Fetch article content
-        article_data = await scraper.fetch_article(url)
+        # Fetch article content, conditionally for known articles
+        if context:
+            article_data = await scraper.fetch_article(
+                url,
+                previous_html_hash=context.html_hash,
+                etag=context.etag,
+                last_modified=context.last_modified,
+                head_probe=bool(source.head_probe)
+            )
+        else:
+            article_data = await scraper.fetch_article(url)
+        now = datetime.utcnow()
+
+        if article_data.get('not_modified') or article_data.get('html_unchanged'):
+            schedule_next_check(context, source, changed=False, now=now)
+            values = self._check_values(context, now)
+            values.update(self._validator_values(article_data))
+            return PendingWrite(
+                url=url,
+                outcome='not_modified' if article_data.get('not_modified') else 'identical',
+                article_id=context.article_id,
+                article_values=values
+            )
 
         if not article_data['content']:
             logger.warning(f"No content extracted for {url}")
-            return
+            return None
+
+        # Calculate content hash and fingerprint
+        c_hash = content_hash(article_data['content'])
+        fingerprint, simhash = fingerprinter.fingerprint(article_data['content'])
+
+        # If article doesn't exist, create it with its first version
+        if not context:
+            article_fields = {
+                'source_id': source.id,
+                'url': normalized_url,
+                'canonical_url': normalized_url,
+                'title': article_data['title'],
+                'first_seen_at': now,
+                'last_checked_at': now,
+                'is_active': True,
+                'check_count': 1,
+                'version_count': 1,
+                'last_html_hash': article_data['html_hash'],
+                **self._validator_values(article_data),
+            }
+            scheduled = Article(**article_fields)
+            schedule_next_check(scheduled, source, changed=True, now=now)
+            article_fields.update({
+                'next_check_at': scheduled.next_check_at,
+                'unchanged_checks': scheduled.unchanged_checks,
+            })
 
-        # Calculate content hash
-        c_hash = _content_hash(article_data['content'])
-
-        # If article doesn't exist, create it
-        if not article:
-            article = Article(
-                source_id=source.id,
-                url=normalized_url,
-                canonical_url=normalized_url,
-                title=article_data['title'],
-                first_seen_at=datetime.utcnow(),
-                last_checked_at=datetime.utcnow(),
-                is_active=True,
-                check_count=1,
-                version_count=1
+            logger.info(f"New article: {article_data['title'][:50]}...")
+            await self._archive_html(article_data)
+            return PendingWrite(
+                url=url,
+                outcome='new',
+                article_fields=article_fields,
+                version_fields=self._version_fields(1, article_data, c_hash, fingerprint, simhash, now)
             )
-            session.add(article)
-            await session.flush()
-
-            # Create first version
-            version = ArticleVersion(
-                article_id=article.id,
-                version_number=1,
-                title=article_data['title'],
-                byline=article_data['byline'],
-                content=article_data['content'],
-                content_hash=c_hash,
-                captured_at=datetime.utcnow(),
-                word_count=_count_words(article_data['content']),
-                meta_description=article_data['meta_description'],
-                meta_keywords=article_data['meta_keywords'],
-                published_date=article_data['published_date'],
-                modified_date=article_data['modified_date']
+
+        if (context.extractor_id or LEGACY_EXTRACTOR_ID) != scraper.extractor_id:
+            # The text comes from a different extractor than the stored hashes,
+            # so any difference may be the extractor's; compare from here on
+            schedule_next_check(context, source, changed=False, now=now)
+            values = self._check_values(context, now)
+            values.update(self._validator_values(article_data))
+            values.update({
+                'last_html_hash': article_data['html_hash'],
+                'latest_content_hash': c_hash,
+                'latest_fingerprint': fingerprint,
+                'latest_simhash': simhash,
+                'extractor_id': scraper.extractor_id,
+            })
+            logger.info(f"Re-baselined for extractor {scraper.extractor_id}: {url}")
+            return PendingWrite(
+                url=url,
+                outcome='rebaselined',
+                article_id=context.article_id,
+                article_values=values
             )
-            session.add(version)
-            await session.commit()
 
-            logger.info(f"New article: {article_data['title'][:50]}...")
+        # Article exists, check if content changed against the prefetched latest hash
+        changed = context.content_hash != c_hash
+        suppressed = changed and Fingerprinter.is_same(
+            fingerprint, simhash, context.fingerprint, context.simhash,
+            settings.FINGERPRINT_SIMHASH_THRESHOLD
+        )
+        changed = changed and not suppressed
+        schedule_next_check(context, source, changed=changed, now=now)
+        values = self._check_values(context, now)
+        values['last_html_hash'] = article_data['html_hash']
+        values.update(self._validator_values(article_data))
+
+        if not changed:
+            if context.fingerprint is None:
+                # Versions stored before fingerprinting: adopt the current one
+                values.update({'latest_fingerprint': fingerprint, 'latest_simhash': simhash})
+            if suppressed:
+                logger.info(f"Ignored boilerplate-only change: {url}")
+            return PendingWrite(
+                url=url,
+                outcome='suppressed' if suppressed else 'unchanged',
+                article_id=context.article_id,
+                article_values=values
+            )
 
-        else:
-            # Article exists, check if content changed
-            article.last_checked_at = datetime.utcnow()
-            article.check_count += 1
-
-            # Get latest version
-            result = await session.execute(
-                select(ArticleVersion)
-                .where(ArticleVersion.article_id == article.id)
-                .order_by(ArticleVersion.version_number.desc())
-                .limit(1)
+        # Content changed, create new version
+        new_version_number = context.version_count + 1
+        values.update({
+            'version_count': new_version_number,
+            'last_modified_at': now,
+            'title': article_data['title'],
+        })
+
+        logger.info(f"Updated article (v{new_version_number}): {article_data['title'][:50]}...")
+        await self._archive_html(article_data)
+        return PendingWrite(
+            url=url,
+            outcome='changed',
+            article_id=context.article_id,
+            article_values=values,
+            version_fields=self._version_fields(
+                new_version_number, article_data, c_hash, fingerprint, simhash, now
             )
-            latest_version = result.scalar_one_or_none()
-
-            # Check if content changed
-            if latest_version and latest_version.content_hash != c_hash:
-                # Content changed, create new version
-                new_version_number = latest_version.version_number + 1
-                article.version_count = new_version_number
-                article.last_modified_at = datetime.utcnow()
-                article.title = article_data['title']
-
-                version = ArticleVersion(
-                    article_id=article.id,
-                    version_number=new_version_number,
-                    title=article_data['title'],
-                    byline=article_data['byline'],
-                    content=article_data['content'],
-                    content_hash=c_hash,
-                    captured_at=datetime.utcnow(),
-                    word_count=_count_words(article_data['content']),
-                    meta_description=article_data['meta_description'],
-                    meta_keywords=article_data['meta_keywords'],
-                    published_date=article_data['published_date'],
-                    modified_date=article_data['modified_date']
-                )
-                session.add(version)
-                await session.commit()
-
-                logger.info(f"Updated article (v{new_version_number}): {article_data['title'][:50]}...")
-            else:
-                # No change
-                await session.commit()
+        )
+
+    @staticmethod
+    def _check_values(context: ArticleContext, now: datetime) -> Dict:
+        """Article column values recording a check (after schedule_next_check).
+
+        check_count is not among them: the writer increments it in SQL so
+        overlapping runs don't lose checks.
+        """
+        return {
+            'last_checked_at': now,
+            'next_check_at': context.next_check_at,
+            'unchanged_checks': context.unchanged_checks,
+            'is_active': context.is_active,
+        }
+
+    @staticmethod
+    def _validator_values(article_data: Dict) -> Dict:
+        """Article column values for the response validators (overlong ones are dropped)."""
+        etag = article_data.get('etag')
+        last_modified = article_data.get('last_modified')
+        return {
+            'http_etag': etag if etag and len(etag) <= 255 else None,
+            'http_last_modified': last_modified if last_modified and len(last_modified) <= 64 else None,
+        }
+
+    @staticmethod
+    async def _archive_html(article_data: Dict):
+        """Store the raw HTML of a page that becomes a version, if archiving is enabled."""
+        article_data['raw_html_hash'] = None
+        if not html_archive.enabled or not article_data.get('raw_html'):
+            return
+        try:
+            article_data['raw_html_hash'] = await html_archive.put_async(article_data['raw_html'])
+        except OSError as e:
+            # The archive is best effort; never lose a version over it
+            logger.warning(f"Could not archive HTML: {e}")
+
+    @staticmethod
+    def _version_fields(
+        version_number: int,
+        article_data: Dict,
+        c_hash: str,
+        fingerprint: str,
+        simhash: str,
+        captured_at: datetime
+    ) -> Dict:
+        """Build ArticleVersion column values from extracted article data."""
+        return {
+            'version_number': version_number,
+            'title': article_data['title'],
+            'byline': article_data['byline'],
+            'content': article_data['content'],
+            'content_hash': c_hash,
+            'fingerprint': fingerprint,
+            'simhash': simhash,
+            'captured_at': captured_at,
+            'word_count': count_words(article_data['content']),
+            'meta_description': article_data['meta_description'],
+            'meta_keywords': article_data['meta_keywords'],
+            'published_date': article_data['published_date'],
+            'modified_date': article_data['modified_date'],
+            'raw_html_hash': article_data.get('raw_html_hash'),
+            'extractor_id': article_data.get('extractor_id'),
+        }
@@ -0,0 +1,384 @@
+"""Delta- and chunk-encoded version storage and content reconstruction.
+
+In "delta" storage mode a version's text is stored as token edits against
+the previous version, with a full keyframe every VERSION_KEYFRAME_INTERVAL
+versions to bound reconstruction cost. Delta rows have an empty `content`
+and a non-null `delta`.
+
+In "chunks" mode a version's paragraphs are stored once each in
+content_chunks (reference counted) and the version keeps the ordered list
+of chunk hashes in `chunk_hashes`, with an empty `content`.
+
+Either way, everything else (hash, word count) describes the full text.
+"""
+import difflib
+import hashlib
+import logging
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select, update, delete, func, bindparam, type_coerce, LargeBinary
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import ArticleVersion, ContentChunk
+from app.models.types import compression_of, decompress_text
+from app.utils.compression import load_zstandard
+
+logger = logging.getLogger(__name__)
+# Split into alternating words and whitespace so ''.join() restores the text exactly
+_TOKEN_RE = re.compile(r'(\s+)')
+
+# Extracted content separates paragraphs with a blank line
+PARAGRAPH_SEPARATOR = '\n\n'
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into word and whitespace tokens."""
+    return _TOKEN_RE.split(text)
+
+
+def encode_delta(old_text: str, new_text: str) -> List[list]:
+    """Encode new_text as [start, end, replacement] edits on old_text's tokens."""
+    old_tokens = tokenize(old_text)
+    new_tokens = tokenize(new_text)
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    return [
+        [i1, i2, ''.join(new_tokens[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+def apply_delta(old_text: str, delta: List[list]) -> str:
+    """Rebuild a version's text from the previous text and its delta."""
+    old_tokens = tokenize(old_text)
+    parts = []
+    position = 0
+    for start, end, replacement in delta:
+        parts.extend(old_tokens[position:start])
+        parts.append(replacement)
+        position = end
+    parts.extend(old_tokens[position:])
+    return ''.join(parts)
+
+
+def is_keyframe(version_number: int) -> bool:
+    """Check if a version number is stored in full in delta mode."""
+    interval = settings.VERSION_KEYFRAME_INTERVAL
+    return interval <= 1 or (version_number - 1) % interval == 0
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split version text into paragraphs (the unit of chunk storage)."""
+    return text.split(PARAGRAPH_SEPARATOR)
+
+
+def chunk_hash(paragraph: str) -> str:
+    """Generate SHA256 hash of a paragraph."""
+    return hashlib.sha256(paragraph.encode('utf-8')).hexdigest()
+
+
+def resolve_contents(
+    versions: Iterable[ArticleVersion],
+    chunks: Optional[Dict[str, str]] = None
+) -> Dict[int, str]:
+    """Map version_number to full text for a contiguous run of one article's versions.
+
+    The run must start at a self-contained (non-delta) version, e.g. all
+    versions of an article as loaded through Article.versions. `chunks`
+    maps chunk hashes to text for chunk-stored versions (see load_chunks).
+    """
+    contents = {}
+    previous: Optional[str] = None
+    for version in sorted(versions, key=lambda v: v.version_number):
+        if version.chunk_hashes is not None:
+            previous = PARAGRAPH_SEPARATOR.join(chunks[h] for h in version.chunk_hashes)
+        elif version.delta is None:
+            previous = version.content
+        elif previous is not None:
+            previous = apply_delta(previous, version.delta)
+        else:
+            raise ValueError(
+                f"Version {version.version_number} of article {version.article_id} "
+                f"is a delta without a preceding keyframe"
+            )
+        contents[version.version_number] = previous
+    return contents
+
+
+async def load_contents(
+    session: AsyncSession,
+    article_id: int,
+    version_numbers: Iterable[int]
+) -> Dict[int, str]:
+    """Load the full text of specific versions, reading back to the nearest keyframe."""
+    version_numbers = list(version_numbers)
+    if not version_numbers:
+        return {}
+    first, last = min(version_numbers), max(version_numbers)
+
+    result = await session.execute(
+        select(func.max(ArticleVersion.version_number)).where(
+            ArticleVersion.article_id == article_id,
+            ArticleVersion.version_number <= first,
+            ArticleVersion.delta.is_(None)
+        )
+    )
+    keyframe = result.scalar() or first
+
+    result = await session.execute(
+        select(ArticleVersion).where(
+            ArticleVersion.article_id == article_id,
+            ArticleVersion.version_number.between(keyframe, last)
+        )
+    )
+    versions = result.scalars().all()
+    contents = resolve_contents(versions, await load_chunks(session, versions))
+    return {number: contents[number] for number in version_numbers if number in contents}
+
+
+async def load_chunks(session: AsyncSession, versions: Iterable[ArticleVersion]) -> Dict[str, str]:
+    """Load the chunk texts referenced by chunk-stored versions."""
+    hashes = list({h for v in versions if v.chunk_hashes for h in v.chunk_hashes})
+    chunks = {}
+    # Chunk to stay below database bind parameter limits
+    for i in range(0, len(hashes), 500):
+        result = await session.execute(
+            select(ContentChunk.hash, ContentChunk.text).where(ContentChunk.hash.in_(hashes[i:i + 500]))
+        )
+        chunks.update(dict(result.all()))
+    return chunks
+
+
+async def store_chunks(session: AsyncSession, texts: List[str]) -> List[List[str]]:
+    """Store the paragraphs of each text as chunks and return their hash lists.
+
+    New chunks are inserted, and every chunk's refcount goes up by the
+    number of texts referencing it. Must not run concurrently with other
+    writers of content_chunks (the VersionWriter is the only one).
+    """
+    hash_lists = []
+    paragraphs = {}
+    references = Counter()
+    for text in texts:
+        hashes = []
+        for paragraph in split_paragraphs(text):
+            h = chunk_hash(paragraph)
+            paragraphs[h] = paragraph
+            hashes.append(h)
+        references.update(set(hashes))
+        hash_lists.append(hashes)
+
+    existing = set()
+    needed = list(paragraphs)
+    for i in range(0, len(needed), 500):
+        result = await session.execute(
+            select(ContentChunk.hash).where(ContentChunk.hash.in_(needed[i:i + 500]))
+        )
+        existing.update(result.scalars().all())
+
+    session.add_all([
+        ContentChunk(hash=h, text=paragraphs[h], refcount=references[h])
+        for h in needed if h not in existing
+    ])
+    await _adjust_refcounts(session, {h: references[h] for h in existing})
+    await session.flush()
+    return hash_lists
+
+
+async def release_chunks(session: AsyncSession, hash_lists: List[List[str]]):
+    """Drop one reference per listed version from its chunks (see collect_chunks)."""
+    references = Counter()
+    for hashes in hash_lists:
+        references.update(set(hashes))
+    await _adjust_refcounts(session, {h: -n for h, n in references.items()})
+
+
+async def _adjust_refcounts(session: AsyncSession, changes: Dict[str, int]):
+    if not changes:
+        return
+    await session.execute(
+        update(ContentChunk.__table__)
+        .where(ContentChunk.hash == bindparam('chunk_hash'))
+        .values(refcount=ContentChunk.refcount + bindparam('change')),
+        [{'chunk_hash': h, 'change': n} for h, n in changes.items()]
+    )
+
+
+async def collect_chunks(session: AsyncSession) -> int:
+    """Delete chunks no longer referenced by any version. Returns the number deleted."""
+    result = await session.execute(delete(ContentChunk).where(ContentChunk.refcount <= 0))
+    await session.commit()
+    return result.rowcount
+
+
+def encode_fields(fields: Dict, previous_content: Optional[str], mode: Optional[str] = None) -> Dict:
+    """Return ArticleVersion column values in the given (default: configured) storage form.
+
+    Falls back to full text for keyframes, when the previous text is not
+    available, or when the delta would not be smaller than the text.
+    """
+    if (
+        (mode or settings.VERSION_STORAGE_MODE) != 'delta'
+        or previous_content is None
+        or is_keyframe(fields['version_number'])
+    ):
+        return fields
+
+    delta = encode_delta(previous_content, fields['content'])
+    if sum(len(replacement) + 16 for _, _, replacement in delta) >= len(fields['content']):
+        return fields
+    return {**fields, 'content': '', 'delta': delta}
+
+
+async def convert_storage(session: AsyncSession, mode: str, batch_size: int = 100) -> int:
+    """Rewrite existing versions into the given storage mode ("full", "delta" or "chunks").
+
+    Works through articles in id order, one batch (and one commit) at a
+    time, so it can be interrupted and re-run. Chunk refcounts are adjusted
+    as versions move in and out of chunk storage. Returns the number of
+    versions rewritten.
+    """
+    if mode not in ('full', 'delta', 'chunks'):
+        raise ValueError(f"Unknown storage mode: {mode}")
+
+    converted = 0
+    last_id = 0
+
+    while True:
+        result = await session.execute(
+            select(ArticleVersion.article_id)
+            .where(ArticleVersion.article_id > last_id)
+            .group_by(ArticleVersion.article_id)
+            .order_by(ArticleVersion.article_id)
+            .limit(batch_size)
+        )
+        article_ids = result.scalars().all()
+        if not article_ids:
+            break
+        last_id = article_ids[-1]
+
+        result = await session.execute(
+            select(ArticleVersion).where(ArticleVersion.article_id.in_(article_ids))
+        )
+        loaded = result.scalars().all()
+        chunks = await load_chunks(session, loaded)
+        by_article: Dict[int, List[ArticleVersion]] = {}
+        for version in loaded:
+            by_article.setdefault(version.article_id, []).append(version)
+
+        updates = []
+        released = []
+        to_chunk = []
+        for versions in by_article.values():
+            contents = resolve_contents(versions, chunks)
+            for version in sorted(versions, key=lambda v: v.version_number):
+                number = version.version_number
+                if mode == 'chunks':
+                    if version.chunk_hashes is None:
+                        to_chunk.append((version.id, contents[number]))
+                    continue
+                stored = encode_fields(
+                    {'version_number': number, 'content': contents[number]},
+                    contents.get(number - 1),
+                    mode
+                )
+                delta = stored.get('delta')
+                if version.chunk_hashes is not None or delta != version.delta or stored['content'] != version.content:
+                    updates.append({'id': version.id, 'content': stored['content'], 'delta': delta, 'chunk_hashes': None})
+                    if version.chunk_hashes is not None:
+                        released.append(version.chunk_hashes)
+
+        # Plain UPDATE by primary key; the loaded rows are stale afterwards
+        session.expunge_all()
+        if to_chunk:
+            hash_lists = await store_chunks(session, [text for _, text in to_chunk])
+            updates.extend(
+                {'id': version_id, 'content': '', 'delta': None, 'chunk_hashes': hashes}
+                for (version_id, _), hashes in zip(to_chunk, hash_lists)
+            )
+        await release_chunks(session, released)
+        if updates:
+            await session.execute(update(ArticleVersion), updates)
+        await session.commit()
+        converted += len(updates)
+        logger.info(f"Converted {converted} versions to {mode} storage")
+
+    return converted
+
+
+async def recompress_versions(session: AsyncSession, batch_size: int = 500) -> int:
+    """Rewrite stored version text whose compression differs from VERSION_COMPRESSION.
+
+    Keyset-paginated by id with one commit per batch, so it can run in the
+    background, be interrupted and be re-run. Returns the number of rows
+    rewritten.
+    """
+    target = settings.VERSION_COMPRESSION if settings.VERSION_COMPRESSION != 'none' else None
+    if target == 'zstd' and load_zstandard() is None:
+        target = 'zlib'
+
+    rewritten = 0
+    last_id = 0
+    # Read the raw stored bytes so rows already in the target format are skipped
+    raw_content = type_coerce(ArticleVersion.content, LargeBinary)
+    raw_meta = type_coerce(ArticleVersion.meta_description, LargeBinary)
+
+    while True:
+        result = await session.execute(
+            select(ArticleVersion.id, raw_content.label('content'), raw_meta.label('meta_description'))
+            .where(ArticleVersion.id > last_id)
+            .order_by(ArticleVersion.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        updates = [
+            {
+                'id': row.id,
+                'content': decompress_text(row.content),
+                'meta_description': decompress_text(row.meta_description) if row.meta_description is not None else None,
+            }
+            for row in rows
+            if compression_of(row.content) != target
+            or (row.meta_description is not None and compression_of(row.meta_description) != target)
+        ]
+        if updates:
+            await session.execute(update(ArticleVersion), updates)
+            await session.commit()
+            rewritten += len(updates)
+            logger.info(f"Recompressed {rewritten} versions")
+
+    return rewritten
+
+
+async def train_compression_dictionary(
+    session: AsyncSession,
+    output_path: str,
+    samples: int = 2000,
+    dict_size: int = 112640
+) -> int:
+    """Train a zstd dictionary on recent full-text versions and write it to output_path.
+
+    Returns the dictionary size in bytes. Point VERSION_COMPRESSION_DICT at
+    the file to use it (rows compressed with it need it to be read back).
+    """
+    zstandard = load_zstandard()
+    if zstandard is None:
+        raise RuntimeError("Training a dictionary needs the 'zstandard' package")
+
+    result = await session.execute(
+        select(ArticleVersion.content)
+        .where(ArticleVersion.delta.is_(None))
+        .order_by(ArticleVersion.id.desc())
+        .limit(samples)
+    )
+    texts = [content.encode('utf-8') for content in result.scalars().all() if content]
+    dictionary = zstandard.train_dictionary(dict_size, texts)
+    data = dictionary.as_bytes()
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return len(data)
@@ -0,0 +1,213 @@
+"""Write-behind stage for scrape results."""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func, update
+from app.config import settings
+from app.database import async_session
+from app.models import Article, ArticleDiff, ArticleVersion
+from app.services import version_store
+from app.services.diff_service import DiffService
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_and_diff(article_id: int, fields: Dict, previous_content: str) -> Tuple[Dict, ArticleDiff]:
+    """Storage form of a changed version and its diff against the previous text."""
+    number = fields['version_number']
+    diff = DiffService.compute_diff(article_id, number - 1, number, previous_content, fields['content'])
+    return version_store.encode_fields(fields, previous_content), diff
+
+
+@dataclass
+class PendingWrite:
+    """Result of checking one URL, waiting to be written.
+
+    - 'new': `article_fields` and `version_fields` describe rows to insert.
+    - 'changed': `version_fields` is inserted and `article_values` updated.
+    - 'unchanged' / 'suppressed' (only boilerplate changed) / 'identical'
+      (page bytes unchanged, not extracted) / 'not_modified' (HTTP 304) /
+      'rebaselined' (extractor changed): only `article_values` (check
+      counters, schedule, re-baselined hashes) is updated.
+
+    Every outcome but 'new' also increments the article's check_count.
+
+    Plain column values rather than ORM instances, so a failed batch can be
+    retried item by item with fresh objects.
+    """
+    url: str
+    outcome: str
+    article_id: Optional[int] = None
+    article_fields: Dict = field(default_factory=dict)
+    article_values: Dict = field(default_factory=dict)
+    version_fields: Optional[Dict] = None
+
+
+class VersionWriter:
+    """Single consumer that commits PendingWrites in batched transactions.
+
+    Fetch workers `put()` results on a bounded queue (so they back off when
+    the database falls behind); `run()` flushes a batch once it reaches
+    `batch_size` items or `flush_interval` seconds after its first item.
+    Other writers (an overlapping run, diffs stored by the API) may still
+    hold the SQLite write lock; flushes wait up to SQLITE_BUSY_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = async_session,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        queue_size: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.WRITE_FLUSH_INTERVAL
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.WRITE_QUEUE_SIZE)
+        self.outcomes: Dict[str, int] = {}
+        self.errors: List[str] = []
+        self.batches = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the writer task."""
+        self._task = asyncio.create_task(self.run())
+
+    async def put(self, write: PendingWrite):
+        """Queue a result for writing (waits while the queue is full)."""
+        await self.queue.put(write)
+
+    async def close(self):
+        """Flush everything queued so far and stop the writer."""
+        await self.queue.put(None)
+        if self._task:
+            await self._task
+
+    async def run(self):
+        """Collect queued writes into batches until close() is called."""
+        loop = asyncio.get_running_loop()
+        closing = False
+
+        while not closing:
+            write = await self.queue.get()
+            if write is None:
+                break
+
+            batch = [write]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    write = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if write is None:
+                    closing = True
+                    break
+                batch.append(write)
+
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[PendingWrite]):
+        """Write a batch in one transaction, falling back to one per item."""
+        try:
+            await self._flush(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                error_msg = f"Error processing {batch[0].url}: {str(e)}"
+                logger.error(error_msg)
+                self.errors.append(error_msg)
+                return
+            logger.warning(f"Batch of {len(batch)} writes failed ({e}), retrying individually")
+            for write in batch:
+                await self._write_batch([write])
+            return
+
+        self.batches += 1
+        for write in batch:
+            self.outcomes[write.outcome] = self.outcomes.get(write.outcome, 0) + 1
+
+    async def _flush(self, batch: List[PendingWrite]):
+        """Insert new articles, versions and their diffs, then bulk-update existing articles.
+
+        A changed version is diffed against its predecessor here, and
+        delta-encoded against it when configured, so the previous text is
+        only loaded once. That work runs in a thread to keep the event loop
+        (and the fetch workers) responsive on long articles.
+        """
+        async with self.session_factory() as session:
+            new_articles = {
+                id(w): Article(**w.article_fields) for w in batch if w.outcome == 'new'
+            }
+            session.add_all(new_articles.values())
+            await session.flush()
+
+            versions = []
+            diffs = []
+            for write in batch:
+                if write.version_fields is None:
+                    continue
+                if write.outcome == 'new':
+                    article_id = new_articles[id(write)].id
+                    fields = write.version_fields
+                else:
+                    article_id = write.article_id
+                    number = write.version_fields['version_number']
+                    previous = await version_store.load_contents(session, article_id, [number - 1])
+                    previous_content = previous.get(number - 1)
+                    fields = write.version_fields
+                    if previous_content is not None:
+                        # Delta encoding and diffing are CPU-bound (quadratic at worst)
+                        fields, diff = await asyncio.to_thread(
+                            _encode_and_diff, article_id, write.version_fields, previous_content
+                        )
+                        diffs.append(diff)
+                versions.append((write, ArticleVersion(article_id=article_id, **fields)))
+
+            if settings.VERSION_STORAGE_MODE == 'chunks' and versions:
+                hash_lists = await version_store.store_chunks(session, [v.content for _, v in versions])
+                for (_, version), hashes in zip(versions, hash_lists):
+                    version.content = ''
+                    version.chunk_hashes = hashes
+
+            session.add_all([version for _, version in versions])
+            session.add_all(diffs)
+            await session.flush()
+
+            latest = {
+                id(write): {
+                    'latest_version_id': version.id,
+                    'latest_content_hash': version.content_hash,
+                    'latest_word_count': version.word_count,
+                    'latest_fingerprint': version.fingerprint,
+                    'latest_simhash': version.simhash,
+                    'extractor_id': version.extractor_id,
+                }
+                for write, version in versions
+            }
+            for key, article in new_articles.items():
+                for column, value in latest[key].items():
+                    setattr(article, column, value)
+
+            # Bulk UPDATE by primary key (executemany)
+            updates = [
+                {'id': w.article_id, **w.article_values, **latest.get(id(w), {})}
+                for w in batch if w.outcome != 'new'
+            ]
+            if updates:
+                await session.execute(update(Article), updates)
+                # Increment in SQL, as another run may have checked the same articles
+                checks = Counter(w.article_id for w in batch if w.outcome != 'new')
+                for n in set(checks.values()):
+                    await session.execute(
+                        update(Article)
+                        .where(Article.id.in_([aid for aid, count in checks.items() if count == n]))
+                        .values(check_count=func.coalesce(Article.check_count, 0) + n)
+                        .execution_options(synchronize_session=False)
+                    )
+
+            await session.commit()
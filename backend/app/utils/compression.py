@@ -0,0 +1,10 @@
+"""Optional compression backends."""
+
+
+def load_zstandard():
+    """Import the optional zstandard package (None if not installed)."""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
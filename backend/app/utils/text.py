@@ -0,0 +1,16 @@
+"""Version text utilities."""
+import hashlib
+
+
+def content_hash(text: str) -> str:
+    """Generate SHA256 hash of whitespace-normalized text content.
+
+    Paragraph breaks are collapsed first, so hashes match versions stored
+    before content kept its paragraphs.
+    """
+    return hashlib.sha256(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+
+def count_words(text: str) -> int:
+    """Count words in text."""
+    return len(text.split()) if text else 0
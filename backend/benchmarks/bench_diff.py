@@ -0,0 +1,105 @@
+"""Benchmark word diffs of long texts: difflib vs the Myers engine.
+
+Usage (from backend/):
+    python -m benchmarks.bench_diff --words 20000
+
+Generates live-blog-like texts (many short updates with a small, repetitive
+vocabulary) and diffs each against an edited copy: one with a few updates
+inserted and words changed throughout, and one rewritten in a single
+paragraph (no paragraph alignment to lean on).
+"""
+from typing import List, Tuple
+import argparse
+import difflib
+import random
+import time
+from app.services.diff_engine import diff_opcodes
+from app.services.diff_service import DiffService
+from app.services.version_store import split_paragraphs
+
+VOCABULARY = (
+    'regeringen polisen uppger att det har skett en olycka på väg i närheten av '
+    'centrum enligt svt och tt klockan uppdatering vi följer händelsen här ny information'
+).split()
+
+
+def live_blog(rng: random.Random, words: int) -> List[str]:
+    """Generate paragraphs of 30-80 words from a small vocabulary."""
+    paragraphs = []
+    total = 0
+    while total < words:
+        length = rng.randint(30, 80)
+        paragraphs.append(' '.join(rng.choice(VOCABULARY) for _ in range(length)) + '.')
+        total += length
+    return paragraphs
+
+
+def edited(rng: random.Random, paragraphs: List[str], edits: int) -> List[str]:
+    """Insert new updates at the top and change words in random paragraphs."""
+    result = list(paragraphs)
+    for _ in range(edits):
+        index = rng.randrange(len(result))
+        words = result[index].split()
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+        result[index] = ' '.join(words)
+    for _ in range(3):
+        result.insert(0, ' '.join(rng.choice(VOCABULARY) for _ in range(50)) + '.')
+    return result
+
+
+def legacy_diff(old_text: str, new_text: str) -> list:
+    """Previous implementation: one SequenceMatcher over all words (autojunk on)."""
+    return difflib.SequenceMatcher(None, old_text.split(), new_text.split()).get_opcodes()
+
+
+def changed_words(result: list) -> int:
+    """Words reported as deleted or inserted (lower is a tighter diff)."""
+    if result and not isinstance(result[0], tuple):
+        return sum(len(change.content) for change in result)
+    return sum((i2 - i1) + (j2 - j1) for tag, i1, i2, j1, j2 in result if tag != 'equal')
+
+
+def cases(words: int, seed: int) -> List[Tuple[str, str, str]]:
+    rng = random.Random(seed)
+    paragraphs = live_blog(rng, words)
+    changed = edited(rng, paragraphs, edits=max(words // 500, 1))
+    return [
+        ('paragraphs', '\n\n'.join(paragraphs), '\n\n'.join(changed)),
+        ('single paragraph', ' '.join(paragraphs), ' '.join(changed)),
+    ]
+
+
+def measure(fn, old_text: str, new_text: str, rounds: int) -> Tuple[float, int]:
+    """Best of `rounds` in milliseconds, and the number of changed words."""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn(old_text, new_text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, changed_words(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    implementations = {
+        'difflib, all words (legacy)': legacy_diff,
+        'difflib, autojunk off': lambda a, b: difflib.SequenceMatcher(
+            None, a.split(), b.split(), autojunk=False
+        ).get_opcodes(),
+        'myers, all words': lambda a, b: diff_opcodes(a.split(), b.split()),
+        'DiffService word diff': lambda a, b: DiffService.diff_changes(split_paragraphs(a), split_paragraphs(b)),
+    }
+    for label, old_text, new_text in cases(args.words, args.seed):
+        print(f"{label}: {len(old_text.split())} -> {len(new_text.split())} words")
+        for name, fn in implementations.items():
+            ms, changed = measure(fn, old_text, new_text, args.rounds)
+            print(f"  {name:30s} {ms:9.1f} ms  {changed:6d} words changed")
+
+
+if __name__ == '__main__':
+    main()
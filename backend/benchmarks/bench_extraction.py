@@ -0,0 +1,118 @@
+"""Benchmark per-page extraction time: legacy multi-parse vs single lxml pass.
+
+Usage (from backend/):
+    python -m benchmarks.bench_extraction --corpus path/to/saved/svt/pages
+
+The corpus is a directory of saved article pages (*.html). Without one, a
+set of synthetic SVT-like pages is generated.
+"""
+from pathlib import Path
+from typing import List
+import argparse
+import statistics
+import time
+import trafilatura
+from bs4 import BeautifulSoup
+from app.scrapers.extraction import extract_article
+
+
+def legacy_extract(html: bytes) -> dict:
+    """Previous pipeline: trafilatura on raw HTML plus html.parser metadata parses."""
+    content = trafilatura.extract(
+        html,
+        include_comments=False,
+        include_tables=False,
+        no_fallback=False,
+        favor_recall=True
+    )
+    if not content or len(content) < 100:
+        fallback = BeautifulSoup(html, 'html.parser')
+        for elem in fallback(["script", "style", "nav", "footer", "header"]):
+            elem.decompose()
+        article = fallback.find('article') or fallback.find('body')
+        content = article.get_text(separator=' ', strip=True) if article else ''
+
+    soup = BeautifulSoup(html, 'html.parser')
+    og_title = soup.find('meta', property='og:title')
+    return {
+        'title': og_title.get('content', '') if og_title else '',
+        'content': content,
+        'byline': [e.get_text(strip=True) for e in soup.find_all(attrs={'itemprop': 'author'})],
+        'published_date': soup.find('meta', property='article:published_time'),
+        'modified_date': soup.find('meta', property='article:modified_time'),
+        'meta_description': soup.find('meta', {'name': 'description'}),
+        'meta_keywords': soup.find('meta', {'name': 'keywords'}),
+    }
+
+
+def synthetic_page(index: int, paragraphs: int = 25) -> bytes:
+    """Build an SVT-like article page with navigation, scripts and JSON-LD."""
+    nav = ''.join(f'<li><a href="/nyheter/lokalt/region{i}">Region {i}</a></li>' for i in range(60))
+    body = ''.join(
+        f'<p>Stycke {p} i artikel {index}. Regeringen meddelade på tisdagen att '
+        f'nya åtgärder införs för att stärka beredskapen i hela landet, enligt uppgifter till SVT.</p>'
+        for p in range(paragraphs)
+    )
+    teasers = ''.join(f'<a href="/nyheter/inrikes/relaterad-{i}">Läs mer: relaterad artikel {i}</a>' for i in range(20))
+    payload = '{"article":{"id":%d,"blocks":[%s]}}' % (index, ','.join('{"type":"text","v":"x"}' for _ in range(400)))
+    return (
+        '<!DOCTYPE html><html lang="sv"><head>'
+        f'<title>Artikel {index} | SVT Nyheter</title>'
+        f'<meta property="og:title" content="Artikel {index}">'
+        '<meta name="twitter:title" content="Artikel">'
+        '<meta name="description" content="Beskrivning av artikeln.">'
+        '<meta property="article:published_time" content="2026-01-20T08:00:00Z">'
+        '<meta property="article:modified_time" content="2026-01-20T09:30:00Z">'
+        '<script type="application/ld+json">{"@type":"NewsArticle","headline":"Artikel",'
+        '"author":[{"@type":"Person","name":"Anna Andersson"}]}</script>'
+        f'<script>window.__PAYLOAD__={payload}</script>'
+        f'</head><body><header><nav><ul>{nav}</ul></nav></header>'
+        f'<article><h1>Artikel {index}</h1><span itemprop="author">Anna Andersson</span>{body}</article>'
+        f'<aside>{teasers}</aside><footer>Sveriges Television</footer></body></html>'
+    ).encode('utf-8')
+
+
+def load_corpus(corpus: str) -> List[bytes]:
+    """Load saved pages from a directory, or generate synthetic ones."""
+    if corpus:
+        return [path.read_bytes() for path in sorted(Path(corpus).glob('*.html'))]
+    return [synthetic_page(i) for i in range(20)]
+
+
+def measure(fn, pages: List[bytes], rounds: int) -> List[float]:
+    """Return per-page times in milliseconds (best of rounds for each page)."""
+    timings = []
+    for html in pages:
+        best = float('inf')
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn(html)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', help='Directory of saved article pages (*.html)')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        raise SystemExit(f"No *.html pages found in {args.corpus}")
+
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.0f} KiB average")
+    results = {
+        'legacy (trafilatura + html.parser)': measure(legacy_extract, pages, args.rounds),
+        'single lxml pass': measure(extract_article, pages, args.rounds),
+    }
+    for name, timings in results.items():
+        print(
+            f"{name:36s} mean={statistics.mean(timings):7.2f} ms  "
+            f"median={statistics.median(timings):7.2f} ms  max={max(timings):7.2f} ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
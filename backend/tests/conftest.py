@@ -0,0 +1,5 @@
+"""Shared pytest configuration."""
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: starts worker processes (deselect with -m 'not slow')")
@@ -0,0 +1,492 @@
+"""Scraper tests (network mocked with httpx.MockTransport)."""
+import asyncio
+import json
+import pytest
+import httpx
+from app.scrapers.svt import SVTNyheterScraper
+
+
+RSS_FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>SVT</title>
+<item><title>A</title><link>https://www.svt.se/nyheter/inrikes/a</link>
+<pubDate>Tue, 20 Jan 2026 09:00:00 +0100</pubDate></item>
+<item><title>B</title><link>https://www.svt.se/nyheter/inrikes/b</link></item>
+</channel></rss>"""
+
+
+def _mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_rss_conditional_get_cache():
+    """Test that unchanged feeds are served from the validator cache."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get('if-none-match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=RSS_FEED, headers={'ETag': '"v1"'})
+
+    scraper = SVTNyheterScraper()
+    scraper.client = _mock_client(handler)
+    feed_url = 'https://www.svt.se/nyheter/rss.xml'
+
+    first = await scraper._parse_rss(feed_url)
+    second = await scraper._parse_rss(feed_url)
+
+    assert first == second
+    assert [url for url, published in first] == [
+        'https://www.svt.se/nyheter/inrikes/a',
+        'https://www.svt.se/nyheter/inrikes/b',
+    ]
+    assert first[0][1].isoformat() == '2026-01-20T08:00:00+00:00'
+    assert first[1][1] is None
+    assert 'if-none-match' not in requests[0].headers
+    assert requests[1].headers['if-none-match'] == '"v1"'
+    assert (scraper.feed_cache.hits, scraper.feed_cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_rss_identical_body_skips_parsing():
+    """Test that an identical body counts as a hit when validators are ignored."""
+    scraper = SVTNyheterScraper()
+    scraper.client = _mock_client(lambda request: httpx.Response(200, content=RSS_FEED))
+    feed_url = 'https://www.svt.se/nyheter/rss.xml'
+
+    await scraper._parse_rss(feed_url)
+    entries = await scraper._parse_rss(feed_url)
+
+    assert len(entries) == 2
+    assert (scraper.feed_cache.hits, scraper.feed_cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests_per_host():
+    """Test that the token bucket enforces the configured rate after the burst."""
+    from app.scrapers.rate_limiter import HostRateLimiter
+
+    limiter = HostRateLimiter(default_rate=100.0, default_burst=1)
+    limiter.configure('slow.example', rate=10.0, burst=2)
+
+    # Burst is free, then each request waits 1/rate
+    delays = [limiter.buckets['slow.example'].reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01)
+    assert delays[3] == pytest.approx(0.2, abs=0.01)
+
+    # Other hosts are unaffected
+    await limiter.acquire('https://fast.example/a')
+    assert limiter.buckets['fast.example'].rate == 100.0
+
+
+@pytest.mark.asyncio
+async def test_http_pool_reuses_client_per_host():
+    """Test that scrapers borrow one long-lived client per host."""
+    from app.scrapers.http_pool import HTTPClientPool
+
+    pool = HTTPClientPool()
+    first = pool.client_for('https://www.svt.se/nyheter/rss.xml')
+    second = pool.client_for('https://www.svt.se/nyheter/inrikes/a')
+    other = pool.client_for('https://example.com/feed')
+
+    assert first is second
+    assert first is not other
+
+    await pool.aclose()
+    assert not pool.clients
+
+
+ARTICLE_HTML = """<!DOCTYPE html>
+<html lang="sv"><head>
+<title>Fallback titel - SVT Nyheter</title>
+<meta property="og:title" content="Regeringen presenterar ny budget">
+<meta name="description" content="Budgeten innehåller satsningar på skola och vård.">
+<meta name="keywords" content="budget, regeringen">
+<meta property="article:published_time" content="2026-01-20T08:00:00Z">
+<meta property="article:modified_time" content="2026-01-20T09:30:00+01:00">
+</head><body>
+<header><nav>Meny</nav></header>
+<article>
+<h1>Regeringen presenterar ny budget</h1>
+<span itemprop="author">Anna Andersson</span>
+<span itemprop="author">Erik Eriksson</span>
+<p>Regeringen presenterade på tisdagen sin budget för nästa år. Den innehåller
+stora satsningar på skola, vård och omsorg enligt finansministern.</p>
+<p>Oppositionen är kritisk och menar att budgeten inte räcker till för att möta
+de utmaningar som kommunerna står inför under de kommande åren.</p>
+</article>
+<footer>Sveriges Television</footer>
+</body></html>""".encode('utf-8')
+
+
+def test_extract_article_metadata():
+    """Test content and metadata extraction from raw HTML bytes."""
+    from app.scrapers.extraction import extract_article
+
+    data = extract_article(ARTICLE_HTML)
+
+    assert data['title'] == 'Regeringen presenterar ny budget'
+    assert 'satsningar på skola' in data['content']
+    assert 'Oppositionen är kritisk' in data['content']
+    assert data['byline'] == 'Anna Andersson och Erik Eriksson'
+    assert data['published_date'].isoformat() == '2026-01-20T08:00:00+00:00'
+    assert data['modified_date'].isoformat() == '2026-01-20T09:30:00+01:00'
+    assert data['meta_description'].startswith('Budgeten innehåller')
+    assert data['meta_keywords'] == 'budget, regeringen'
+
+
+
+def test_svt_extractor_reads_embedded_json():
+    """Test that the SVT extractor uses JSON-LD and hydration data, with generic fallback."""
+    from app.scrapers.svt import extract_svt_article
+
+    paragraphs = [
+        "Regeringen presenterade på tisdagen sin budget för nästa år.",
+        "Oppositionen är <em>kritisk</em> och menar att budgeten inte r&auml;cker.",
+    ]
+    payload = {'props': {'page': {
+        'menu': [{'text': 'Nyheter'}, {'text': 'Sport'}],
+        # Longer than the article, but not its body
+        'related': [{'text': 'Relaterat: ' + 'en mycket lång puff om något annat ' * 10} for _ in range(3)],
+        'article': {'body': [{'type': 'paragraph', 'text': text} for text in paragraphs]},
+    }}}
+    json_ld = {
+        '@type': 'NewsArticle',
+        'headline': 'Budgeten presenterad',
+        'author': [{'name': 'Anna Andersson'}, {'name': 'SVT'}],
+        'datePublished': '2026-01-20T08:00:00Z',
+    }
+    html = f"""<html><head><title>Rubrik - SVT</title>
+<script type="application/ld+json">{json.dumps(json_ld)}</script>
+<script id="__NEXT_DATA__" type="application/json">{json.dumps(payload)}</script>
+</head><body><article><p>Renderad text som inte ska användas.</p></article></body></html>""".encode('utf-8')
+
+    data = extract_svt_article(html)
+    assert data['title'] == 'Budgeten presenterad'
+    assert data['byline'] == 'Anna Andersson'
+    assert data['published_date'].isoformat() == '2026-01-20T08:00:00+00:00'
+    assert data['content'] == (
+        "Regeringen presenterade på tisdagen sin budget för nästa år.\n\n"
+        "Oppositionen är kritisk och menar att budgeten inte räcker."
+    )
+
+    # Without embedded data the generic extraction is used
+    fallback = extract_svt_article(ARTICLE_HTML)
+    assert fallback['title'] == 'Regeringen presenterar ny budget'
+    assert 'Oppositionen är kritisk' in fallback['content']
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_extraction_executor_process_pool():
+    """Test that extraction runs in a worker process."""
+    from app.scrapers.extraction import ExtractionExecutor, extract_article
+
+    executor = ExtractionExecutor(mode='process', workers=1, timeout=60.0)
+    try:
+        data = await executor.run(extract_article, ARTICLE_HTML)
+        assert data['title'] == 'Regeringen presenterar ny budget'
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_extraction_executor_timeout():
+    """Test that a slow document times out and the pool is recycled."""
+    import threading
+    from app.scrapers.extraction import ExtractionExecutor
+
+    # Blocks until released, so the timeout is the only thing that ends it
+    wedged = threading.Event()
+    try:
+        executor = ExtractionExecutor(mode='thread', workers=1, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(wedged.wait)
+        assert executor.pool is None
+
+        executor.timeout = 5.0
+        assert await executor.run(len, b'abc') == 3
+        executor.shutdown()
+
+        # Waiting for a worker does not count towards the timeout
+        executor = ExtractionExecutor(mode='thread', workers=1, timeout=0.2)
+        results = await asyncio.gather(
+            executor.run(wedged.wait), *[executor.run(len, b'x' * n) for n in (1, 2, 3)],
+            return_exceptions=True
+        )
+        assert isinstance(results[0], asyncio.TimeoutError)
+        assert results[1:] == [1, 2, 3]
+        executor.shutdown()
+    finally:
+        wedged.set()
+
+
+def _block_unless_retried(marker: str) -> str:
+    """Block the first time (until the worker is terminated); return at once when run again."""
+    import os
+    import time
+
+    if os.path.exists(marker):
+        return 'retried'
+    open(marker, 'w').close()
+    time.sleep(60)
+    return 'finished'
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_extraction_executor_recycle_resubmits_other_documents(tmp_path):
+    """Test that terminating a wedged worker does not fail documents running next to it."""
+    from app.scrapers.extraction import ExtractionExecutor
+
+    executor = ExtractionExecutor(mode='process', workers=2, timeout=1.0)
+    try:
+        # Start both workers
+        assert await asyncio.gather(executor.run(len, b'a'), executor.run(len, b'ab')) == [1, 2]
+
+        async def later(*args):
+            await asyncio.sleep(0.5)
+            return await executor.run(*args)
+
+        # The second document is still running when the first one's worker is
+        # terminated; it is resubmitted to the new pool instead of failing
+        results = await asyncio.gather(
+            executor.run(_block_unless_retried, str(tmp_path / 'first')),
+            later(_block_unless_retried, str(tmp_path / 'second')),
+            return_exceptions=True
+        )
+        assert isinstance(results[0], asyncio.TimeoutError)
+        assert results[1] == 'retried'
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_fetch_article_skips_live_articles():
+    """Test fetch_article extraction and live-article filtering."""
+    scraper = SVTNyheterScraper()
+    live_html = ARTICLE_HTML.replace(b'ny budget">', b'ny budget - direktrapport">')
+
+    scraper.client = _mock_client(lambda request: httpx.Response(200, content=ARTICLE_HTML))
+    data = await scraper.fetch_article('https://www.svt.se/nyheter/inrikes/budget')
+    assert data['title'] == 'Regeringen presenterar ny budget'
+
+    scraper.client = _mock_client(lambda request: httpx.Response(200, content=live_html))
+    with pytest.raises(ValueError):
+        await scraper.fetch_article('https://www.svt.se/nyheter/inrikes/budget')
+
+
+
+@pytest.mark.asyncio
+async def test_fetch_article_skips_identical_html():
+    """Test that a page identical to the last fetch (up to volatile markup) is not extracted."""
+    scraper = SVTNyheterScraper()
+    url = 'https://www.svt.se/nyheter/inrikes/budget'
+    pages = [
+        ARTICLE_HTML,
+        ARTICLE_HTML.replace(b'<header>', b'<!-- rendered 12:00:01 --><header>'),
+        ARTICLE_HTML.replace(b'stora satsningar', b'mycket stora satsningar'),
+    ]
+    scraper.client = _mock_client(lambda request: httpx.Response(200, content=pages.pop(0)))
+
+    data = await scraper.fetch_article(url)
+    assert data['html_hash'] == scraper.html_hash(ARTICLE_HTML)
+
+    unchanged = await scraper.fetch_article(url, data['html_hash'])
+    assert unchanged['html_unchanged'] and 'content' not in unchanged
+
+    changed = await scraper.fetch_article(url, data['html_hash'])
+    assert 'mycket stora satsningar' in changed['content']
+    assert changed['html_hash'] != data['html_hash']
+
+
+@pytest.mark.asyncio
+async def test_check_article_rebaselines_on_extractor_change():
+    """Test that an extractor change re-baselines the stored hashes instead of adding a version."""
+    from datetime import datetime
+    from app.models import NewsSource
+    from app.services.article_context import ArticleContext
+    from app.services.fingerprint import Fingerprinter
+    from app.services.scraper_service import ScraperService
+
+    scraper = SVTNyheterScraper()
+    scraper.client = _mock_client(lambda request: httpx.Response(200, content=ARTICLE_HTML))
+    source = NewsSource(id=1, scrape_interval_active=15, scrape_interval_archive=60, head_probe=False)
+    fingerprinter = Fingerprinter(scraper.boilerplate_patterns)
+    url = 'https://www.svt.se/nyheter/inrikes/budget'
+
+    def context(**fields):
+        return ArticleContext(
+            article_id=1, url=url, first_seen_at=datetime.utcnow(), last_checked_at=None, next_check_at=None,
+            is_active=True, check_count=1, version_count=1, unchanged_checks=0, **fields
+        )
+
+    # Hashes from before extractor ids were stored belong to the generic extractor
+    write = await ScraperService(None)._check_article(
+        source, scraper, fingerprinter, url, context(content_hash='0' * 64, fingerprint='0' * 64, simhash='0' * 16)
+    )
+    assert write.outcome == 'rebaselined' and write.version_fields is None
+    assert write.article_values['extractor_id'] == 'svt-json-1'
+
+    rebaselined = context(
+        content_hash=write.article_values['latest_content_hash'],
+        fingerprint=write.article_values['latest_fingerprint'],
+        simhash=write.article_values['latest_simhash'],
+        extractor_id='svt-json-1'
+    )
+    write = await ScraperService(None)._check_article(source, scraper, fingerprinter, url, rebaselined)
+    assert write.outcome == 'unchanged'
+
+
+@pytest.mark.asyncio
+async def test_fetch_article_conditional_get_and_head_probe():
+    """Test that stored validators are sent and 304 / matching HEAD skip the download."""
+    scraper = SVTNyheterScraper()
+    url = 'https://www.svt.se/nyheter/inrikes/budget'
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get('if-none-match') == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=ARTICLE_HTML, headers={'ETag': '"v1"'})
+
+    scraper.client = _mock_client(handler)
+    data = await scraper.fetch_article(url)
+    assert data['etag'] == '"v1"' and data['last_modified'] is None
+
+    result = await scraper.fetch_article(url, etag=data['etag'])
+    assert result == {'not_modified': True, 'etag': '"v1"', 'last_modified': None}
+    assert (scraper.conditional_requests, scraper.not_modified) == (1, 1)
+
+    # Probing with HEAD avoids the GET when the validators still match
+    result = await scraper.fetch_article(url, etag='W/"v1"', head_probe=True)
+    assert result['not_modified']
+    assert requests[-1].method == 'HEAD' and scraper.head_probes == 1
+    assert len(requests) == 3
+
+def test_extract_article_json_ld_fallback():
+    """Test that JSON-LD fills in byline and dates missing from meta tags."""
+    from app.scrapers.extraction import extract_article
+
+    html = b"""<html><head><title>Rubrik</title>
+<script type="application/ld+json">{"@graph": [{"@type": "WebPage"},
+ {"@type": "NewsArticle", "datePublished": "2026-02-01T10:00:00+01:00",
+  "author": [{"@type": "Person", "name": "Anna"}, {"@type": "Person", "name": "Erik"}]}]}</script>
+</head><body><article><p>Text</p></article></body></html>"""
+
+    data = extract_article(html)
+
+    assert data['title'] == 'Rubrik'
+    assert data['byline'] == 'Anna och Erik'
+    assert data['published_date'].isoformat() == '2026-02-01T10:00:00+01:00'
+    assert data['modified_date'] is None
+    assert data['content'] == 'Text'
+
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>https://www.svt.se/sitemap-new.xml</loc><lastmod>2026-01-20T08:00:00Z</lastmod></sitemap>
+<sitemap><loc>https://www.svt.se/sitemap-news.xml</loc></sitemap>
+<sitemap><loc>https://www.svt.se/sitemap-images.xml</loc></sitemap>
+<sitemap><loc>https://www.svt.se/sitemap-2019.xml</loc><lastmod>2019-05-01</lastmod></sitemap>
+</sitemapindex>"""
+
+SITEMAP_NEW = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>https://www.svt.se/nyheter/inrikes/ny</loc><lastmod>2026-01-20T07:00:00+01:00</lastmod></url>
+<url><loc>https://www.svt.se/nyheter/inrikes/gammal</loc><lastmod>2025-01-01</lastmod></url>
+<url><loc>https://www.svt.se/nyheter/inrikes/utan-datum</loc></url>
+</urlset>"""
+
+SITEMAP_IMAGES = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+<url><loc>https://www.svt.se/nyheter/lokalt/bild</loc>
+<image:image><image:loc>https://www.svtstatic.se/image/bild.jpg</image:loc></image:image></url>
+</urlset>"""
+
+SITEMAP_NEWS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+<url><loc>https://www.svt.se/nyheter/utrikes/nyhet</loc>
+<news:news><news:publication_date>2026-01-19T12:00:00Z</news:publication_date></news:news></url>
+</urlset>"""
+
+
+@pytest.mark.asyncio
+async def test_iter_sitemap_streams_and_filters_by_lastmod():
+    """Test sitemap index streaming with lastmod / publication_date filtering and image entries."""
+    from datetime import datetime, timezone
+
+    pages = {
+        '/sitemap.xml': SITEMAP_INDEX,
+        '/sitemap-new.xml': SITEMAP_NEW,
+        '/sitemap-news.xml': SITEMAP_NEWS,
+        '/sitemap-images.xml': SITEMAP_IMAGES,
+    }
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        return httpx.Response(200, content=pages[request.url.path])
+
+    scraper = SVTNyheterScraper()
+    scraper.client = _mock_client(handler)
+    since = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    entries = {
+        url: lastmod
+        async for url, lastmod in scraper._iter_sitemap('https://www.svt.se/sitemap.xml', since=since)
+    }
+
+    assert set(entries) == {
+        'https://www.svt.se/nyheter/inrikes/ny',
+        'https://www.svt.se/nyheter/inrikes/utan-datum',
+        'https://www.svt.se/nyheter/utrikes/nyhet',
+        # The page, not the image nested in its entry
+        'https://www.svt.se/nyheter/lokalt/bild',
+    }
+    assert entries['https://www.svt.se/nyheter/inrikes/utan-datum'] is None
+    assert entries['https://www.svt.se/nyheter/utrikes/nyhet'].isoformat() == '2026-01-19T12:00:00+00:00'
+    # The stale sub-sitemap is never fetched
+    assert '/sitemap-2019.xml' not in requested
+
+
+def test_html_archive_dedups_and_prunes(tmp_path):
+    """Test content-addressed storage, dedup and size-based retention."""
+    import os
+    from app.scrapers.html_archive import HTMLArchive
+
+    archive = HTMLArchive(str(tmp_path), max_bytes=10 ** 9)
+    first = archive.put(ARTICLE_HTML)
+    assert archive.put(ARTICLE_HTML) == first
+    assert archive.get(first) == ARTICLE_HTML
+    assert len(list(tmp_path.glob('*/*/*'))) == 1
+    assert archive.get('0' * 64) is None
+
+    # Oldest files go first once the archive outgrows its budget
+    bodies = [os.urandom(2000) for _ in range(5)]
+    hashes = [archive.put(body) for body in bodies]
+    for age, h in enumerate(reversed([first] + hashes)):
+        path = next(tmp_path.glob(f'*/*/{h}.*'))
+        os.utime(path, (1000 - age, 1000 - age))
+    archive.max_bytes = archive.size() - 1
+    assert archive.prune() >= 1
+    assert archive.get(first) is None
+    assert archive.get(hashes[-1]) == bodies[-1]
+
+
+def test_html_archive_gzip_fallback(tmp_path, monkeypatch):
+    """Test that without zstandard the archive writes plain gzip files."""
+    import gzip
+    from app.scrapers import html_archive
+    from app.scrapers.html_archive import HTMLArchive
+
+    monkeypatch.setattr(html_archive, 'load_zstandard', lambda: None)
+    archive = HTMLArchive(str(tmp_path), max_bytes=10 ** 9)
+    body_hash = archive.put(ARTICLE_HTML)
+    path = next(tmp_path.glob(f'*/*/{body_hash}.gz'))
+    assert gzip.decompress(path.read_bytes()) == ARTICLE_HTML
+    assert archive.get(body_hash) == ARTICLE_HTML
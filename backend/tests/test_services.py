@@ -0,0 +1,232 @@
+"""Service-level tests that do not need network access."""
+from datetime import datetime, timedelta, timezone
+from app.models import Article
+from app.scrapers import DiscoveredArticle
+from app.services.prioritizer import prioritize
+
+
+def test_prioritize_prefers_likely_changes():
+    """Test that new, fresh and frequently edited articles are checked first."""
+    now = datetime(2026, 1, 20, 12, 0, tzinfo=timezone.utc)
+    hours_ago = lambda h: now - timedelta(hours=h)
+
+    candidates = [
+        DiscoveredArticle('https://x/stale', feed_position=0, published=hours_ago(200)),
+        DiscoveredArticle('https://x/new', feed_position=5, published=hours_ago(1)),
+        DiscoveredArticle('https://x/edited', feed_position=3, published=hours_ago(2)),
+        DiscoveredArticle('https://x/quiet', feed_position=3, published=hours_ago(2)),
+        DiscoveredArticle('https://x/touched', feed_position=None, published=hours_ago(1)),
+    ]
+    articles = {
+        'https://x/stale': Article(version_count=1, check_count=30, first_seen_at=hours_ago(200),
+                                   last_checked_at=hours_ago(1)),
+        'https://x/edited': Article(version_count=5, check_count=8, first_seen_at=hours_ago(2),
+                                    last_checked_at=hours_ago(0.5)),
+        'https://x/quiet': Article(version_count=1, check_count=8, first_seen_at=hours_ago(2),
+                                   last_checked_at=hours_ago(0.5)),
+        # Sitemap lastmod is newer than our last check
+        'https://x/touched': Article(version_count=1, check_count=8, first_seen_at=hours_ago(30),
+                                     last_checked_at=hours_ago(3)),
+    }
+
+    ranked = [c.url for c in prioritize(candidates, articles, limit=5, now=now)]
+
+    assert ranked[0] == 'https://x/new'
+    assert ranked.index('https://x/edited') < ranked.index('https://x/quiet')
+    assert ranked.index('https://x/touched') < ranked.index('https://x/quiet')
+    assert ranked[-1] == 'https://x/stale'
+    assert len(prioritize(candidates, articles, limit=2, now=now)) == 2
+
+
+def test_schedule_next_check_backs_off_and_resets():
+    """Test exponential backoff on unchanged checks and reset on change."""
+    from app.models import NewsSource
+    from app.services.recrawl import schedule_next_check
+
+    now = datetime(2026, 1, 20, 12, 0)
+    source = NewsSource(scrape_interval_active=15, scrape_interval_archive=60)
+    article = Article(first_seen_at=now - timedelta(hours=2), unchanged_checks=0, is_active=True)
+
+    intervals = []
+    for changed in (True, False, False, False, True):
+        schedule_next_check(article, source, changed=changed, now=now)
+        intervals.append((article.next_check_at - now).total_seconds() / 60)
+    assert intervals == [15, 30, 60, 120, 15]
+
+    # Older than a day: archive interval is the floor
+    article.first_seen_at = now - timedelta(days=2)
+    schedule_next_check(article, source, changed=False, now=now)
+    assert article.next_check_at - now == timedelta(minutes=120)
+
+    # Capped at RECRAWL_MAX_INTERVAL_HOURS, retired after RECRAWL_MAX_AGE_DAYS
+    article.unchanged_checks = 30
+    article.first_seen_at = now - timedelta(days=30)
+    schedule_next_check(article, source, changed=False, now=now)
+    assert article.next_check_at - now == timedelta(hours=24)
+    assert article.is_active is False
+
+
+def test_version_store_delta_roundtrip(monkeypatch):
+    """Test delta encoding, keyframes and reconstruction of version text."""
+    from app.config import settings
+    from app.models import ArticleVersion
+    from app.services import version_store
+
+    monkeypatch.setattr(settings, 'VERSION_STORAGE_MODE', 'delta')
+    monkeypatch.setattr(settings, 'VERSION_KEYFRAME_INTERVAL', 3)
+
+    texts = [
+        "Regeringen presenterar budgeten.\n\nFörslaget innehåller " + "flera reformer " * 20,
+        "Regeringen presenterar  budgeten i dag.\n\nFörslaget innehåller " + "flera reformer " * 20,
+        "Regeringen har presenterat budgeten i dag.\n\nFörslaget innehåller " + "flera reformer " * 20,
+        "Oppositionen kritiserar budgeten.\n\nFörslaget innehåller " + "flera reformer " * 20,
+    ]
+    versions = []
+    for number, text in enumerate(texts, start=1):
+        previous = texts[number - 2] if number > 1 else None
+        fields = version_store.encode_fields({'version_number': number, 'content': text}, previous)
+        versions.append(ArticleVersion(article_id=1, version_number=number, content=fields['content'], delta=fields.get('delta')))
+
+    # Version 1 and 4 are keyframes, 2 and 3 are small deltas
+    assert [v.delta is not None for v in versions] == [False, True, True, False]
+    assert versions[1].content == ''
+
+    contents = version_store.resolve_contents(reversed(versions))
+    assert [contents[n] for n in range(1, 5)] == texts
+
+
+def test_compressed_text_roundtrip(monkeypatch):
+    """Test compressed storage encoding and reading of legacy plain values."""
+    from app.config import settings
+    from app.models.types import CompressedText, compress_text, compression_of
+
+    text = "Regeringen presenterar budgeten i dag. " * 50
+    column = CompressedText()
+
+    for method in ('none', 'zlib', 'zstd'):
+        monkeypatch.setattr(settings, 'VERSION_COMPRESSION', method)
+        stored = column.process_bind_param(text, None)
+        assert column.process_result_value(stored, None) == text
+    assert compression_of(compress_text(text, 'zlib')) == 'zlib'
+    assert len(compress_text(text, 'zlib')) < len(text) / 5
+
+    # Rows written before compression: TEXT (str) or plain UTF-8 bytes
+    assert column.process_result_value(text, None) == text
+    assert column.process_result_value(text.encode('utf-8'), None) == text
+    assert compression_of(text) is None
+
+
+def test_word_diff_skips_identical_paragraphs():
+    """Test that paragraph-aligned diffs match a plain word diff's positions."""
+    from app.services.diff_service import DiffService
+    from app.services.version_store import split_paragraphs
+
+    old = "Första stycket är oförändrat.\n\nAndra stycket säger något.\n\nTredje stycket."
+    new = "Första stycket är oförändrat.\n\nAndra stycket säger något nytt.\n\nTredje stycket."
+    changes = DiffService.diff_changes(split_paragraphs(old), split_paragraphs(new))
+    assert [(c.type, c.content, c.position) for c in changes] == [
+        ('delete', ['något.'], 7),
+        ('insert', ['något', 'nytt.'], 7),
+    ]
+    assert DiffService.diff_changes(split_paragraphs(old), split_paragraphs(old)) == []
+
+
+def test_fingerprint_ignores_boilerplate():
+    """Test that boilerplate lines do not change the fingerprint but real edits do."""
+    from app.scrapers.svt import SVTNyheterScraper
+    from app.services.fingerprint import Fingerprinter, hamming_distance
+
+    fingerprinter = Fingerprinter(SVTNyheterScraper.boilerplate_patterns)
+    body = "Regeringen presenterar budgeten.\n\nFörslaget innehåller flera reformer för skolan."
+    noisy = body + "\n\nUppdaterad 14.32\n\nLäs mer: Så påverkas din ekonomi\n\nFoto: TT"
+    edited = body.replace("flera", "tre")
+
+    fingerprint, simhash = fingerprinter.fingerprint(body)
+    assert fingerprinter.fingerprint(noisy) == (fingerprint, simhash)
+    assert fingerprinter.fingerprint("  REGERINGEN presenterar budgeten. \n\n" + body.split("\n\n")[1]) == (fingerprint, simhash)
+
+    edited_fingerprint, edited_simhash = fingerprinter.fingerprint(edited)
+    assert edited_fingerprint != fingerprint
+    assert 0 < hamming_distance(simhash, edited_simhash) < 32
+
+    assert Fingerprinter.is_same(fingerprint, simhash, fingerprint, simhash, threshold=0)
+    assert not Fingerprinter.is_same(edited_fingerprint, edited_simhash, fingerprint, simhash, threshold=0)
+    assert not Fingerprinter.is_same(fingerprint, simhash, None, None, threshold=64)
+    assert Fingerprinter.is_same(edited_fingerprint, edited_simhash, fingerprint, simhash, threshold=64)
+
+
+def test_reextract_items_recomputes_derived_fields():
+    """Test re-extraction from archived HTML and from stored text."""
+    from tests.test_scrapers import ARTICLE_HTML
+    from app.scrapers.extraction import extract_article
+    from app.services.reextract import reextract_items
+    from app.utils.text import content_hash
+
+    text = "Regeringen presenterar budgeten.\n\nLäs mer: Så påverkas din ekonomi"
+    patterns = (r'^läs mer:.*$',)
+    results = dict(reextract_items([
+        (1, patterns, extract_article, 'generic-1', ARTICLE_HTML, None),
+        (2, patterns, extract_article, 'generic-1', None, text),
+        (3, patterns, extract_article, 'generic-1', b'<html><body></body></html>', None),
+    ]))
+
+    assert set(results) == {1, 2}
+    assert results[1]['title'] == 'Regeringen presenterar ny budget'
+    assert results[1]['content_hash'] == content_hash(results[1]['content'])
+    assert results[1]['extractor_id'] == 'generic-1'
+    assert 'content' not in results[2]
+    assert results[2]['word_count'] == 9
+    assert results[2]['content_hash'] == content_hash(text)
+    assert results[2]['fingerprint'] == reextract_items([(2, patterns, extract_article, 'generic-1', None, text.split("\n\n")[0])])[0][1]['fingerprint']
+
+
+def test_myers_diff_opcodes():
+    """Test that the Myers engine yields valid, minimal difflib-style opcodes."""
+    import difflib
+    import random
+    from app.services.diff_engine import diff_opcodes
+
+    def rebuild(a, b, opcodes):
+        out = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                assert a[i1:i2] == b[j1:j2]
+            out.extend(b[j1:j2])
+        return out
+
+    def matched(opcodes):
+        return sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag == 'equal')
+
+    assert diff_opcodes("a b c".split(), "a x c".split()) == [
+        ('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2), ('equal', 2, 3, 2, 3)
+    ]
+    assert diff_opcodes([], ["a"]) == [('insert', 0, 0, 0, 1)]
+
+    rng = random.Random(3)
+    for _ in range(300):
+        a = [rng.choice("abcd") for _ in range(rng.randint(0, 40))]
+        b = [rng.choice("abcd") for _ in range(rng.randint(0, 40))]
+        opcodes = diff_opcodes(a, b)
+        assert rebuild(a, b, opcodes) == b
+        reference = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+        assert matched(opcodes) >= matched(reference)
+        # Past the cost cap the result is still a valid (difflib) diff
+        assert rebuild(a, b, diff_opcodes(a, b, max_cost=2)) == b
+
+
+def test_hierarchical_diff_levels():
+    """Test that whole paragraphs and sentences are reported at their own level."""
+    from app.services.diff_service import DiffService
+    from app.services.version_store import split_paragraphs
+
+    old = "Första stycket står kvar.\n\nAndra stycket. Det har två meningar.\n\nTredje stycket tas bort."
+    new = "Första stycket står kvar.\n\nAndra stycket. Det har nu två meningar. Och en till.\n\nEtt nytt sista stycke."
+
+    changes = DiffService.diff_changes(split_paragraphs(old), split_paragraphs(new), 'hierarchical')
+    assert [(c.type, c.level, c.content, c.position) for c in changes] == [
+        ('insert', 'word', ['nu'], 8),
+        ('insert', 'sentence', ['Och', 'en', 'till.'], 11),
+        ('delete', 'paragraph', ['Tredje', 'stycket', 'tas', 'bort.'], 14),
+        ('insert', 'paragraph', ['Ett', 'nytt', 'sista', 'stycke.'], 14),
+    ]
+    assert DiffService.diff_changes(split_paragraphs(old), split_paragraphs(old), 'hierarchical') == []
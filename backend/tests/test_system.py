@@ -1,4 +1,5 @@
 """System health tests."""
+import json
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -94,6 +95,17 @@ async def test_sources_endpoint():
             assert "is_active" in source
 
 
+@pytest.mark.asyncio
+async def test_scraper_metrics_endpoint():
+    """Test scraper metrics endpoint."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/v1/scraper-metrics")
+        assert response.status_code == 200
+        data = response.json()
+        assert "hits" in data["feed_cache"]
+        assert "misses" in data["feed_cache"]
+
+
 @pytest.mark.asyncio
 async def test_scraper_configuration():
     """Test that SVT scraper has correct RSS feeds."""
@@ -116,8 +128,6 @@ async def test_scraper_configuration():
     # Check for kultur feed
     assert any("/kultur/rss.xml" in url for url in rss_urls)
 
-    await scraper.close()
-
 
 @pytest.mark.asyncio
 async def test_article_url_validation():
@@ -136,4 +146,342 @@ async def test_article_url_validation():
     assert not scraper.is_article_url("https://www.svt.se/sport")
     assert not scraper.is_article_url("https://www.svt.se")
 
-    await scraper.close()
+
+@pytest.mark.asyncio
+async def test_backfill_latest_versions():
+    """Test that the latest-version columns are backfilled and used for lookups."""
+    from datetime import datetime
+    from sqlalchemy import delete
+    from app.models import ArticleVersion
+    from app.services.article_context import load_article_contexts
+    from app.services.latest_version import backfill_latest_versions
+
+    url = "https://example.invalid/backfill-test"
+    async with async_session() as session:
+        source = (await session.execute(select(NewsSource))).scalars().first()
+        article = Article(
+            source_id=source.id,
+            url=url,
+            title="Backfill test",
+            first_seen_at=datetime.utcnow(),
+            version_count=2,
+        )
+        session.add(article)
+        await session.flush()
+        for number, content_hash in ((1, "a" * 64), (2, "b" * 64)):
+            session.add(ArticleVersion(
+                article_id=article.id,
+                version_number=number,
+                title="Backfill test",
+                content="Body " * number,
+                content_hash=content_hash,
+                word_count=number,
+                captured_at=datetime.utcnow(),
+            ))
+        await session.commit()
+
+        try:
+            assert await backfill_latest_versions(session) >= 1
+            contexts = await load_article_contexts(session, [url, "https://example.invalid/unknown"])
+            await session.refresh(article)
+        finally:
+            await session.execute(delete(ArticleVersion).where(ArticleVersion.article_id == article.id))
+            await session.execute(delete(Article).where(Article.id == article.id))
+            await session.commit()
+
+    assert list(contexts) == [url]
+    assert contexts[url].content_hash == "b" * 64
+    assert contexts[url].version_count == 2
+    assert article.latest_word_count == 2
+
+
+@pytest.mark.asyncio
+async def test_version_writer_batches_and_isolates_failures():
+    """Test that queued writes are committed in batches and a bad row only fails itself."""
+    from datetime import datetime
+    from sqlalchemy import delete
+    from app.models import ArticleVersion
+    from app.services.version_writer import PendingWrite, VersionWriter
+
+    async with async_session() as session:
+        source = (await session.execute(select(NewsSource))).scalars().first()
+
+    def new_write(url):
+        now = datetime.utcnow()
+        return PendingWrite(
+            url=url,
+            outcome='new',
+            article_fields={'source_id': source.id, 'url': url, 'title': 'Writer test', 'first_seen_at': now, 'version_count': 1},
+            version_fields={'version_number': 1, 'title': 'Writer test', 'content': 'Body', 'content_hash': 'c' * 64, 'word_count': 1, 'captured_at': now},
+        )
+
+    urls = [f"https://example.invalid/writer-test-{i}" for i in range(3)]
+    writer = VersionWriter(batch_size=10, flush_interval=0.5)
+    writer.start()
+    for url in urls:
+        await writer.put(new_write(url))
+    # Same URL twice violates the unique constraint
+    await writer.put(new_write(urls[0]))
+    await writer.close()
+
+    async with async_session() as session:
+        article_id = (await session.execute(select(Article.id).where(Article.url == urls[0]))).scalar_one()
+    # Checks are counted in SQL, so writes for one article from overlapping runs all count
+    for _ in range(2):
+        checker = VersionWriter(batch_size=10, flush_interval=0.0)
+        checker.start()
+        await checker.put(PendingWrite(url=urls[0], outcome='unchanged', article_id=article_id,
+                                       article_values={'last_checked_at': datetime.utcnow()}))
+        await checker.put(PendingWrite(url=urls[0], outcome='not_modified', article_id=article_id,
+                                       article_values={'last_checked_at': datetime.utcnow()}))
+        await checker.close()
+
+    async with async_session() as session:
+        articles = (await session.execute(select(Article).where(Article.url.in_(urls)))).scalars().all()
+        ids = [a.id for a in articles]
+        await session.execute(delete(ArticleVersion).where(ArticleVersion.article_id.in_(ids)))
+        await session.execute(delete(Article).where(Article.id.in_(ids)))
+        await session.commit()
+
+    assert writer.outcomes == {'new': 3}
+    assert len(writer.errors) == 1
+    assert sorted(a.url for a in articles) == urls
+    assert all(a.latest_version_id for a in articles)
+    assert {a.url: a.check_count for a in articles}[urls[0]] == 4
+
+
+@pytest.mark.asyncio
+async def test_chunk_store_refcounts():
+    """Test that paragraphs are stored once and reference counted."""
+    from app.models import ContentChunk
+    from app.services.version_store import store_chunks, release_chunks, collect_chunks, load_chunks
+    from app.models import ArticleVersion
+
+    texts = ["Delat stycke chunk-test.\n\nFörsta versionen.", "Delat stycke chunk-test.\n\nAndra versionen."]
+    async with async_session() as session:
+        hash_lists = await store_chunks(session, texts)
+        await session.commit()
+        assert hash_lists[0][0] == hash_lists[1][0]
+
+        result = await session.execute(
+            select(ContentChunk.hash, ContentChunk.refcount).where(ContentChunk.hash.in_(hash_lists[0] + hash_lists[1]))
+        )
+        refcounts = dict(result.all())
+        assert refcounts[hash_lists[0][0]] == 2
+        assert refcounts[hash_lists[1][1]] == 1
+
+        versions = [ArticleVersion(version_number=1, chunk_hashes=hash_lists[1])]
+        chunks = await load_chunks(session, versions)
+        assert "\n\n".join(chunks[h] for h in hash_lists[1]) == texts[1]
+
+        await release_chunks(session, hash_lists)
+        await session.commit()
+        assert await collect_chunks(session) >= 3
+
+
+@pytest.mark.asyncio
+async def test_diffs_stored_at_ingest_and_cached():
+    """Test that consecutive diffs are written with the version, other pairs cached on request and served with ETags."""
+    from datetime import datetime
+    from sqlalchemy import delete
+    from app.models import ArticleDiff, ArticleVersion
+    from app.services.diff_service import DiffService
+    from app.services.version_writer import PendingWrite, VersionWriter
+
+    async with async_session() as session:
+        source = (await session.execute(select(NewsSource))).scalars().first()
+
+    url = "https://example.invalid/diff-test"
+    texts = ["Första stycket.\n\nAndra stycket.", "Första stycket.\n\nAndra stycket ändrat.", "Nytt stycke."]
+    now = datetime.utcnow()
+
+    def version_fields(number):
+        return {'version_number': number, 'title': 'Diff test', 'content': texts[number - 1], 'content_hash': str(number) * 64, 'word_count': 3, 'captured_at': now}
+
+    writer = VersionWriter(batch_size=1, flush_interval=0.0)
+    writer.start()
+    await writer.put(PendingWrite(
+        url=url, outcome='new', version_fields=version_fields(1),
+        article_fields={'source_id': source.id, 'url': url, 'title': 'Diff test', 'first_seen_at': now, 'version_count': 1},
+    ))
+    await writer.close()
+
+    async with async_session() as session:
+        article_id = (await session.execute(select(Article.id).where(Article.url == url))).scalar_one()
+    for number in (2, 3):
+        writer = VersionWriter(batch_size=1, flush_interval=0.0)
+        writer.start()
+        await writer.put(PendingWrite(url=url, outcome='changed', article_id=article_id, version_fields=version_fields(number)))
+        await writer.close()
+
+    try:
+        async with async_session() as session:
+            pairs = (await session.execute(
+                select(ArticleDiff.from_version, ArticleDiff.to_version).where(ArticleDiff.article_id == article_id)
+            )).all()
+            assert sorted(pairs) == [(1, 2), (2, 3)]
+
+            diff = await DiffService(session).generate_diff(article_id, 1, 2)
+            assert [(c.type, c.content) for c in diff.content_diff] == [('delete', ['stycket.']), ('insert', ['stycket', 'ändrat.'])]
+            assert diff.stats.words_added == 2 and diff.stats.words_removed == 1
+
+            diff = await DiffService(session).generate_diff(article_id, 1, 3)
+            count = (await session.execute(
+                select(func.count(ArticleDiff.id)).where(ArticleDiff.article_id == article_id)
+            )).scalar()
+            assert count == 3
+            assert diff.stats.words_added == 2
+
+            diff = await DiffService(session).generate_diff(article_id, 1, 2, mode='hierarchical')
+            assert diff.mode == 'hierarchical'
+            assert [c.level for c in diff.content_diff] == ['paragraph', 'paragraph']
+            count = (await session.execute(
+                select(func.count(ArticleDiff.id)).where(ArticleDiff.article_id == article_id)
+            )).scalar()
+            assert count == 4
+
+        # Compact format: offsets into the version texts, revalidated by weak ETag
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            params = {'from_version': 1, 'to_version': 3, 'format': 'compact'}
+            response = await client.get(f"/api/v1/diff/{article_id}", params=params)
+            assert response.status_code == 200
+            assert 'must-revalidate' in response.headers['cache-control']
+            assert response.headers['etag'].startswith('W/"')
+
+            old_words, new_words = texts[0].split(), texts[2].split()
+            rebuilt, old_at, new_at = [], 0, 0
+            for op, start, end in response.json()['changes']:
+                gap = start - (old_at if op == 'd' else new_at)
+                rebuilt += old_words[old_at:old_at + gap]
+                old_at, new_at = old_at + gap, new_at + gap
+                if op == 'd':
+                    old_at = end
+                else:
+                    rebuilt += new_words[start:end]
+                    new_at = end
+            assert rebuilt + old_words[old_at:] == new_words
+
+            cached = await client.get(
+                f"/api/v1/diff/{article_id}", params=params, headers={'If-None-Match': response.headers['etag']}
+            )
+            assert cached.status_code == 304
+            full = await client.get(f"/api/v1/diff/{article_id}", params={**params, 'format': 'full'})
+            assert full.headers['etag'] != response.headers['etag']
+
+            # A diff computed on request gets the ETag later requests revalidate against
+            params = {'from_version': 1, 'to_version': 3, 'mode': 'hierarchical'}
+            computed = await client.get(f"/api/v1/diff/{article_id}", params=params)
+            assert computed.headers['etag'].startswith('W/"')
+            cached = await client.get(
+                f"/api/v1/diff/{article_id}", params=params, headers={'If-None-Match': computed.headers['etag']}
+            )
+            assert cached.status_code == 304
+
+            # Timeline: one NDJSON line per consecutive pair, missing diffs computed and stored
+            response = await client.get(f"/api/v1/articles/{article_id}/timeline", params={'mode': 'hierarchical'})
+            assert response.status_code == 200
+            assert response.headers['content-type'].startswith('application/x-ndjson')
+            # Streamed lines are not held back in a gzip buffer
+            assert 'content-encoding' not in response.headers
+            steps = [json.loads(line) for line in response.text.splitlines()]
+            assert [(s['from_version']['version_number'], s['to_version']['version_number']) for s in steps] == [(1, 2), (2, 3)]
+            assert [c['level'] for c in steps[1]['content_diff']] == ['paragraph', 'paragraph']
+            assert steps[1]['stats']['words_added'] == 2 and steps[1]['stats']['words_removed'] == 5
+
+            response = await client.get(f"/api/v1/articles/{article_id}/timeline", params={'stats_only': True})
+            steps = [json.loads(line) for line in response.text.splitlines()]
+            assert len(steps) == 2 and all('content_diff' not in s for s in steps)
+            assert steps[0]['stats']['words_added'] == 2
+
+            response = await client.get("/api/v1/articles/999999999/timeline")
+            assert response.status_code == 404
+
+        async with async_session() as session:
+            count = (await session.execute(
+                select(func.count(ArticleDiff.id)).where(ArticleDiff.article_id == article_id)
+            )).scalar()
+            assert count == 6
+    finally:
+        async with async_session() as session:
+            await session.execute(delete(ArticleDiff).where(ArticleDiff.article_id == article_id))
+            await session.execute(delete(ArticleVersion).where(ArticleVersion.article_id == article_id))
+            await session.execute(delete(Article).where(Article.id == article_id))
+            await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_selective_gzip_skips_excluded_paths():
+    """Test that excluded paths bypass gzip while other responses are compressed."""
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    from app.core.middleware import SelectiveGZipMiddleware
+
+    async def body(request):
+        return PlainTextResponse('x' * 2000)
+
+    inner = Starlette(routes=[Route('/items/{id:int}/stream', body), Route('/items', body)])
+    wrapped = SelectiveGZipMiddleware(inner, minimum_size=500, excluded_paths=[r'/items/\d+/stream'])
+    async with AsyncClient(app=wrapped, base_url="http://test") as client:
+        compressed = await client.get('/items', headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['content-encoding'] == 'gzip'
+        plain = await client.get('/items/1/stream', headers={'Accept-Encoding': 'gzip'})
+        assert 'content-encoding' not in plain.headers and plain.text == 'x' * 2000
+
+
+@pytest.mark.asyncio
+async def test_reextract_keeps_delta_chains_intact(tmp_path, monkeypatch):
+    """Test that a keyframe a later delta depends on is not rewritten from HTML."""
+    from datetime import datetime
+    from sqlalchemy import delete
+    from app.models import ArticleVersion
+    from app.scrapers.html_archive import HTMLArchive
+    from app.services import reextract
+    from app.services.version_store import encode_delta, load_contents
+
+    archive = HTMLArchive(str(tmp_path / 'archive'), max_bytes=10 ** 9)
+    monkeypatch.setattr(reextract, 'html_archive', archive)
+    html = (
+        "<html><head><title>Annan rubrik</title></head><body><article><h1>Annan rubrik</h1>"
+        + "<p>Helt annan brödtext som extraheras ur arkivet och inte ur databasen.</p>" * 5
+        + "</article></body></html>"
+    ).encode()
+    html_hash = archive.put(html)
+
+    texts = ["Regeringen presenterar budgeten.\n\nFoto: TT", "Regeringen har presenterat budgeten.\n\nFoto: TT"]
+    async with async_session() as session:
+        source = (await session.execute(select(NewsSource))).scalars().first()
+        article = Article(source_id=source.id, url="https://example.invalid/reextract-chain", title="Kedja",
+                          first_seen_at=datetime.utcnow(), version_count=2)
+        session.add(article)
+        await session.flush()
+        first = ArticleVersion(article_id=article.id, version_number=1, title="Kedja", content=texts[0],
+                               content_hash="a" * 64, word_count=5, captured_at=datetime.utcnow(), raw_html_hash=html_hash)
+        session.add(first)
+        session.add(ArticleVersion(article_id=article.id, version_number=2, title="Kedja", content='',
+                                   delta=encode_delta(texts[0], texts[1]), content_hash="b" * 64, word_count=6,
+                                   captured_at=datetime.utcnow()))
+        await session.commit()
+        article_id, first_id = article.id, first.id
+
+    try:
+        checkpoint = tmp_path / 'checkpoint.json'
+        dry = reextract.Reextractor(async_session, workers=1, checkpoint_path=str(checkpoint), dry_run=True)
+        dry.progress.last_id = first_id - 1
+        await dry.run()
+        assert not checkpoint.exists()
+
+        reextractor = reextract.Reextractor(async_session, workers=1)
+        reextractor.progress.last_id = first_id - 1
+        progress = await reextractor.run()
+        assert progress.processed == 2
+
+        async with async_session() as session:
+            assert await load_contents(session, article_id, [1, 2]) == {1: texts[0], 2: texts[1]}
+            title = (await session.execute(select(ArticleVersion.title).where(ArticleVersion.id == first_id))).scalar()
+            assert title == "Kedja"
+    finally:
+        async with async_session() as session:
+            await session.execute(delete(ArticleVersion).where(ArticleVersion.article_id == article_id))
+            await session.execute(delete(Article).where(Article.id == article_id))
+            await session.commit()